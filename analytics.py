@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Trend Analytics
+Rolling statistics of every stored keyword/country interest series, kept up to
+date from the new points of each run, and one compact Alerts table of the
+spikes and rising related breakouts they reveal
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+KEYS = ['Country', 'Keyword']
+
+# Related data set -> (Alerts label, column naming the related item)
+BREAKOUT_SOURCES = {
+    'related_queries': ('breakout_query', 'query'),
+    'related_topics': ('breakout_topic', 'topic_title'),
+}
+
+# Google Sheets tab of the recent alerts, and the columns of the alerts table
+ALERTS_TAB = 'Alerts'
+ALERT_COLUMNS = ['Date', 'Country', 'Keyword', 'Alert', 'Item', 'Value', 'Baseline', 'Z_Score', 'Ewma', 'WoW_Change']
+
+# Lowest baseline standard deviation, so a flat series still spikes on a jump
+MIN_STD = 1.0
+
+
+def _series_index(df):
+    return pd.MultiIndex.from_arrays([df['Country'], df['Keyword']])
+
+
+def _window_sums(values, position, window):
+    """
+    Sums of the (up to) window values before each row, within its series
+
+    Args:
+        values (ndarray): Values of all series, each series' rows consecutive
+        position (ndarray): Index of each row within its series
+
+    Returns:
+        tuple: (sums, number of values summed)
+    """
+    count = np.minimum(position, window)
+    cumulative = np.concatenate([[0.0], np.cumsum(values)])
+    rows = np.arange(len(values))
+    return cumulative[rows] - cumulative[rows - count], count
+
+
+def update_series(tail, points, window, alpha):
+    """
+    Statistics of new points, computed for all series in one pass
+
+    Each series continues from its stored tail: the baseline of a point is the
+    mean and standard deviation of the `window` points before it, its EWMA
+    continues from the EWMA of the last stored point, and its week-over-week
+    change compares it with the point 7 days earlier.
+
+    Args:
+        tail (DataFrame): Stored Country, Keyword, Date, Value, Ewma rows (the last points of each series)
+        points (DataFrame): Country, Keyword, Date, Value rows after the end of their series' tail
+        window (int): Points in the rolling baseline
+        alpha (float): EWMA smoothing factor
+
+    Returns:
+        tuple: (all rows with New, Ewma, Baseline, Baseline_Std, Baseline_Count,
+                Z_Score and WoW_Change columns, new tail to store)
+    """
+    parts = [df for df in (tail.assign(New=False), points.assign(New=True, Ewma=np.nan)) if not df.empty]
+    frame = pd.concat(parts, ignore_index=True)
+    frame['Date'] = pd.to_datetime(frame['Date'])
+    frame = frame.sort_values(KEYS + ['Date'], kind='stable').reset_index(drop=True)
+    # Integer series ids, so the keys are factorized once
+    frame['Series'] = frame.groupby(KEYS, sort=False).ngroup()
+    grouped = frame.groupby('Series', sort=False)
+
+    # Baseline of the points before each one, so a spike does not raise its own baseline
+    values = frame['Value'].to_numpy(dtype=float)
+    position = grouped.cumcount().to_numpy()
+    total, count = _window_sums(values, position, window)
+    squares, _ = _window_sums(values ** 2, position, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frame['Baseline'] = total / count
+        frame['Baseline_Std'] = np.sqrt(np.maximum(squares - total * frame['Baseline'], 0) / (count - 1))
+    frame['Baseline_Count'] = count
+    frame['Z_Score'] = (frame['Value'] - frame['Baseline']) / frame['Baseline_Std'].clip(lower=MIN_STD)
+
+    # The last stored point (followed by a new one or nothing) seeds the EWMA of the new ones
+    seed = ~frame['New'] & grouped['New'].shift(-1, fill_value=True).astype(bool)
+    feed = frame[frame['New'] | seed]
+    inputs = feed['Value'].where(feed['New'], feed['Ewma'])
+    ewma = inputs.groupby(feed['Series'], sort=False).ewm(alpha=alpha, adjust=False).mean()
+    frame.loc[feed.index, 'Ewma'] = ewma.reset_index(level=0, drop=True)
+
+    week_ago = pd.DataFrame({'Series': frame['Series'], 'Date': frame['Date'] + pd.Timedelta(days=7),
+                             'Week_Ago': frame['Value']})
+    frame = frame.merge(week_ago, on=['Series', 'Date'], how='left')
+    frame['WoW_Change'] = (frame['Value'] - frame['Week_Ago']) / frame['Week_Ago'].where(frame['Week_Ago'] > 0) * 100
+
+    # Enough points for the next baseline and week-over-week comparison
+    grouped = frame.groupby('Series', sort=False)
+    from_end = grouped.cumcount(ascending=False)
+    keep = (from_end < window) | (frame['Date'] >= grouped['Date'].transform('max') - pd.Timedelta(days=7))
+    new_tail = frame.loc[keep, KEYS + ['Date', 'Value', 'Ewma']].reset_index(drop=True)
+    return frame, new_tail
+
+
+def rebase_tail(tail, fresh):
+    """
+    Stored tails put on the scale of the latest collection
+
+    A collection that re-fetches the whole window renormalizes it to its own
+    0-100, so each tail (values and EWMA) is multiplied by the ratio of the
+    fresh to the stored values on the dates both have.
+
+    Args:
+        tail (DataFrame): Stored Country, Keyword, Date, Value, Ewma rows
+        fresh (DataFrame): Latest stored Country, Keyword, Date, Value rows
+
+    Returns:
+        DataFrame: tail on the fresh scale (series without shared dates unchanged)
+    """
+    if tail.empty or fresh.empty:
+        return tail
+    tail = tail.assign(Date=pd.to_datetime(tail['Date']), Value=tail['Value'].astype(float),
+                       Ewma=tail['Ewma'].astype(float))
+    shared = tail[KEYS + ['Date', 'Value']].merge(fresh[KEYS + ['Date', 'Value']].assign(
+        Date=pd.to_datetime(fresh['Date'])), on=KEYS + ['Date'], suffixes=('', '_Fresh'))
+    totals = shared.groupby(KEYS)[['Value', 'Value_Fresh']].sum()
+    ratio = (totals['Value_Fresh'] / totals['Value']).where((totals['Value'] > 0) & (totals['Value_Fresh'] > 0))
+    factor = ratio.reindex(_series_index(tail)).fillna(1.0).to_numpy()
+    return tail.assign(Value=tail['Value'] * factor, Ewma=tail['Ewma'] * factor)
+
+
+def find_spikes(frame, spike_z, min_value, min_points, since=None):
+    """
+    New points far above their baseline
+
+    Args:
+        frame (DataFrame): update_series() rows
+        spike_z (float): Standard deviations above the baseline that make a spike
+        min_value (float): Lowest interest value reported, below it spikes are noise
+        min_points (int): Baseline points a series needs before it is checked
+        since (Timestamp): Only points from this date on (older ones only build the state)
+
+    Returns:
+        DataFrame: Alerts rows
+    """
+    spikes = frame[frame['New'] & (frame['Baseline_Count'] >= min_points)
+                   & (frame['Z_Score'] >= spike_z) & (frame['Value'] >= min_value)]
+    if since is not None:
+        spikes = spikes[spikes['Date'] >= since]
+    return spikes.assign(Alert='spike', Item='')[ALERT_COLUMNS]
+
+
+def find_breakouts(related, previous, breakout_percent, date):
+    """
+    Rising related items that became breakouts since the previous collection
+
+    Args:
+        related (dict): Data set ('related_queries', 'related_topics') -> rows collected in this run
+        previous (DataFrame): Country, Keyword, Alert, Item breakouts of the previous collections
+        breakout_percent (float): Rising value from which an item is a breakout
+        date (Timestamp): Date of the alerts
+
+    Returns:
+        tuple: (Alerts rows, breakouts to remember)
+    """
+    current, collected = [], []
+    for table, (alert, item_column) in BREAKOUT_SOURCES.items():
+        df = related.get(table)
+        if df is None or df.empty or item_column not in df.columns:
+            continue
+        collected.append(df[KEYS].drop_duplicates().assign(Alert=alert))
+        rising = df[(df['Type'] == 'Rising') & (pd.to_numeric(df['value'], errors='coerce') >= breakout_percent)]
+        current.append(pd.DataFrame({
+            'Country': rising['Country'], 'Keyword': rising['Keyword'], 'Alert': alert,
+            'Item': rising[item_column].astype(str), 'Value': pd.to_numeric(rising['value']),
+        }))
+    if not collected:
+        return pd.DataFrame(columns=ALERT_COLUMNS), previous
+
+    identity = KEYS + ['Alert', 'Item']
+    current = pd.concat(current, ignore_index=True).drop_duplicates(identity)
+    seen = previous[identity].assign(Seen=True)
+    alerts = current.merge(seen, on=identity, how='left')
+    alerts = alerts[alerts['Seen'].isna()].assign(Date=date)
+
+    # The collected series' breakouts replace the ones remembered for them
+    kept = previous[identity].merge(pd.concat(collected, ignore_index=True), on=KEYS + ['Alert'],
+                                    how='left', indicator=True)
+    kept = kept.loc[kept['_merge'] == 'left_only', identity]
+    remembered = pd.concat([kept, current[identity]], ignore_index=True)
+    return alerts.reindex(columns=ALERT_COLUMNS), remembered
+
+
+class TrendAnalytics:
+    """
+    Per-series trend state and alerting after each run
+
+    The state directory keeps the last points (and their EWMA) of every series
+    and the breakouts already reported. A run reads only the interest points
+    from the start of the stored tails on (the tails are first rebased onto
+    their latest values, in case the window was re-fetched on a new scale)
+    and the related rows it collected itself, so its cost grows with the new
+    data, not with the stored history.
+    """
+
+    def __init__(self, directory='analytics_state', window=28, alpha=0.3, spike_z=3.0, min_value=10,
+                 min_points=8, breakout_percent=5000, alert_days=30):
+        """
+        Load the state
+
+        Args:
+            directory (str): State directory (series.parquet, breakouts.parquet)
+            window (int): Points in the rolling baseline
+            alpha (float): EWMA smoothing factor
+            spike_z (float): Standard deviations above the baseline that make a spike
+            min_value (float): Lowest interest value reported as a spike
+            min_points (int): Baseline points a series needs before spikes are reported
+            breakout_percent (float): Rising related value reported as a breakout
+            alert_days (int): Points older than this are not reported (the first run
+                processes the whole history)
+        """
+        self.directory = directory
+        self.window = window
+        self.alpha = alpha
+        self.spike_z = spike_z
+        self.min_value = min_value
+        self.min_points = min_points
+        self.breakout_percent = breakout_percent
+        self.alert_days = alert_days
+        self.tail = self._load('series', KEYS + ['Date', 'Value', 'Ewma'])
+        self.breakouts = self._load('breakouts', KEYS + ['Alert', 'Item'])
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.parquet")
+
+    def _load(self, name, columns):
+        path = self._path(name)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=columns)
+        return pd.read_parquet(path)
+
+    def save(self):
+        """Write the state atomically"""
+        os.makedirs(self.directory, exist_ok=True)
+        for name, df in (('series', self.tail), ('breakouts', self.breakouts)):
+            tmp_path = f"{self._path(name)}.tmp"
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self._path(name))
+
+    def new_points(self, store, pairs):
+        """
+        Stored tails of the pairs on the latest scale, and the interest points after them
+
+        Returns:
+            tuple: (rebased tail rows, points after the last processed point of each series)
+        """
+        tail = self.tail[_series_index(self.tail).isin(pairs)]
+        first = pd.to_datetime(tail.groupby(KEYS)['Date'].min())
+        # Only read the months since the oldest stored tail, unless a series is new
+        start = first.min() if len(first) == len(pairs) and len(first) else None
+        interest = store.read('interest', start=start)
+        if interest.empty:
+            return tail, pd.DataFrame(columns=KEYS + ['Date', 'Value'])
+        interest = interest[KEYS + ['Date', 'Value']].dropna(subset=['Value'])
+        interest = interest.astype({'Country': str, 'Keyword': str, 'Value': 'float64'})
+        interest = interest[_series_index(interest).isin(pairs)]
+        tail = rebase_tail(tail, interest)
+        last = pd.to_datetime(tail.groupby(KEYS)['Date'].max())
+        after = pd.DatetimeIndex(last.reindex(_series_index(interest)).to_numpy())
+        return tail, interest[after.isna() | (interest['Date'].to_numpy() > after)]
+
+    def update(self, store, pairs):
+        """
+        Process the new data of a run
+
+        Args:
+            store (TrendsDataStore): Flushed store of the run
+            pairs (iterable): (country name, keyword) series the run collected
+
+        Returns:
+            DataFrame: New alerts (ALERT_COLUMNS), newest first
+        """
+        pairs = list(pairs)
+        tail, points = self.new_points(store, pairs)
+        since = pd.Timestamp(store.collected_at).normalize() - pd.Timedelta(days=self.alert_days)
+        spikes = pd.DataFrame(columns=ALERT_COLUMNS)
+        if not points.empty:
+            frame, tail = update_series(tail, points, self.window, self.alpha)
+            spikes = find_spikes(frame, self.spike_z, self.min_value, self.min_points, since)
+        if not tail.empty:
+            self.tail = pd.concat([self.tail[~_series_index(self.tail).isin(pairs)], tail], ignore_index=True)
+
+        related = {}
+        for table in BREAKOUT_SOURCES:
+            df = store.read(table, start=store.collected_at)
+            if not df.empty:
+                df = df.astype({'Country': str, 'Keyword': str})
+                related[table] = df[_series_index(df).isin(pairs)]
+        breakouts, self.breakouts = find_breakouts(related, self.breakouts, self.breakout_percent,
+                                                   pd.Timestamp(store.collected_at).normalize())
+
+        found = [df for df in (spikes, breakouts) if not df.empty]
+        alerts = pd.concat(found, ignore_index=True) if found else pd.DataFrame(columns=ALERT_COLUMNS)
+        for column in ('Value', 'Baseline', 'Z_Score', 'Ewma', 'WoW_Change'):
+            alerts[column] = pd.to_numeric(alerts[column]).round(2)
+        return alerts.sort_values(['Date', 'Country', 'Keyword'], ascending=[False, True, True]).reset_index(drop=True)
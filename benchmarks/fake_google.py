@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Fake Google Services
+Local HTTP stand-ins for the Google Trends endpoints used by pytrends and the
+Sheets v4 / Drive v3 endpoints used by gspread, with configurable latency and
+429 injection, plus a switch that redirects the real hosts to them
+"""
+
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from requests.adapters import HTTPAdapter
+
+# Hosts answered by the fake server
+GOOGLE_HOSTS = [
+    'https://trends.google.com',
+    'https://sheets.googleapis.com',
+    'https://www.googleapis.com',
+]
+
+SPREADSHEET_ID = 'benchmark-spreadsheet'
+
+# Countries of a worldwide Interest by Region breakdown
+COUNTRY_CODES = ['AT', 'AU', 'BE', 'BR', 'CA', 'CH', 'CZ', 'DE', 'DK', 'ES', 'FI', 'FR', 'GB', 'GR', 'HU', 'IE',
+                 'IN', 'IT', 'JP', 'MX', 'NL', 'NO', 'NZ', 'PL', 'PT', 'RO', 'SE', 'SI', 'SK', 'TR', 'UA', 'US']
+
+_A1_PATTERN = re.compile(r"^(?:'((?:[^']|'')*)'|([^!]+))(?:!([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?)?$")
+
+
+def _column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+
+def parse_a1(a1):
+    """
+    Split an A1 range into (tab, first_row, first_col, last_col)
+
+    Rows and columns are 1-based; last_col is None for open ranges.
+    """
+    match = _A1_PATTERN.match(a1)
+    if not match:
+        raise ValueError(f"unsupported range {a1!r}")
+    quoted, plain, col, row, end_col, _ = match.groups()
+    tab = quoted.replace("''", "'") if quoted is not None else plain
+    first_col = _column_number(col) if col else 1
+    return tab, int(row) if row else 1, first_col, _column_number(end_col) if end_col else None
+
+
+def _timeline(timeframe):
+    """Dates of an interest over time series for a Trends timeframe string"""
+    today = datetime(2024, 6, 30)
+    parts = timeframe.split()
+    if len(parts) == 2 and re.match(r'\d{4}-\d{2}-\d{2}$', parts[0]):
+        start, end = (datetime.strptime(p, '%Y-%m-%d') for p in parts)
+    elif timeframe.startswith('today') and timeframe.endswith('-m'):
+        start, end = today - timedelta(days=30 * int(parts[1][:-2])), today
+    elif timeframe.startswith('today') and timeframe.endswith('-y'):
+        start, end = today - timedelta(days=365 * int(parts[1][:-2])), today
+    else:
+        start, end = today - timedelta(days=90), today
+    step = timedelta(days=1) if (end - start).days <= 269 else timedelta(days=7)
+    dates = []
+    while start <= end:
+        dates.append(start)
+        start += step
+    return dates
+
+
+def popularity(keyword, geo, day):
+    """
+    Deterministic absolute popularity of a keyword on a day
+
+    A function of the date alone, so overlapping windows agree up to their
+    0-100 scaling, like real Trends data.
+    """
+    seed = zlib.crc32(f"{geo}|{keyword}".encode('utf-8'))
+    base = 20 + seed % 60
+    ordinal = day.toordinal()
+    seasonal = 1 + 0.4 * math.sin(2 * math.pi * (ordinal + seed % 365) / 365.25)
+    weekly = 1 + 0.1 * math.sin(2 * math.pi * ordinal / 7)
+    noise = 1 + 0.2 * random.Random(seed ^ ordinal).random()
+    return base * seasonal * weekly * noise
+
+
+def _series(keyword, geo, dates):
+    """Popularity of a keyword, averaged over the days of each point of a timeline"""
+    if len(dates) < 2:
+        return [popularity(keyword, geo, day) for day in dates]
+    step = (dates[1] - dates[0]).days
+    return [sum(popularity(keyword, geo, day + timedelta(days=offset)) for offset in range(step)) / step
+            for day in dates]
+
+
+class FakeGoogleState:
+    """Configuration and counters shared by all request handlers"""
+
+    def __init__(self, trends_latency=0.0, sheets_latency=0.0, trends_429_rate=0.0, sheets_429_rate=0.0,
+                 related_items=10, seed=0):
+        self.trends_latency = trends_latency
+        self.sheets_latency = sheets_latency
+        self.trends_429_rate = trends_429_rate
+        self.sheets_429_rate = sheets_429_rate
+        self.related_items = related_items
+        self.calls = Counter()
+        self.throttled = Counter()
+        self.sheets = {}
+        # The one spreadsheet takes the name it was last searched for
+        self.title = 'Benchmark'
+        self._next_sheet_id = 1
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Clear the counters and the spreadsheet contents"""
+        with self._lock:
+            self.calls.clear()
+            self.throttled.clear()
+            self.sheets.clear()
+            self._next_sheet_id = 1
+
+    def inject_429(self, service):
+        rate = self.trends_429_rate if service == 'trends' else self.sheets_429_rate
+        with self._lock:
+            return rate > 0 and self._random.random() < rate
+
+    def add_sheet(self, title, rows=1000, cols=26):
+        with self._lock:
+            sheet = {'properties': {'sheetId': self._next_sheet_id, 'title': title, 'index': len(self.sheets),
+                                    'sheetType': 'GRID',
+                                    'gridProperties': {'rowCount': rows, 'columnCount': cols}},
+                     'values': []}
+            self._next_sheet_id += 1
+            self.sheets[title] = sheet
+            return sheet
+
+    def remove_sheet(self, sheet_id):
+        with self._lock:
+            del self.sheets[self.sheet_by_id(sheet_id)['properties']['title']]
+
+    def sheet_by_id(self, sheet_id):
+        return next(s for s in self.sheets.values() if s['properties']['sheetId'] == sheet_id)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # -- plumbing -----------------------------------------------------------
+
+    def _send(self, status, body, content_type='application/json', prefix='', headers=None):
+        payload = (prefix + (body if isinstance(body, str) else json.dumps(body))).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self):
+        return json.loads(self._raw_body) if self._raw_body else {}
+
+    def _route(self, method):
+        # Read before any reply: an unread body would be parsed as the next request of the keep-alive connection
+        length = int(self.headers.get('Content-Length') or 0)
+        self._raw_body = self.rfile.read(length) if length else b''
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        query = parse_qs(url.query)
+        service = 'trends' if path.startswith('/trends') else 'sheets'
+        endpoint = f"{method} {self._endpoint_name(path)}"
+        self.state.calls[endpoint] += 1
+
+        latency = self.state.trends_latency if service == 'trends' else self.state.sheets_latency
+        if latency:
+            time.sleep(latency)
+        if self.state.inject_429(service):
+            self.state.throttled[endpoint] += 1
+            if service == 'trends':
+                return self._send(429, 'Too Many Requests', content_type='text/html')
+            return self._send(429, {'error': {'code': 429, 'message': 'Quota exceeded',
+                                              'status': 'RESOURCE_EXHAUSTED'}})
+        try:
+            if service == 'trends':
+                return self._trends(path, query)
+            return self._sheets(method, path, query)
+        except Exception as e:
+            return self._send(400, {'error': {'code': 400, 'message': str(e), 'status': 'INVALID_ARGUMENT'}})
+
+    @staticmethod
+    def _endpoint_name(path):
+        if path.startswith('/v4/spreadsheets/'):
+            rest = path[len('/v4/spreadsheets/'):]
+            _, _, tail = rest.partition('/')
+            if ':' in rest and '/' not in rest:
+                return 'sheets:' + rest.split(':', 1)[1]
+            if tail.startswith('values:'):
+                return 'sheets.values:' + tail.split(':', 1)[1]
+            if tail.startswith('values/'):
+                return 'sheets.values' + (':' + tail.rsplit(':', 1)[1] if tail.endswith((':append', ':clear')) else '')
+            return 'sheets'
+        return path.rstrip('/')
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_POST(self):
+        self._route('POST')
+
+    def do_PUT(self):
+        self._route('PUT')
+
+    # -- Trends -------------------------------------------------------------
+
+    def _trends(self, path, query):
+        if path.startswith('/trends/explore'):
+            return self._send(200, '<html></html>', content_type='text/html',
+                              headers={'Set-Cookie': 'NID=benchmark-cookie; Path=/'})
+        if path == '/trends/api/explore':
+            return self._explore(json.loads(query['req'][0]))
+        request = json.loads(query['req'][0])
+        if path == '/trends/api/widgetdata/multiline':
+            return self._multiline(request)
+        if path == '/trends/api/widgetdata/relatedsearches':
+            return self._related(request)
+        if path == '/trends/api/widgetdata/comparedgeo':
+            return self._compared_geo(request)
+        return self._send(404, 'Not Found', content_type='text/html')
+
+    def _explore(self, req):
+        items = req['comparisonItem']
+        timeframe = items[0]['time'] if items else 'today 3-m'
+        geo = items[0].get('geo', '') if items else ''
+        widgets = [
+            {'id': 'TIMESERIES', 'token': 'ts',
+             'request': {'time': timeframe, 'geo': geo, 'comparisonItem': items}},
+            {'id': 'GEO_MAP', 'token': 'geo',
+             'request': {'geo': geo, 'comparisonItem': items, 'resolution': 'REGION'}},
+        ]
+        for index, item in enumerate(items):
+            suffix = f"_{index}" if len(items) > 1 else ''
+            restriction = {'geo': {'country': geo} if geo else {}, 'time': timeframe,
+                           'complexKeywordsRestriction': {'keyword': [{'type': 'BROAD', 'value': item['keyword']}]}}
+            widgets.append({'id': 'RELATED_TOPICS' + suffix, 'token': 'rt',
+                            'request': {'restriction': restriction, 'keywordType': 'ENTITY'}})
+            widgets.append({'id': 'RELATED_QUERIES' + suffix, 'token': 'rq',
+                            'request': {'restriction': restriction, 'keywordType': 'QUERY'}})
+        return self._send(200, {'widgets': widgets}, prefix=")]}'")
+
+    def _multiline(self, request):
+        items = request['comparisonItem']
+        dates = _timeline(request['time'])
+        series = [_series(item['keyword'], request['geo'], dates) for item in items]
+        peak = max([max(s) for s in series if s] + [1])
+        timeline = []
+        for index, day in enumerate(dates):
+            values = [int(round(s[index] * 100 / peak)) for s in series]
+            point = {'time': str(int(day.timestamp())), 'formattedTime': day.strftime('%b %d, %Y'),
+                     'value': values, 'hasData': [True] * len(values),
+                     'formattedValue': [str(v) for v in values]}
+            if index == len(dates) - 1:
+                point['isPartial'] = True
+            timeline.append(point)
+        return self._send(200, {'default': {'timelineData': timeline, 'averages': []}}, prefix=")]}',")
+
+    def _related(self, request):
+        keyword = request['restriction']['complexKeywordsRestriction']['keyword'][0]['value']
+        rng = random.Random(zlib.crc32(keyword.encode('utf-8')))
+        ranked = []
+        for kind in ('top', 'rising'):
+            entries = []
+            for index in range(self.state.related_items):
+                value = 100 - index * 7 if kind == 'top' else rng.randint(50, 5000)
+                if request.get('keywordType') == 'ENTITY':
+                    entries.append({'topic': {'mid': f"/m/{zlib.crc32(f'{keyword}{kind}{index}'.encode()):x}",
+                                              'title': f"{keyword} topic {index}", 'type': 'Topic'},
+                                    'value': value, 'formattedValue': str(value), 'hasData': True,
+                                    'link': f"/trends/explore?q={index}"})
+                else:
+                    entries.append({'query': f"{keyword} query {index}", 'value': value,
+                                    'formattedValue': str(value), 'link': f"/trends/explore?q={index}"})
+            ranked.append({'rankedKeyword': entries})
+        return self._send(200, {'default': {'rankedList': ranked}}, prefix=")]}',")
+
+    def _compared_geo(self, request):
+        items = request['comparisonItem']
+        if not request.get('geo') and request.get('resolution') == 'COUNTRY':
+            regions = [(code, f"Country {code}") for code in COUNTRY_CODES]
+        else:
+            regions = [(f"{request.get('geo') or 'XX'}-{index:02d}", f"Region {index}") for index in range(20)]
+        raw = [[popularity(item['keyword'], code, datetime(2024, 6, 30)) for item in items] for code, _ in regions]
+        peak = max([max(row) for row in raw if row] + [1])
+        data = []
+        for (code, name), row in zip(regions, raw):
+            values = [int(round(v * 100 / peak)) for v in row]
+            data.append({'geoCode': code, 'geoName': name, 'value': values,
+                         'formattedValue': [str(v) for v in values], 'maxValueIndex': 0,
+                         'hasData': [True] * len(values)})
+        return self._send(200, {'default': {'geoMapData': data}}, prefix=")]}',")
+
+    # -- Sheets / Drive -----------------------------------------------------
+
+    def _metadata(self):
+        return {'spreadsheetId': SPREADSHEET_ID,
+                'properties': {'title': self.state.title, 'locale': 'en_US', 'timeZone': 'Etc/GMT'},
+                'sheets': [{'properties': s['properties']} for s in self.state.sheets.values()]}
+
+    def _sheets(self, method, path, query):
+        if path.startswith('/drive/v3/files'):
+            title = re.search(r'name\s*=\s*["\'](.+?)["\']', query.get('q', [''])[0])
+            if title:
+                self.state.title = title.group(1)
+            return self._send(200, {'files': [{
+                'id': SPREADSHEET_ID, 'name': title.group(1) if title else 'Benchmark',
+                'createdTime': '2024-01-01T00:00:00.000Z', 'modifiedTime': '2024-01-01T00:00:00.000Z'}]})
+
+        rest = path[len('/v4/spreadsheets/'):]
+        if ':batchUpdate' in rest and '/' not in rest:
+            return self._batch_update(self._body())
+        _, _, tail = rest.partition('/')
+        if not tail:
+            return self._send(200, self._metadata())
+        if tail == 'values:batchGet':
+            ranges = [self._read(a1) for a1 in query.get('ranges', [])]
+            return self._send(200, {'spreadsheetId': SPREADSHEET_ID, 'valueRanges': ranges})
+        if tail == 'values:batchClear':
+            for a1 in self._body().get('ranges', []):
+                self._clear(a1)
+            return self._send(200, {'spreadsheetId': SPREADSHEET_ID})
+        if tail == 'values:batchUpdate':
+            for entry in self._body().get('data', []):
+                self._write(entry['range'], entry.get('values', []))
+            return self._send(200, {'spreadsheetId': SPREADSHEET_ID})
+
+        a1 = tail[len('values/'):]
+        if a1.endswith(':clear'):
+            self._clear(a1[:-len(':clear')])
+            return self._send(200, {'spreadsheetId': SPREADSHEET_ID})
+        if a1.endswith(':append'):
+            a1 = a1[:-len(':append')]
+            tab = parse_a1(a1)[0]
+            first_row = len(self.state.sheets[tab]['values']) + 1
+            self._write(f"'{tab}'!A{first_row}", self._body().get('values', []))
+            return self._send(200, {'spreadsheetId': SPREADSHEET_ID, 'updates': {}})
+        if method == 'PUT':
+            self._write(a1, self._body().get('values', []))
+            return self._send(200, {'spreadsheetId': SPREADSHEET_ID, 'updatedRange': a1})
+        return self._send(200, self._read(a1))
+
+    def _sheet(self, tab):
+        if tab not in self.state.sheets:
+            raise ValueError(f"Unable to parse range: {tab}")
+        return self.state.sheets[tab]
+
+    def _read(self, a1):
+        tab, first_row, first_col, last_col = parse_a1(a1)
+        rows = self._sheet(tab)['values'][first_row - 1:]
+        rows = [row[first_col - 1:last_col] for row in rows]
+        while rows and not any(v != '' for v in rows[-1]):
+            rows.pop()
+        return {'range': a1, 'majorDimension': 'ROWS', 'values': rows}
+
+    def _write(self, a1, values):
+        tab, first_row, first_col, _ = parse_a1(a1)
+        grid = self._sheet(tab)['values']
+        for offset, row in enumerate(values):
+            index = first_row - 1 + offset
+            while len(grid) <= index:
+                grid.append([])
+            current = grid[index]
+            needed = first_col - 1 + len(row)
+            if len(current) < needed:
+                current.extend([''] * (needed - len(current)))
+            current[first_col - 1:needed] = row
+
+    def _clear(self, a1):
+        tab = parse_a1(a1)[0]
+        self._sheet(tab)['values'] = []
+
+    def _batch_update(self, body):
+        replies = []
+        for request in body.get('requests', []):
+            if 'addSheet' in request:
+                properties = request['addSheet'].get('properties', {})
+                grid = properties.get('gridProperties', {})
+                sheet = self.state.add_sheet(properties['title'], grid.get('rowCount', 1000),
+                                             grid.get('columnCount', 26))
+                replies.append({'addSheet': {'properties': sheet['properties']}})
+            elif 'updateSheetProperties' in request:
+                properties = request['updateSheetProperties']['properties']
+                sheet = self.state.sheet_by_id(properties['sheetId'])
+                sheet['properties']['gridProperties'].update(properties.get('gridProperties', {}))
+                replies.append({})
+            elif 'deleteSheet' in request:
+                self.state.remove_sheet(request['deleteSheet']['sheetId'])
+                replies.append({})
+            elif 'deleteDimension' in request:
+                span = request['deleteDimension']['range']
+                sheet = self.state.sheet_by_id(span['sheetId'])
+                del sheet['values'][span['startIndex']:span['endIndex']]
+                replies.append({})
+            else:
+                replies.append({})
+        return self._send(200, {'spreadsheetId': SPREADSHEET_ID, 'replies': replies})
+
+
+class FakeGoogleServer:
+    """Threaded local server answering Trends, Sheets and Drive requests"""
+
+    def __init__(self, state=None, host='127.0.0.1', port=0):
+        self.state = state or FakeGoogleState()
+        handler = type('Handler', (_Handler,), {'state': self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@contextmanager
+def redirect_google(base_url):
+    """
+    Send every requests call to Google hosts to base_url instead
+
+    Patches requests' HTTPAdapter.send, so it also covers pytrends' own
+    sessions and google-auth's AuthorizedSession used by gspread.
+    """
+    original_send = HTTPAdapter.send
+
+    def send(adapter, request, **kwargs):
+        for host in GOOGLE_HOSTS:
+            if request.url.startswith(host):
+                request.url = base_url + request.url[len(host):]
+                break
+        return original_send(adapter, request, **kwargs)
+
+    HTTPAdapter.send = send
+    try:
+        yield
+    finally:
+        HTTPAdapter.send = original_send
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Import-Time Budgets
+Measures the module import time of every CLI command in a fresh interpreter
+(python -X importtime, minus what the bare interpreter imports at startup) and
+fails when a command exceeds its budget or loads a heavy dependency it should
+not need
+
+Usage:
+    python3 benchmarks/import_budget.py
+    python3 benchmarks/import_budget.py --repeat 5 --json import_times.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+
+# Command -> (Python statement run after the imports are measured, budget in milliseconds)
+COMMANDS = {
+    'plan': ("import cli; cli.main(['plan', '--json'])", 40),
+    'diagnose': ("import cli; cli.main(['diagnose'])", 40),
+    'collect': ("import cli, main", 1500),
+    'related': ("import cli, related_extractor", 1500),
+}
+
+# Modules the light commands must not import
+HEAVY_MODULES = ['pandas', 'numpy', 'pyarrow', 'pytrends.request', 'gspread', 'requests']
+LIGHT_COMMANDS = ['plan', 'diagnose']
+
+
+def measure(statement, startup=()):
+    """
+    Import time of a statement in a fresh interpreter
+
+    Args:
+        startup (iterable): Top-level modules of interpreter startup, left out of the total
+
+    Returns:
+        tuple: (milliseconds spent importing, set of imported module names)
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=REPO_DIR,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    total_us = 0
+    modules = set()
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        modules.add(name.strip())
+        # Nested imports are indented, the cumulative times of top-level ones add up to the total
+        if not name[1:].startswith(' ') and name.strip() not in startup:
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import-time budgets of the CLI commands')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per command, the fastest counts')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    # Interpreter startup (site, encodings, .pth files) is not part of any command
+    startup = measure('pass')[1]
+    results = []
+    failed = 0
+    print(f"{'command':<10} {'import ms':>10} {'budget ms':>10}  ok")
+    for command, (statement, budget) in COMMANDS.items():
+        runs = [measure(statement, startup) for _ in range(args.repeat)]
+        milliseconds = min(ms for ms, _ in runs)
+        heavy = sorted(m for m in HEAVY_MODULES if m in runs[0][1]) if command in LIGHT_COMMANDS else []
+        ok = milliseconds <= budget and not heavy
+        failed += not ok
+        results.append({'command': command, 'import_ms': round(milliseconds, 1), 'budget_ms': budget,
+                        'heavy_modules': heavy, 'ok': ok})
+        print(f"{command:<10} {milliseconds:>10.1f} {budget:>10}  {'✅' if ok else '❌'}"
+              + (f" imports {', '.join(heavy)}" if heavy else ''))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.json}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmarks
+Runs GoogleTrendsCollector.run and GoogleTrendsRelatedExtractor.extract_related_data
+against the local fake Trends/Sheets server and reports wall time, throughput,
+API call counts and peak memory. The cron scenario runs both back to back
+with a shared response cache, like the two cron entries of a deployment
+
+Usage:
+    python3 benchmarks/run_benchmarks.py                      # all scenarios at 10, 100, 1000 keywords
+    python3 benchmarks/run_benchmarks.py --sizes 10 100 --scenarios collector
+    python3 benchmarks/run_benchmarks.py --trends-latency 0.05 --trends-429-rate 0.02 --sessions 4
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from fake_google import FakeGoogleServer, FakeGoogleState, redirect_google
+
+SCENARIOS = ['collector', 'related', 'cron']
+DATASETS_PER_KEYWORD = {'collector': 3, 'related': 2, 'cron': 5}
+COUNTRIES = {'Slovensko': 'SK', 'Česko': 'CZ', 'Global': ''}
+
+
+def benchmark_config(args):
+    """config.py overrides of a benchmark run"""
+    return {
+        'KEYWORDS': [f"benchmark keyword {index}" for index in range(args.size)],
+        'GEO_MAPPING': dict(list(COUNTRIES.items())[:args.countries]),
+        'TIMEFRAME': 'today 3-m',
+        # Pace limited by the fake server, not by the politeness settings
+        'RATE_LIMIT_REQUESTS_PER_MINUTE': args.rpm,
+        'RATE_LIMIT_MIN_PER_MINUTE': args.rpm,
+        'RATE_LIMIT_MAX_PER_MINUTE': args.rpm,
+        'RATE_LIMIT_BURST': 10,
+        'RATE_LIMIT_BACKOFF_BASE': args.backoff,
+        'RATE_LIMIT_MAX_BACKOFF': args.backoff * 8,
+        'BATCH_KEYWORDS': not args.no_batch,
+        # Both cron entries share the response cache (and so the locale) like a deployment opting into it
+        'CACHE_ENABLED': args.cache or args.worker == 'cron',
+        'RELATED_TRENDS_HL': None,
+        'RELATED_TRENDS_TZ': None,
+        'INCREMENTAL_INTEREST': False,
+        'STORAGE_ENABLED': True,
+        'SHEETS_SYNC': not args.no_sheets,
+        'SHEETS_WRITES_PER_MINUTE': args.rpm,
+        'CONCURRENT_SESSIONS': args.sessions,
+        'CONCURRENT_MAX_IN_FLIGHT': args.in_flight,
+        'TRENDS_PROXIES': [],
+        'SESSION_COOLDOWN': args.backoff,
+        'RELATED_STREAMING': args.streaming,
+        'SHEETS_LAYOUT': 'long' if args.long_layout else 'tabs',
+        'SHEETS_BATCH_WRITES': not args.direct_writes,
+        'SHEETS_BACKGROUND_WRITES': not args.sync_writes,
+    }
+
+
+def _anonymous_service_account(filename=None, **kwargs):
+    """gspread.service_account replacement that needs no credentials file"""
+    import gspread
+    from google.auth.credentials import AnonymousCredentials
+    return gspread.Client(AnonymousCredentials())
+
+
+def _run_collector():
+    import main
+    collector = main.GoogleTrendsCollector()
+    return collector.run()
+
+
+def _run_related():
+    import config
+    from credential_cache import CredentialCache
+    from data_store import TrendsDataStore
+    from rate_limiter import RateLimiter
+    from related_extractor import GoogleTrendsRelatedExtractor, rate_limit_settings
+    from response_cache import ResponseCache
+
+    cache = ResponseCache(config.CACHE_FILE, ttl=config.CACHE_TTL) if config.CACHE_ENABLED else None
+    credentials = CredentialCache(config.CREDENTIAL_CACHE_FILE) if config.CREDENTIAL_CACHE_FILE else None
+    extractor = GoogleTrendsRelatedExtractor(hl=config.TRENDS_HL, tz=config.TRENDS_TZ,
+                                             rate_limiter=RateLimiter(**rate_limit_settings()),
+                                             cache=cache, store=TrendsDataStore(config.STORAGE_DIR),
+                                             streaming=config.RELATED_STREAMING,
+                                             upload_chunk_rows=config.RELATED_UPLOAD_CHUNK_ROWS,
+                                             credentials=credentials)
+    if not extractor.initialize(connect_sheets=config.SHEETS_SYNC):
+        return False
+    results = extractor.extract_related_data(
+        keywords=config.KEYWORDS,
+        geo_mapping=config.GEO_MAPPING,
+        timeframe=config.TIMEFRAME,
+        sessions=config.CONCURRENT_SESSIONS,
+        max_in_flight=config.CONCURRENT_MAX_IN_FLIGHT,
+        pool_settings={'cooldown': config.SESSION_COOLDOWN}
+    )
+    if config.SHEETS_SYNC:
+        return extractor.save_to_sheets(results)
+    return results['success_count'] > 0
+
+
+def _run_cron():
+    """main.py followed by related_extractor.py, as scheduled by the cron entries"""
+    return _run_collector() and _run_related()
+
+
+def run_worker(args):
+    """Run one scenario in this process (started by run_scenario) and save its result as JSON"""
+    sys.path.insert(0, REPO_DIR)
+    import config
+    import gspread
+
+    for name, value in benchmark_config(args).items():
+        setattr(config, name, value)
+    gspread.service_account = _anonymous_service_account
+    # Import the collectors before the clock starts
+    import main
+    import related_extractor
+
+    runner = {'collector': _run_collector, 'related': _run_related, 'cron': _run_cron}[args.worker]
+    with open('benchmark.log', 'w') as log, redirect_google(args.server_url):
+        output = sys.stdout if args.show_output else log
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            ok = runner()
+        wall = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    with open('result.json', 'w') as f:
+        json.dump({'ok': bool(ok), 'wall': wall, 'peak_mb': peak_mb}, f)
+
+
+def run_scenario(server, scenario, size, args):
+    """
+    Run a scenario in a fresh interpreter against the running fake server
+
+    Each run gets its own process (clean imports, module state and peak memory)
+    and its own working directory (local store, job queue and cache files).
+    """
+    server.state.reset()
+    command = [sys.executable, os.path.abspath(__file__), '--worker', scenario, '--size', str(size),
+               '--server-url', server.url] + args.passthrough
+    workdir = tempfile.mkdtemp(prefix=f"trends-bench-{scenario}-{size}-")
+    process = subprocess.run(command, cwd=workdir, stderr=subprocess.PIPE, text=True)
+    result_file = os.path.join(workdir, 'result.json')
+    if process.returncode != 0 or not os.path.exists(result_file):
+        print(f"❌ {scenario} with {size} keywords failed (log in {workdir})")
+        print(process.stderr[-2000:])
+        return None
+
+    with open(result_file) as f:
+        result = json.load(f)
+    calls = dict(server.state.calls)
+    trends_calls = sum(count for endpoint, count in calls.items() if '/trends' in endpoint)
+    datasets = size * args.countries * DATASETS_PER_KEYWORD[scenario]
+    result.update({
+        'scenario': scenario,
+        'keywords': size,
+        'countries': args.countries,
+        'datasets_per_s': datasets / result['wall'] if result['wall'] else 0.0,
+        'trends_calls': trends_calls,
+        'sheets_calls': sum(calls.values()) - trends_calls,
+        'throttled': sum(server.state.throttled.values()),
+        'calls': calls,
+        'workdir': workdir,
+    })
+    return result
+
+
+def print_report(results):
+    """Print the results as a table"""
+    print(f"\n{'scenario':<10} {'keywords':>8} {'wall s':>8} {'sets/s':>8} {'trends':>7} "
+          f"{'sheets':>7} {'429s':>5} {'peak MB':>8}  ok")
+    for r in results:
+        print(f"{r['scenario']:<10} {r['keywords']:>8} {r['wall']:>8.2f} {r['datasets_per_s']:>8.1f} "
+              f"{r['trends_calls']:>7} {r['sheets_calls']:>7} {r['throttled']:>5} {r['peak_mb']:>8.0f}  "
+              f"{'✅' if r['ok'] else '❌'}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmarks of the Trends collectors')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000], help='Keyword counts')
+    parser.add_argument('--countries', type=int, default=1, choices=range(1, len(COUNTRIES) + 1))
+    parser.add_argument('--trends-latency', type=float, default=0.01, help='Seconds per Trends response')
+    parser.add_argument('--sheets-latency', type=float, default=0.01, help='Seconds per Sheets response')
+    parser.add_argument('--trends-429-rate', type=float, default=0.0, help='Share of Trends requests rejected with 429')
+    parser.add_argument('--sheets-429-rate', type=float, default=0.0, help='Share of Sheets requests rejected with 429')
+    parser.add_argument('--sessions', type=int, default=1, help='CONCURRENT_SESSIONS')
+    parser.add_argument('--in-flight', type=int, default=2, help='CONCURRENT_MAX_IN_FLIGHT')
+    parser.add_argument('--rpm', type=int, default=60000, help='Rate limiter pace in requests per minute')
+    parser.add_argument('--backoff', type=float, default=0.05, help='Seconds of the first 429 backoff')
+    parser.add_argument('--no-batch', action='store_true', help='One keyword per Trends payload')
+    parser.add_argument('--no-sheets', action='store_true', help='Local store only (SHEETS_SYNC = False)')
+    parser.add_argument('--cache', action='store_true', help='Enable the response cache')
+    parser.add_argument('--streaming', action='store_true', help='Streaming related extraction (RELATED_STREAMING)')
+    parser.add_argument('--long-layout', action='store_true', help="Consolidated tabs (SHEETS_LAYOUT = 'long')")
+    parser.add_argument('--direct-writes', action='store_true', help='One write per tab (SHEETS_BATCH_WRITES = False)')
+    parser.add_argument('--sync-writes', action='store_true',
+                        help='Write in the fetching thread (SHEETS_BACKGROUND_WRITES = False)')
+    parser.add_argument('--show-output', action='store_true', help='Show the collector output')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    parser.add_argument('--worker', choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--server-url', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    # Options the worker processes need to see as well
+    args.passthrough = ['--countries', str(args.countries), '--sessions', str(args.sessions),
+                        '--in-flight', str(args.in_flight), '--rpm', str(args.rpm), '--backoff', str(args.backoff)]
+    args.passthrough += [flag for flag, enabled in (('--no-batch', args.no_batch), ('--no-sheets', args.no_sheets),
+                                                    ('--cache', args.cache), ('--streaming', args.streaming),
+                                                    ('--long-layout', args.long_layout),
+                                                    ('--direct-writes', args.direct_writes),
+                                                    ('--sync-writes', args.sync_writes),
+                                                    ('--show-output', args.show_output))
+                         if enabled]
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.worker:
+        run_worker(args)
+        return
+
+    state = FakeGoogleState(trends_latency=args.trends_latency, sheets_latency=args.sheets_latency,
+                            trends_429_rate=args.trends_429_rate, sheets_429_rate=args.sheets_429_rate)
+    server = FakeGoogleServer(state).start()
+    print(f"🧪 Fake Google server on {server.url}")
+    results = []
+    failed = 0
+    try:
+        for size in args.sizes:
+            for scenario in args.scenarios:
+                print(f"⏳ {scenario} with {size} keywords...")
+                result = run_scenario(server, scenario, size, args)
+                if result is None:
+                    failed += 1
+                else:
+                    results.append(result)
+    finally:
+        server.stop()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.json}")
+    sys.exit(0 if not failed and all(r['ok'] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+HTTP Cassettes
+Records the raw Trends and Sheets HTTP responses of a run into a compressed
+cassette file and replays them through the unchanged collection code, with
+no network and no rate limit sleeps, so parsing and post-processing can be
+profiled and compared run after run without spending live requests
+"""
+
+import base64
+import gzip
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from rate_limiter import RateLimiter
+
+CASSETTE_VERSION = 1
+
+# Hosts whose traffic goes on the cassette; the OAuth token exchange is never recorded
+RECORDED_HOSTS = (
+    'https://trends.google.com',
+    'https://sheets.googleapis.com',
+    'https://www.googleapis.com',
+)
+
+# Headers describing the original transfer rather than the stored (decoded) body
+TRANSFER_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+
+# Settings pointing at local state, moved into the cassette run's own directory
+STATE_SETTINGS = ['STORAGE_DIR', 'JOB_QUEUE_FILE', 'INCREMENTAL_STATE_FILE', 'SCHEDULER_STATE_FILE',
+                  'SHARD_DIR', 'METRICS_DIR', 'METRICS_TEXTFILE_DIR', 'ANALYTICS_STATE_DIR']
+
+
+class CassetteMiss(requests.ConnectionError):
+    """A replayed run sent a request the cassette has no response for"""
+
+
+class VirtualClock:
+    """Monotonic clock that sleeping advances instantly, for rate limiters during a replay"""
+
+    def __init__(self):
+        self._offset = 0.0
+        self._lock = threading.Lock()
+        self.slept = 0.0
+
+    def __call__(self):
+        with self._lock:
+            return time.monotonic() + self._offset
+
+    def sleep(self, seconds):
+        with self._lock:
+            self._offset += max(0.0, seconds)
+            self.slept += max(0.0, seconds)
+
+
+def _key(request):
+    # Bodies are left out: Sheets writes carry collection timestamps that differ between runs
+    return f"{request.method} {request.url}"
+
+
+class Cassette:
+    """
+    Responses of one run, in request order per method and URL
+
+    A replay answers each request with the next recorded response of the
+    same method and URL (the last one again once they are used up), so runs
+    with concurrent sessions replay too.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize the cassette
+
+        Args:
+            path (str): Cassette file, gzip-compressed JSON lines
+        """
+        self.path = path
+        self.entries = []
+        self.misses = []
+        self._lock = threading.Lock()
+        self._queues = None
+
+    def load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get('version') != CASSETTE_VERSION:
+                raise ValueError(f"'{self.path}' is not a version {CASSETTE_VERSION} cassette")
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        self._queues = defaultdict(deque)
+        for entry in self.entries:
+            self._queues[entry['key']].append(entry)
+        return self
+
+    def save(self):
+        """Write the recorded responses atomically"""
+        tmp_path = f"{self.path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps({'version': CASSETTE_VERSION,
+                                'recorded_at': datetime.now().isoformat(timespec='seconds')}) + '\n')
+            for entry in self.entries:
+                f.write(json.dumps(entry) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def record(self, key, response):
+        headers = {name: value for name, value in response.headers.items()
+                   if name.lower() not in TRANSFER_HEADERS}
+        with self._lock:
+            self.entries.append({
+                'key': key,
+                'status': response.status_code,
+                'reason': response.reason,
+                'headers': headers,
+                'body': base64.b64encode(response.content).decode('ascii'),
+            })
+
+    def replay(self, adapter, request):
+        """Recorded response to a request, raises CassetteMiss when there is none"""
+        key = _key(request)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                self.misses.append(key)
+                raise CassetteMiss(f"no recorded response for {key}", request=request)
+            entry = queue.popleft() if len(queue) > 1 else queue[0]
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry['reason']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = base64.b64decode(entry['body'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = adapter
+        # pytrends reads the NID cookie of the explore page from the cookie jar
+        for name, value in _set_cookies(response.headers.get('Set-Cookie', '')):
+            response.cookies.set(name, value)
+        return response
+
+
+def _set_cookies(header):
+    """(name, value) pairs of a Set-Cookie header"""
+    pairs = []
+    for cookie in header.split(','):
+        name, sep, value = cookie.split(';')[0].strip().partition('=')
+        if sep and name and ' ' not in name:
+            pairs.append((name, value))
+    return pairs
+
+
+def _anonymous_service_account(filename=None, **kwargs):
+    """gspread client without credentials: replayed Sheets responses need no token"""
+    import gspread
+    from google.auth.credentials import AnonymousCredentials
+    return gspread.Client(AnonymousCredentials())
+
+
+def isolate_state(config, directory):
+    """
+    Point a configuration at fresh local state in directory
+
+    Recording and replaying from the same empty state makes both runs send
+    the same requests, and keeps cassette runs out of the real store, job
+    queue and metrics. The response and credential caches are switched off,
+    so every request reaches the network (or the cassette).
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name in STATE_SETTINGS:
+        if getattr(config, name, None):
+            setattr(config, name, os.path.join(directory, os.path.basename(os.path.normpath(getattr(config, name)))))
+    config.CACHE_ENABLED = False
+    config.CREDENTIAL_CACHE_FILE = None
+
+
+@contextmanager
+def recording(path):
+    """
+    Record the Google responses of the enclosed run into a cassette file
+
+    Yields:
+        Cassette: Filled while the run goes on, saved on exit (also after errors)
+    """
+    cassette = Cassette(path)
+    original_send = HTTPAdapter.send
+
+    def send(adapter, request, **kwargs):
+        # Taken before sending, transport adapters further down may rewrite the URL
+        key, recorded = _key(request), request.url.startswith(RECORDED_HOSTS)
+        response = original_send(adapter, request, **kwargs)
+        if recorded:
+            cassette.record(key, response)
+        return response
+
+    HTTPAdapter.send = send
+    try:
+        yield cassette
+    finally:
+        HTTPAdapter.send = original_send
+        cassette.save()
+        print(f"📼 Recorded {len(cassette.entries)} responses to '{path}'")
+
+
+@contextmanager
+def replaying(path):
+    """
+    Answer every HTTP request of the enclosed run from a cassette file
+
+    Nothing reaches the network, gspread authenticates without credentials
+    and rate limiters created inside run on a virtual clock, so their waits
+    and backoffs take no time.
+
+    Yields:
+        Cassette: Loaded cassette; misses lists requests it could not answer
+    """
+    import gspread
+
+    cassette = Cassette(path).load()
+    clock = VirtualClock()
+    original = (HTTPAdapter.send, RateLimiter.default_sleep, RateLimiter.default_clock, gspread.service_account)
+
+    def send(adapter, request, **kwargs):
+        return cassette.replay(adapter, request)
+
+    HTTPAdapter.send = send
+    RateLimiter.default_sleep = staticmethod(clock.sleep)
+    RateLimiter.default_clock = staticmethod(clock)
+    gspread.service_account = _anonymous_service_account
+    try:
+        yield cassette
+    finally:
+        HTTPAdapter.send = original[0]
+        RateLimiter.default_sleep = staticmethod(original[1])
+        RateLimiter.default_clock = staticmethod(original[2])
+        gspread.service_account = original[3]
+        print(f"📼 Replayed {len(cassette.entries)} recorded responses from '{path}' "
+              f"({clock.slept:.0f}s of rate limit waits skipped)")
+        if cassette.misses:
+            print(f"⚠️ {len(cassette.misses)} requests were not on the cassette, e.g. {cassette.misses[0]}")
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Google Trends Collector CLI
+One entry point for every command. Each command imports only what it needs,
+so checks and dry runs start without loading pandas, pytrends or gspread
+
+Usage:
+    python3 cli.py collect               # one sweep, like main.py
+    python3 cli.py collect --daemon      # resident scheduler, like main.py --daemon
+    python3 cli.py collect --projects    # every project of PROJECTS_DIR in one process
+    python3 cli.py collect --shard 2/4   # one shard of a sharded run, into the shared store
+    python3 cli.py collect --merge-shards 4  # write the finished shards to Google Sheets once
+    python3 cli.py related               # like related_extractor.py
+    python3 cli.py plan                  # dry run: batches, requests and time of a sweep
+    python3 cli.py plan --projects       # requests of a multi-project sweep vs. one run per project
+    python3 cli.py plan --shards 4       # work of every shard of a sharded run
+    python3 cli.py diagnose [--online] [--max-age 26]
+    python3 cli.py --config config_test plan
+    python3 cli.py --record run.cassette collect   # save the Trends/Sheets responses of a run
+    python3 cli.py --replay run.cassette collect   # rerun it offline from the saved responses
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from settings import CONFIG_ENV, config_name, load_config, load_projects, validate_config, validate_projects
+
+
+def cmd_collect(args, config):
+    import main
+    projects = (args.projects or config.PROJECTS_DIR) if args.projects is not None else None
+    return 0 if main.collect(daemon=args.daemon, projects=projects, shard=args.shard,
+                             merge_shards=args.merge_shards, run_id=args.run_id) else 1
+
+
+def cmd_related(args, config):
+    import related_extractor
+    related_extractor.main()
+    return 0
+
+
+def cmd_plan(args, config):
+    if args.projects is not None:
+        return _plan_projects(args, config, args.projects or config.PROJECTS_DIR)
+    if args.shards:
+        return _plan_shards(args, config, args.shards)
+    from planning import build_plan
+
+    problems = validate_config(config)
+    plan = build_plan(config)
+    if args.json:
+        print(json.dumps(dict(plan, config=config_name(), problems=problems), indent=2))
+        return 1 if problems else 0
+
+    for problem in problems:
+        print(f"⚠️ {problem}")
+    print(f"📋 Plan for '{config_name()}' ({plan['mode']})")
+    print(f"  {plan['keywords']} keywords x {plan['countries']} countries, "
+          f"{plan['batches']} payload batch(es) per country")
+    print(f"  Data sets: {', '.join(plan['datasets']) or 'none'}")
+    print(f"  ~{plan['requests']} Trends requests, ~{plan['minutes']} min at "
+          f"{config.RATE_LIMIT_REQUESTS_PER_MINUTE} req/min (before cache hits and resumed items)")
+    return 1 if problems else 0
+
+
+def _plan_projects(args, config, directory):
+    """Dry run of a multi-project sweep"""
+    from planning import build_projects_plan
+
+    try:
+        projects = load_projects(directory, config)
+    except OSError as e:
+        print(f"❌ Could not load projects from '{directory}': {e}")
+        return 1
+    problems = validate_projects(projects)
+    plan = build_projects_plan(config, projects)
+    if args.json:
+        print(json.dumps(dict(plan, config=config_name(), directory=directory, problems=problems), indent=2))
+        return 1 if problems else 0
+
+    for problem in problems:
+        print(f"⚠️ {problem}")
+    print(f"📋 Plan for {plan['projects']} projects in '{directory}' ({plan['timeframes']} timeframe(s))")
+    print(f"  {plan['pairs']} keyword/country pairs fetched once for all projects")
+    print(f"  ~{plan['requests']} Trends requests, ~{plan['minutes']} min at "
+          f"{config.RATE_LIMIT_REQUESTS_PER_MINUTE} req/min "
+          f"(one run per project: ~{plan['separate_requests']} requests)")
+    return 1 if problems else 0
+
+
+def _plan_shards(args, config, count):
+    """Dry run of a sharded sweep"""
+    from planning import build_shards_plan
+
+    problems = validate_config(config)
+    shards = build_shards_plan(config, count)
+    if args.json:
+        print(json.dumps({'config': config_name(), 'shards': shards, 'problems': problems}, indent=2))
+        return 1 if problems else 0
+
+    for problem in problems:
+        print(f"⚠️ {problem}")
+    unit = 'countries' if config.BATCH_KEYWORDS else 'keyword/country pairs'
+    print(f"📋 {count} shards of '{config_name()}' (placed by {unit})")
+    for shard in shards:
+        print(f"  {shard['shard']:>7}: {shard['pairs']} pairs in {shard['countries']} countries, "
+              f"~{shard['requests']} Trends requests")
+    return 1 if problems else 0
+
+
+def _last_run(config, script='collector'):
+    """Gauges of the last exported run of a script, None when it never exported"""
+    path = os.path.join(getattr(config, 'METRICS_DIR', None) or 'metrics', f"trends_{script}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return {entry['name']: entry['value'] for entry in json.load(f).get('gauges', [])}
+
+
+def cmd_diagnose(args, config):
+    print(f"🔍 Diagnostics for '{config_name()}'")
+    problems = validate_config(config)
+    for problem in problems:
+        print(f"  ❌ {problem}")
+    if not problems:
+        print("  ✅ Configuration is valid")
+
+    if os.path.exists(config.SERVICE_ACCOUNT_FILE):
+        try:
+            with open(config.SERVICE_ACCOUNT_FILE) as f:
+                print(f"  📧 Service account: {json.load(f).get('client_email', 'unknown')}")
+        except ValueError:
+            problems.append(f"Service account file '{config.SERVICE_ACCOUNT_FILE}' is not valid JSON")
+            print(f"  ❌ {problems[-1]}")
+
+    run = _last_run(config)
+    if run is None:
+        print("  ⚠️ No exported collector run yet")
+    else:
+        age_hours = (time.time() - run.get('last_run_timestamp_seconds', 0)) / 3600
+        outcome = 'succeeded' if run.get('run_success') else 'failed'
+        print(f"  📈 Last collector run {outcome} {age_hours:.1f} h ago")
+        if not run.get('run_success'):
+            problems.append('Last collector run failed')
+        if args.max_age is not None and age_hours > args.max_age:
+            problems.append(f"Last collector run is older than {args.max_age} h")
+            print(f"  ❌ {problems[-1]}")
+
+    if args.online:
+        try:
+            from pytrends.request import TrendReq
+            TrendReq(hl=config.TRENDS_HL, tz=config.TRENDS_TZ)
+            print("  ✅ Google Trends reachable")
+        except Exception as e:
+            problems.append(f"Google Trends: {e}")
+            print(f"  ❌ {problems[-1]}")
+        try:
+            import gspread
+            spreadsheet = gspread.service_account(filename=config.SERVICE_ACCOUNT_FILE).open(config.SPREADSHEET_NAME)
+            print(f"  ✅ Google Sheet reachable: {spreadsheet.url}")
+        except Exception as e:
+            problems.append(f"Google Sheets: {e!r}")
+            print(f"  ❌ {problems[-1]}")
+
+    return 1 if problems else 0
+
+
+COMMANDS = {'collect': cmd_collect, 'related': cmd_related, 'plan': cmd_plan, 'diagnose': cmd_diagnose}
+
+# Commands whose traffic can be recorded and replayed
+CASSETTE_COMMANDS = ('collect', 'related')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Google Trends data collector')
+    parser.add_argument('--config', help=f"Configuration module (default: ${CONFIG_ENV} or 'config')")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument('--record', metavar='FILE', help='Record the Google responses of a collect/related run')
+    cassette.add_argument('--replay', metavar='FILE', help='Replay a recorded run offline, without rate limit waits')
+    commands = parser.add_subparsers(dest='command', required=True)
+    collect = commands.add_parser('collect', help='Collect interest and related data (main.py)')
+    collect.add_argument('--daemon', action='store_true', help='Run the resident refresh scheduler')
+    collect.add_argument('--projects', nargs='?', const='', metavar='DIR',
+                         help='Collect every project of DIR (default: PROJECTS_DIR) in one process')
+    collect.add_argument('--shard', metavar='I/N', help='Collect only shard I of N into the shared store')
+    collect.add_argument('--merge-shards', type=int, metavar='N',
+                         help='Write the N finished shards of a run to Google Sheets (once per run)')
+    collect.add_argument('--run-id', help='Run of the shard or merge (default: today\'s date)')
+    commands.add_parser('related', help='Extract related topics and queries (related_extractor.py)')
+    plan = commands.add_parser('plan', aliases=['dry-run'], help='Show what a collect run would request')
+    plan.add_argument('--json', action='store_true', help='Print the plan as JSON')
+    plan.add_argument('--projects', nargs='?', const='', metavar='DIR',
+                      help='Plan a multi-project sweep of DIR (default: PROJECTS_DIR)')
+    plan.add_argument('--shards', type=int, metavar='N', help='Plan a run split into N shards')
+    diagnose = commands.add_parser('diagnose', help='Check configuration, credentials and the last run')
+    diagnose.add_argument('--online', action='store_true', help='Also connect to Google Trends and Sheets')
+    diagnose.add_argument('--max-age', type=float, help='Fail when the last collector run is older (hours)')
+    args = parser.parse_args(argv)
+    if args.command == 'dry-run':
+        args.command = 'plan'
+    if (args.record or args.replay) and args.command not in CASSETTE_COMMANDS:
+        parser.error(f"--record/--replay work with {' and '.join(CASSETTE_COMMANDS)} only")
+    return args
+
+
+def run_with_cassette(args, config):
+    """Run a command recording or replaying its Google traffic, from fresh local state"""
+    import cassette
+
+    if args.replay and not os.path.exists(args.replay):
+        print(f"❌ Cassette '{args.replay}' not found!")
+        return 1
+    directory = tempfile.mkdtemp(prefix='trends-cassette-')
+    cassette.isolate_state(config, directory)
+    print(f"📼 Local state of this run in '{directory}'")
+    if args.record:
+        with cassette.recording(args.record):
+            return COMMANDS[args.command](args, config)
+    # Throttled sessions of the recording come back at once
+    config.SESSION_COOLDOWN = 0
+    with cassette.replaying(args.replay) as tape:
+        code = COMMANDS[args.command](args, config)
+    return 1 if tape.misses else code
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.config:
+        # Also seen by main.py and related_extractor.py when they load their configuration
+        os.environ[CONFIG_ENV] = args.config
+    try:
+        config = load_config()
+    except ImportError:
+        print(f"❌ Configuration module '{config_name()}' not found!")
+        return 1
+    if args.record or args.replay:
+        return run_with_cassette(args, config)
+    return COMMANDS[args.command](args, config)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Concurrent Trends Collection
+Runs fetch jobs on several Trends sessions in parallel and hands the results
+to a single writer through a queue
+"""
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SessionQueue:
+    """Fixed set of sessions handed out in turn, with the checkout/checkin interface of SessionPool"""
+
+    def __init__(self, sessions):
+        self._queue = queue.Queue()
+        self._size = len(sessions)
+        for session in sessions:
+            self._queue.put(session)
+
+    def __len__(self):
+        return self._size
+
+    def checkout(self):
+        return self._queue.get()
+
+    def checkin(self, session):
+        self._queue.put(session)
+
+
+class ConcurrentRunner:
+    """
+    Bounded parallel execution of Trends fetch jobs
+
+    Every job checks a session out of the pool, so each one runs on its own
+    TrendReq instance with its own rate limiter (per-session pacing). The
+    limiters share one semaphore that caps the requests in flight across all
+    sessions. Results are put on a queue and handled by the calling thread
+    only, so Sheets, the local store and the incremental state are never
+    touched from more than one thread.
+    """
+
+    def __init__(self, sessions, workers=None):
+        """
+        Initialize the runner
+
+        Args:
+            sessions: List of ready-to-use sessions, or a pool with checkout()/checkin()
+                such as session_pool.SessionPool
+            workers (int): Worker threads (default and maximum: one per session)
+        """
+        if isinstance(sessions, (list, tuple)):
+            sessions = SessionQueue(sessions)
+        if not len(sessions):
+            raise ValueError('at least one session is required')
+        self.workers = min(workers or len(sessions), len(sessions))
+        self._sessions = sessions
+
+    def run(self, jobs, fetch, handle):
+        """
+        Fetch all jobs in parallel and handle each result as soon as it arrives
+
+        Args:
+            jobs (list): Job descriptions passed to fetch and handle
+            fetch (callable): fetch(session, job) -> result, runs in a worker thread
+            handle (callable): handle(job, result, error) runs in the calling thread;
+                error is the exception raised by fetch (result is None then)
+
+        Returns:
+            int: Number of jobs whose fetch succeeded
+        """
+        results = queue.Queue()
+
+        def work(job):
+            try:
+                session = self._sessions.checkout()
+            except Exception as e:
+                results.put((job, None, e))
+                return
+            try:
+                results.put((job, fetch(session, job), None))
+            except Exception as e:
+                results.put((job, None, e))
+            finally:
+                self._sessions.checkin(session)
+
+        succeeded = 0
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='trends')
+        try:
+            for job in jobs:
+                pool.submit(work, job)
+            for _ in range(len(jobs)):
+                job, result, error = results.get()
+                if error is None:
+                    succeeded += 1
+                handle(job, result, error)
+        except BaseException:
+            # Stop queued jobs; jobs already running finish their current request
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown(wait=True)
+        return succeeded
+
+
+def create_in_flight_limit(max_in_flight):
+    """Semaphore shared by the session rate limiters to cap concurrent requests"""
+    return threading.BoundedSemaphore(max(1, max_in_flight))
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Credential Cache
+Keeps the Trends NID cookies, the OAuth access token and the spreadsheet IDs
+of a run on disk until they expire, so the next run starts without the cookie
+fetch, token exchange and Drive search round trips
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class CredentialCache:
+    """
+    Small JSON file of credentials that outlive a run
+
+    Entries carry an expiry time (None = until they stop working) and are not
+    returned within margin seconds of it. Several processes may share the file:
+    every save merges the entries written by the others meanwhile. The file
+    holds bearer tokens, so it is created readable by its owner only.
+    """
+
+    def __init__(self, path, margin=300):
+        """
+        Initialize the cache
+
+        Args:
+            path (str): JSON file of the entries
+            margin (float): Seconds before expiry from which an entry is no longer used
+        """
+        self.path = path
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._deleted = set()
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def get(self, key):
+        """Cached value of a key, None when missing or (nearly) expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires = entry.get('expires')
+        if expires is not None and expires - self.margin <= time.time():
+            return None
+        return entry.get('value')
+
+    def set(self, key, value, expires=None):
+        """
+        Store a value
+
+        Args:
+            expires (float): Unix time the value stops being valid (None = no known expiry)
+        """
+        with self._lock:
+            self._entries[key] = {'value': value, 'expires': expires}
+            self._deleted.discard(key)
+            self._save()
+
+    def delete(self, key):
+        """Forget a value that turned out to be invalid"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._deleted.add(key)
+                self._save()
+
+    def _save(self):
+        """Merge with the file and write it atomically, dropping expired entries"""
+        entries = {key: entry for key, entry in self._load().items() if key not in self._deleted}
+        entries.update(self._entries)
+        now = time.time()
+        self._entries = {key: entry for key, entry in entries.items()
+                         if entry.get('expires') is None or entry['expires'] > now}
+        tmp_path = f"{self.path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def service_account(filename, credentials=None):
+    """
+    gspread client of a service account, with its cached OAuth access token
+
+    A valid cached token is installed on the credentials, so the first request
+    needs no token exchange. Call open_spreadsheet() (or save_token()) once
+    connected to cache a new token.
+    """
+    import gspread
+
+    gc = gspread.service_account(filename=filename)
+    auth = getattr(gc.http_client, 'auth', None)
+    email = getattr(auth, 'service_account_email', None)
+    if credentials is not None and email:
+        cached = credentials.get(f"oauth:{email}")
+        if cached:
+            auth.token = cached['token']
+            # google-auth compares expiry as naive UTC
+            auth.expiry = datetime.fromtimestamp(cached['expiry'], timezone.utc).replace(tzinfo=None)
+    return gc
+
+
+def save_token(gc, credentials):
+    """Cache the current OAuth access token of a client until it expires"""
+    auth = getattr(gc.http_client, 'auth', None)
+    email = getattr(auth, 'service_account_email', None)
+    if credentials is None or not email or not auth.token or auth.expiry is None:
+        return
+    expiry = auth.expiry.replace(tzinfo=timezone.utc).timestamp()
+    key = f"oauth:{email}"
+    cached = credentials.get(key)
+    if cached is None or cached['token'] != auth.token:
+        credentials.set(key, {'token': auth.token, 'expiry': expiry}, expires=expiry)
+
+
+def open_spreadsheet(gc, name, credentials=None, identity=''):
+    """
+    Open a spreadsheet by name, by its cached ID when known
+
+    Opening by ID skips the Drive search of gc.open(). The ID is looked up again
+    when the cached one no longer opens a spreadsheet of that name.
+
+    Args:
+        identity (str): Account the ID was resolved with, e.g. the service account file
+
+    Returns:
+        gspread.Spreadsheet; raises gspread.SpreadsheetNotFound like gc.open()
+    """
+    from gspread.exceptions import SpreadsheetNotFound
+
+    key = f"spreadsheet:{identity}:{name}"
+    spreadsheet_id = credentials.get(key) if credentials is not None else None
+    spreadsheet = None
+    if spreadsheet_id:
+        try:
+            spreadsheet = gc.open_by_key(spreadsheet_id)
+            if spreadsheet.title != name:
+                spreadsheet = None
+        except (SpreadsheetNotFound, PermissionError):
+            spreadsheet = None
+    if spreadsheet is None:
+        spreadsheet = gc.open(name)
+    if credentials is not None:
+        if spreadsheet.id != spreadsheet_id:
+            credentials.set(key, spreadsheet.id)
+        save_token(gc, credentials)
+    return spreadsheet
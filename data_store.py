@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Google Trends Local Data Store
+Partitioned Parquet tables for interest, interest by region, related topics and
+related queries, with Google Sheets as an optional downstream mirror
+"""
+
+import fcntl
+import os
+import sys
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Table name -> partition columns
+TABLES = {
+    'interest': ['Country', 'Keyword', 'Month'],
+    'related_topics': ['Country', 'Keyword', 'Month'],
+    'related_queries': ['Country', 'Keyword', 'Month'],
+    'interest_by_region': ['Country', 'Keyword', 'Month'],
+    'alerts': ['Month'],
+}
+
+# Files in a partition from which flush() merges them into one, so reads do not slow down run after run
+COMPACT_FILES = 8
+
+# Low-cardinality text columns stored as dictionary-encoded categoricals
+CATEGORICAL_COLUMNS = ['Keyword', 'Country', 'Geo_Code', 'Type', 'topic_type', 'Resolution', 'Alert']
+
+# Rows that describe the same observation; later collections replace earlier ones
+IDENTITY_COLUMNS = {
+    'interest': ['Country', 'Keyword', 'Date'],
+    'related_topics': ['Country', 'Keyword', 'Type', 'topic_mid'],
+    'related_queries': ['Country', 'Keyword', 'Type', 'query'],
+    'interest_by_region': ['Country', 'Keyword', 'Resolution', 'Geo_Code'],
+    'alerts': ['Country', 'Keyword', 'Alert', 'Item', 'Date'],
+}
+
+
+def _exact_floats(df):
+    """float32 columns as the numbers that were stored (72.36, not 72.36000061)"""
+    for column in df.columns[df.dtypes == 'float32']:
+        df[column] = pd.to_numeric(df[column].astype(str))
+    return df
+
+
+class TrendsDataStore:
+    """
+    Local columnar store, the primary sink for collected data
+
+    Rows are buffered per table and written in bulk by flush(), one Parquet file
+    per partition, under root/<table>/Country=../Keyword=../Month=../. Reads use
+    partition filters, so querying one keyword or country only touches its files.
+    A partition that collected compact_files files is merged back into one.
+    """
+
+    def __init__(self, root='trends_data', compact_files=COMPACT_FILES):
+        """
+        Initialize the store
+
+        Args:
+            root (str): Directory holding one sub-directory per table
+            compact_files (int): Files in a partition that trigger its compaction (0 = never)
+        """
+        self.root = root
+        self.compact_files = compact_files
+        self.collected_at = pd.Timestamp(datetime.now().replace(microsecond=0))
+        self._pending = {table: [] for table in TABLES}
+
+    def _table_path(self, table):
+        return os.path.join(self.root, table)
+
+    def add_interest(self, df, keyword, country_name, geo_code):
+        """Buffer a Date + keyword Interest Over Time frame as long-format rows"""
+        if df.empty:
+            return
+        rows = pd.DataFrame({
+            'Date': pd.to_datetime(df['Date']),
+            'Keyword': keyword,
+            'Country': country_name,
+            'Geo_Code': geo_code,
+            'Value': df[keyword].astype('float32'),
+        })
+        self._pending['interest'].append(rows)
+
+    def add_related(self, table, df, keyword, country_name, geo_code):
+        """Buffer a related topics/queries frame ('related_topics' or 'related_queries')"""
+        if df is None or df.empty:
+            return
+        rows = df.assign(Keyword=keyword, Country=country_name, Geo_Code=geo_code)
+        rows = rows.drop(columns=['Extracted_Date'], errors='ignore')
+        if 'value' in rows.columns:
+            rows['value'] = pd.to_numeric(rows['value'], errors='coerce').astype('float32')
+        self._pending[table].append(rows)
+
+    def add_region(self, df, country_name, resolution):
+        """
+        Buffer long-format Interest by Region rows (Keyword, Geo_Code, Geo_Name, Value)
+
+        Args:
+            country_name (str): Name of the payload geo the breakdown covers, e.g. 'Global'
+            resolution (str): Breakdown level, e.g. 'COUNTRY'
+        """
+        if df.empty:
+            return
+        rows = df.assign(Country=country_name, Resolution=resolution)
+        rows['Value'] = rows['Value'].astype('float32')
+        self._pending['interest_by_region'].append(rows)
+
+    def add_alerts(self, df):
+        """Buffer trend alerts (see analytics.py)"""
+        if not df.empty:
+            self._pending['alerts'].append(df)
+
+    def pending_rows(self):
+        """Rows buffered since the last flush"""
+        return sum(len(df) for frames in self._pending.values() for df in frames)
+
+    def _prepare(self, table, frames):
+        """Concatenate buffered frames and apply compact dtypes and partition columns"""
+        df = pd.concat(frames, ignore_index=True)
+        df['Collected_At'] = self.collected_at
+        month_source = df['Date'] if table == 'interest' else df['Collected_At']
+        df['Month'] = month_source.dt.strftime('%Y-%m')
+        for column in CATEGORICAL_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].astype(str).astype('category')
+        return df
+
+    def flush(self):
+        """
+        Write all buffered rows to disk in one bulk append per table
+
+        Returns:
+            dict: Rows written per table
+        """
+        written = {}
+        for table, frames in self._pending.items():
+            if not frames:
+                continue
+            df = self._prepare(table, frames)
+            files = []
+            pq.write_to_dataset(
+                pa.Table.from_pandas(df, preserve_index=False),
+                root_path=self._table_path(table),
+                partition_cols=TABLES[table],
+                basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                existing_data_behavior='overwrite_or_ignore',
+                # One partition per keyword/country/month can exceed pyarrow's default of 1024
+                max_partitions=max(1024, len(df)),
+                file_visitor=lambda written_file: files.append(written_file.path),
+            )
+            written[table] = len(df)
+            self._pending[table] = []
+            for directory in sorted({os.path.dirname(path) for path in files}):
+                self._compact(directory)
+        return written
+
+    def _compact(self, directory):
+        """
+        Merge the files of a partition into one once there are compact_files of them
+
+        Only the files present under the partition's lock are merged, so rows other
+        processes (e.g. shards) append meanwhile are kept; a partition another
+        process is compacting is left to it.
+        """
+        def partition_files():
+            names = [name for name in os.listdir(directory)
+                     if name.endswith('.parquet') and not name.startswith(('.', '_'))]
+            # Oldest first, so rows keep the order they were collected in
+            return sorted((os.path.join(directory, name) for name in names), key=os.path.getmtime)
+
+        if not self.compact_files or len(partition_files()) < self.compact_files:
+            return
+        with open(os.path.join(directory, '.compact.lock'), 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return
+            files = partition_files()
+            if len(files) < self.compact_files:
+                return
+            table = pa.concat_tables([pq.read_table(path) for path in files], promote_options='permissive')
+            name = uuid.uuid4().hex
+            # Readers skip dot files, so the merged rows only appear once complete
+            tmp_path = os.path.join(directory, f".part-{name}.tmp")
+            pq.write_table(table, tmp_path)
+            newest = os.path.getmtime(files[-1])
+            os.utime(tmp_path, (newest, newest))
+            os.replace(tmp_path, os.path.join(directory, f"part-{name}-0.parquet"))
+            for path in files:
+                os.remove(path)
+
+    def read(self, table, keyword=None, country=None, start=None, end=None, latest=True):
+        """
+        Read a table, pruning partitions by keyword/country
+
+        Args:
+            table (str): 'interest', 'interest_by_region', 'related_topics', 'related_queries' or 'alerts'
+            keyword (str): Only this keyword
+            country (str): Only this country name
+            start, end (str): Date range (interest: Date, related: Collected_At)
+            latest (bool): Keep only the most recent collection of each observation (not for 'alerts')
+
+        Returns:
+            DataFrame
+        """
+        path = self._table_path(table)
+        if not os.path.exists(path):
+            return pd.DataFrame()
+
+        filters = []
+        if keyword is not None:
+            filters.append(('Keyword', '=', keyword))
+        if country is not None:
+            filters.append(('Country', '=', country))
+        if start is not None:
+            # Months come from the filtered date column, so earlier months are not read at all
+            filters.append(('Month', '>=', pd.Timestamp(start).strftime('%Y-%m')))
+        df = pd.read_parquet(path, filters=filters or None)
+        if df.empty:
+            return df
+
+        date_column = 'Date' if table == 'interest' else 'Collected_At'
+        if start is not None:
+            df = df[df[date_column] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df[date_column] <= pd.Timestamp(end)]
+
+        if latest:
+            if table == 'interest':
+                identity = IDENTITY_COLUMNS[table]
+                df = df.sort_values('Collected_At').drop_duplicates(identity, keep='last')
+            else:
+                # Related lists and region breakdowns are snapshots: keep the newest collection per keyword/country
+                newest = df.groupby(['Country', 'Keyword'], observed=True)['Collected_At'].transform('max')
+                df = df[df['Collected_At'] == newest]
+        return df.drop(columns=['Month']).reset_index(drop=True)
+
+    def sheet_tabs(self):
+        """
+        Rebuild the per-keyword Google Sheets tabs from the latest stored data
+
+        Returns:
+            dict: Tab name -> DataFrame, in the layout written by main.py
+        """
+        tabs = {}
+        # Tables a run never wrote read back empty, without columns to group by
+        interest = self.read('interest')
+        if not interest.empty:
+            for (country, keyword), group in interest.groupby(['Country', 'Keyword'], observed=True):
+                df = group.sort_values('Date')[['Date', 'Value']].rename(columns={'Value': keyword})
+                tabs[f"{country}_{keyword}_Interest"] = _exact_floats(df.reset_index(drop=True))
+
+        for table, suffix in (('related_topics', 'Topics'), ('related_queries', 'Queries')):
+            related = self.read(table)
+            if related.empty:
+                continue
+            for (country, keyword), group in related.groupby(['Country', 'Keyword'], observed=True):
+                df = group.drop(columns=['Country', 'Geo_Code', 'Collected_At']).dropna(axis=1, how='all')
+                tabs[f"{country}_{keyword}_{suffix}"] = _exact_floats(df.reset_index(drop=True))
+
+        regions = self.read('interest_by_region')
+        if not regions.empty:
+            for country, group in regions.groupby('Country', observed=True):
+                df = group.sort_values(['Keyword', 'Value'], ascending=[True, False])
+                df = df[['Keyword', 'Geo_Code', 'Geo_Name', 'Value']]
+                tabs[f"{country}_Regional_Interest"] = _exact_floats(df.reset_index(drop=True))
+        return tabs
+
+    def long_tables(self):
+        """
+        The latest stored data as one long-format table per data set (see sheet_layout.py)
+
+        Returns:
+            dict: 'interest', 'related_topics', 'related_queries' -> DataFrame with
+                  Country and Keyword first, sorted by them; empty when never collected
+        """
+        tables = {}
+        interest = self.read('interest')
+        if not interest.empty:
+            interest = interest.sort_values(['Country', 'Keyword', 'Date'])
+            tables['interest'] = interest[['Country', 'Keyword', 'Date', 'Value']]
+        else:
+            tables['interest'] = interest
+
+        for table in ('related_topics', 'related_queries'):
+            related = self.read(table)
+            if not related.empty:
+                related = related.drop(columns=['Geo_Code', 'Collected_At']).dropna(axis=1, how='all')
+                first = ['Country', 'Keyword', 'Type']
+                related = related[first + [c for c in related.columns if c not in first]]
+                # Stable, so each list keeps its stored (ranked) order
+                related = related.sort_values(['Country', 'Keyword'], kind='stable')
+            tables[table] = related
+
+        for table, df in tables.items():
+            if not df.empty:
+                df = df.astype({'Country': str, 'Keyword': str})
+                tables[table] = _exact_floats(df.reset_index(drop=True))
+        return tables
+
+
+def main():
+    """Mirror the latest stored data to Google Sheets"""
+    from main import GoogleTrendsCollector, config
+
+    collector = GoogleTrendsCollector()
+    if not collector.initialize_google_sheets():
+        sys.exit(1)
+
+    store = TrendsDataStore(config.STORAGE_DIR)
+    if config.SHEETS_LAYOUT == 'long':
+        collector.store = store
+        print(f"💾 Syncing the consolidated layout from '{config.STORAGE_DIR}' to Google Sheets")
+        success = collector.write_long_layout()
+        collector.flush_sheets()
+        sys.exit(0 if success else 1)
+    tabs = store.sheet_tabs()
+    print(f"💾 Syncing {len(tabs)} tabs from '{config.STORAGE_DIR}' to Google Sheets")
+    written = sum(1 for tab_name, df in tabs.items() if collector.write_to_sheet(df, tab_name))
+    print(f"✅ Synced {written}/{len(tabs)} tabs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Shared Trends Fetch Engine
+Builds each Trends payload once and fetches Interest Over Time, Interest by
+Region, Related Topics and Related Queries from its widgets, for main.py and
+related_extractor.py alike
+"""
+
+import pandas as pd
+
+# Data sets the engine can fetch, named like the local store tables
+DATASETS = ('interest', 'related_topics', 'related_queries', 'interest_by_region')
+
+# Response cache kind of each data set
+CACHE_KINDS = {
+    'interest': 'interest_over_time',
+    'related_topics': 'related_topics',
+    'related_queries': 'related_queries',
+    'interest_by_region': 'interest_by_region',
+}
+
+
+def clean_interest_frame(df, complete_only=False):
+    """Turn a pytrends interest_over_time frame into a Date + keyword columns frame"""
+    if df.empty:
+        return pd.DataFrame()
+    if 'isPartial' in df.columns:
+        if complete_only:
+            df = df[~df['isPartial'].astype(bool)]
+        df = df.drop(columns=['isPartial'])
+    df = df.reset_index()
+    df.rename(columns={'date': 'Date'}, inplace=True)
+    return df
+
+
+def clean_region_frame(df):
+    """
+    Turn a pytrends interest_by_region frame into a Geo_Code + Geo_Name + keyword columns frame
+
+    Geos without a code (city resolution returns coordinates) are keyed by name.
+    """
+    if df.empty:
+        return pd.DataFrame()
+    df = df.reset_index().rename(columns={'geoName': 'Geo_Name', 'geoCode': 'Geo_Code'})
+    if 'Geo_Code' not in df.columns:
+        df['Geo_Code'] = df['Geo_Name']
+    df = df.drop(columns=['coordinates'], errors='ignore')
+    keywords = [c for c in df.columns if c not in ('Geo_Code', 'Geo_Name')]
+    return df[['Geo_Code', 'Geo_Name'] + keywords]
+
+
+def widget_keyword(widget):
+    """Keyword a related topics/queries widget belongs to, None if it cannot be told"""
+    try:
+        return widget['request']['restriction']['complexKeywordsRestriction']['keyword'][0]['value']
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+class TrendsFetcher:
+    """
+    One pytrends session's access to Trends data through a shared cache
+
+    Interest Over Time is cached per payload (its values are relative to the
+    keywords compared). Related topics and queries only depend on their own
+    keyword, so they are cached per keyword under the parameters of a
+    single-keyword payload: a keyword fetched in a batch by main.py is a cache
+    hit for related_extractor.py, and the other way round. A payload is built
+    only when something is missing from the cache, at most once for all data
+    sets, and only the widgets of missing keywords are requested.
+    """
+
+    def __init__(self, pytrends, rate_limiter, cache=None):
+        """
+        Initialize the engine
+
+        Args:
+            pytrends (TrendReq): Session used for all requests
+            rate_limiter (RateLimiter): Pacing of every request
+            cache (ResponseCache): Shared response cache (None = always fetch)
+        """
+        self.pytrends = pytrends
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self._payload = None
+        self._widgets = {}
+
+    def payload_params(self, keywords, geo_code, timeframe):
+        """Parameters identifying a Trends payload, also used as the cache key"""
+        return {
+            'keywords': list(keywords),
+            'geo': geo_code,
+            'timeframe': timeframe,
+            'cat': 0,
+            'gprop': '',
+            'hl': self.pytrends.hl,
+            'tz': self.pytrends.tz,
+        }
+
+    def _ensure_payload(self, keywords, geo_code, timeframe):
+        """Build the payload unless the current one already matches"""
+        params = self.payload_params(keywords, geo_code, timeframe)
+        if params == self._payload:
+            return
+        self._payload = None
+        # pytrends keeps the previous geo when given '' (worldwide), so clear it first
+        self.pytrends.geo = ''
+        self.rate_limiter.call(self.pytrends.build_payload, list(keywords), cat=0,
+                               timeframe=timeframe, geo=geo_code, gprop='')
+        self._payload = params
+        # Keep the full widget lists, requests for a subset of keywords narrow them down
+        self._widgets = {
+            'related_topics': list(self.pytrends.related_topics_widget_list),
+            'related_queries': list(self.pytrends.related_queries_widget_list),
+        }
+
+    def _cache_get(self, kind, keywords, geo_code, timeframe, **options):
+        if self.cache is None:
+            return None
+        return self.cache.get(kind, dict(self.payload_params(keywords, geo_code, timeframe), **options))
+
+    def _cache_set(self, kind, keywords, geo_code, timeframe, value, **options):
+        if self.cache is not None:
+            self.cache.set(kind, dict(self.payload_params(keywords, geo_code, timeframe), **options), value)
+
+    def fetch(self, keywords, geo_code, timeframe, datasets=DATASETS, skip=(), interest_kind=None,
+              resolution='COUNTRY', low_volume=False):
+        """
+        Fetch data sets of one payload
+
+        Args:
+            keywords (list): Keywords of the payload (at most five)
+            timeframe (str): Trends timeframe
+            datasets (iterable): Data sets to fetch, see DATASETS
+            skip (iterable): Keywords whose related data is not needed
+            interest_kind (str): Cache kind (and so TTL) of the interest result,
+                default 'interest_over_time'
+            resolution (str): Interest by Region breakdown of a worldwide (or US)
+                payload: 'COUNTRY', 'REGION', 'DMA' or 'CITY'; country payloads
+                are always broken down by subregion
+            low_volume (bool): Include low search volume geos in Interest by Region
+
+        Returns:
+            dict: 'interest' and 'interest_by_region' raw pytrends DataFrames,
+                  'related_topics' and 'related_queries' dicts of keyword ->
+                  {'top', 'rising'} and 'errors' dict of data set -> exception
+                  of a failed fetch
+        """
+        result = {'errors': {}}
+        for dataset in DATASETS:
+            if dataset not in datasets:
+                continue
+            try:
+                if dataset == 'interest':
+                    result[dataset] = self._fetch_interest(keywords, geo_code, timeframe,
+                                                           interest_kind or CACHE_KINDS['interest'])
+                elif dataset == 'interest_by_region':
+                    result[dataset] = self._fetch_region(keywords, geo_code, timeframe, resolution, low_volume)
+                else:
+                    wanted = [kw for kw in keywords if kw not in skip]
+                    result[dataset] = self._fetch_related(dataset, keywords, wanted, geo_code, timeframe)
+            except Exception as e:
+                result['errors'][dataset] = e
+        return result
+
+    def _fetch_interest(self, keywords, geo_code, timeframe, kind):
+        df = self._cache_get(kind, keywords, geo_code, timeframe)
+        if df is None:
+            self._ensure_payload(keywords, geo_code, timeframe)
+            df = self.rate_limiter.call(self.pytrends.interest_over_time)
+            self._cache_set(kind, keywords, geo_code, timeframe, df)
+        return df
+
+    def _fetch_region(self, keywords, geo_code, timeframe, resolution, low_volume):
+        """Interest by Region of a payload, one request for every geo of the breakdown"""
+        options = {'resolution': resolution, 'low_volume': low_volume}
+        kind = CACHE_KINDS['interest_by_region']
+        df = self._cache_get(kind, keywords, geo_code, timeframe, **options)
+        if df is None:
+            self._ensure_payload(keywords, geo_code, timeframe)
+            df = self.rate_limiter.call(self.pytrends.interest_by_region, resolution=resolution,
+                                        inc_low_vol=low_volume, inc_geo_code=True)
+            self._cache_set(kind, keywords, geo_code, timeframe, df, **options)
+        return df
+
+    def _fetch_related(self, dataset, keywords, wanted, geo_code, timeframe):
+        """Related data of the wanted keywords, one request per keyword missing from the cache"""
+        found = {}
+        missing = []
+        for keyword in wanted:
+            cached = self._cache_get(CACHE_KINDS[dataset], [keyword], geo_code, timeframe)
+            if cached is not None and keyword in cached:
+                found[keyword] = cached[keyword]
+            else:
+                missing.append(keyword)
+        if not missing:
+            return found
+
+        self._ensure_payload(keywords, geo_code, timeframe)
+        widgets = [w for w in self._widgets[dataset] if widget_keyword(w) in (None, *missing)]
+        if dataset == 'related_topics':
+            self.pytrends.related_topics_widget_list[:] = widgets
+            fetched = self.rate_limiter.call(self.pytrends.related_topics, cost=max(1, len(widgets)))
+        else:
+            self.pytrends.related_queries_widget_list[:] = widgets
+            fetched = self.rate_limiter.call(self.pytrends.related_queries, cost=max(1, len(widgets)))
+
+        # Stored the way a single-keyword payload returns it
+        for keyword in missing:
+            if keyword in fetched:
+                found[keyword] = fetched[keyword]
+                self._cache_set(CACHE_KINDS[dataset], [keyword], geo_code, timeframe, {keyword: fetched[keyword]})
+        return found
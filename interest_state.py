@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Incremental Interest Over Time State
+Remembers the last stored date (and recent values) of every keyword/geo series
+so runs only fetch the missing date range and append it
+"""
+
+import json
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+
+# Google Trends returns daily values only for windows shorter than ~270 days
+MAX_DAILY_WINDOW_DAYS = 269
+
+
+class InterestState:
+    """
+    Per (keyword, geo) record of the stored Interest Over Time history
+
+    For each series the state keeps the last stored date and the values of the
+    last `overlap_days` stored points. A new fetch reaches back over that overlap,
+    is rescaled so the overlapping points match the stored ones, and only the
+    points after the last stored date are appended.
+    """
+
+    def __init__(self, path='interest_state.json', overlap_days=14):
+        """
+        Load the state file
+
+        Args:
+            path (str): JSON state file path
+            overlap_days (int): Days re-fetched before the last stored date for rescaling
+        """
+        self.path = path
+        self.overlap_days = overlap_days
+        self.series = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.series = json.load(f)
+
+    @staticmethod
+    def _key(keyword, geo_code):
+        return f"{geo_code}|{keyword}"
+
+    def last_date(self, keyword, geo_code):
+        """Last stored date of a series, or None when nothing is stored yet"""
+        entry = self.series.get(self._key(keyword, geo_code))
+        return date.fromisoformat(entry['last_date']) if entry else None
+
+    def tail(self, keyword, geo_code):
+        """Stored tail values of a series by date (empty when nothing is stored yet)"""
+        entry = self.series.get(self._key(keyword, geo_code))
+        if entry is None:
+            return pd.Series(dtype=float)
+        return pd.Series(list(entry['tail'].values()), index=pd.to_datetime(list(entry['tail'].keys())), dtype=float)
+
+    def window_timeframe(self, keywords, geo_code, today=None):
+        """
+        Timeframe string covering the missing range of all keywords plus the overlap
+
+        Returns:
+            str: 'YYYY-MM-DD YYYY-MM-DD', or None if any keyword has no stored history
+        """
+        last_dates = [self.last_date(kw, geo_code) for kw in keywords]
+        if not last_dates or any(d is None for d in last_dates):
+            return None
+        today = today or date.today()
+        start = min(last_dates) - timedelta(days=self.overlap_days)
+        start = max(start, today - timedelta(days=MAX_DAILY_WINDOW_DAYS))
+        return f"{start.isoformat()} {today.isoformat()}"
+
+    def record(self, keyword, geo_code, df):
+        """Remember the tail of a fully written Date + keyword frame"""
+        if df.empty:
+            return
+        tail = df.sort_values('Date').tail(self.overlap_days)
+        self.series[self._key(keyword, geo_code)] = {
+            'last_date': pd.Timestamp(tail['Date'].iloc[-1]).date().isoformat(),
+            'tail': {
+                pd.Timestamp(d).date().isoformat(): float(v)
+                for d, v in zip(tail['Date'], tail[keyword])
+            }
+        }
+
+    def rescale_window(self, keyword, geo_code, df):
+        """
+        Rescale a freshly fetched window onto the stored history and return the new points
+
+        Args:
+            keyword (str): Keyword column in df
+            geo_code (str): Geo code of the series
+            df (DataFrame): Date + keyword frame covering the overlap and the new range
+
+        Returns:
+            DataFrame: Rows after the last stored date, on the stored scale
+        """
+        entry = self.series.get(self._key(keyword, geo_code))
+        if entry is None or df.empty:
+            return df
+
+        df = df[['Date', keyword]].copy()
+        dates = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d')
+        stored = pd.Series(entry['tail'], dtype=float)
+        overlap = dates.isin(stored.index)
+
+        new_total = df.loc[overlap, keyword].sum()
+        stored_total = stored[dates[overlap]].sum()
+        if new_total > 0 and stored_total > 0:
+            df[keyword] = (df[keyword] * (stored_total / new_total)).round(2)
+        else:
+            print(f"    ⚠️ No usable overlap for '{keyword}' ({geo_code or 'Global'}), appending unscaled values")
+
+        return df[dates > entry['last_date']]
+
+    def extend(self, keyword, geo_code, new_rows):
+        """Advance a series after its new rows were stored"""
+        entry = self.series.get(self._key(keyword, geo_code))
+        if entry is None:
+            self.record(keyword, geo_code, new_rows)
+            return
+        if new_rows.empty:
+            return
+        stored = pd.DataFrame({
+            'Date': pd.to_datetime(list(entry['tail'].keys())),
+            keyword: list(entry['tail'].values())
+        })
+        new_rows = new_rows[['Date', keyword]].assign(Date=pd.to_datetime(new_rows['Date']))
+        self.record(keyword, geo_code, pd.concat([stored, new_rows], ignore_index=True))
+
+    def save(self):
+        """Write the state file atomically"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.series, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Persistent Collection Job Queue
+Checkpoints every (country, keyword, dataset) work item in SQLite so an
+interrupted run resumes where it stopped instead of starting over
+"""
+
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Item statuses
+PENDING = 'pending'
+FETCHED = 'fetched'
+WRITTEN = 'written'
+FAILED = 'failed'
+
+
+class JobQueue:
+    """
+    Work items of one collection run with their checkpointed status
+
+    Items move from pending to fetched (the fetched data is stored with the
+    item, so a restart writes it without fetching again) to written. Items
+    whose fetch failed are retried by later restarts until max_attempts is
+    reached. A new run starts once every item is written or has used up its
+    attempts, or when the unfinished run is older than max_age seconds.
+    """
+
+    def __init__(self, path='job_queue.sqlite', max_attempts=3, max_age=12 * 3600):
+        """
+        Open (or create) the queue file
+
+        Args:
+            path (str): SQLite file path
+            max_attempts (int): Fetch attempts of an item before it is given up
+            max_age (float): Seconds after which an unfinished run is discarded instead of resumed
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.max_age = max_age
+        self.resumed = False
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    country TEXT NOT NULL,
+                    keyword TEXT NOT NULL,
+                    dataset TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    data BLOB,
+                    error TEXT,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (country, keyword, dataset)
+                )
+            ''')
+            conn.execute('CREATE TABLE IF NOT EXISTS run (id INTEGER PRIMARY KEY CHECK (id = 1), started REAL)')
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection that waits for other processes instead of failing on locks"""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _unfinished(self, conn):
+        return conn.execute(
+            'SELECT COUNT(*) FROM jobs WHERE status != ? AND NOT (status = ? AND attempts >= ?)',
+            (WRITTEN, FAILED, self.max_attempts)
+        ).fetchone()[0]
+
+    def start(self, items):
+        """
+        Resume the unfinished run or start a new one with the given work items
+
+        Args:
+            items (list): (country, keyword, dataset) tuples of this run
+
+        Returns:
+            bool: True when an unfinished run is resumed
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT started FROM run WHERE id = 1').fetchone()
+            self.resumed = bool(row and now - row[0] < self.max_age and self._unfinished(conn))
+            if not self.resumed:
+                conn.execute('DELETE FROM jobs')
+                conn.execute('INSERT OR REPLACE INTO run (id, started) VALUES (1, ?)', (now,))
+            # Items added to the configuration since the run started are simply new pending items
+            conn.executemany(
+                'INSERT OR IGNORE INTO jobs (country, keyword, dataset, status, updated) VALUES (?, ?, ?, ?, ?)',
+                [(country, keyword, dataset, PENDING, now) for country, keyword, dataset in items]
+            )
+            conn.execute('COMMIT')
+        return self.resumed
+
+    def status(self, country, keyword, dataset):
+        """Current status of an item and its attempts so far, (None, 0) if unknown"""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                'SELECT status, attempts FROM jobs WHERE country = ? AND keyword = ? AND dataset = ?',
+                (country, keyword, dataset)
+            ).fetchone()
+        return row if row else (None, 0)
+
+    def needs_fetch(self, country, keyword, dataset):
+        """True for items that are neither fetched, written nor out of attempts"""
+        status, attempts = self.status(country, keyword, dataset)
+        return status in (None, PENDING) or (status == FAILED and attempts < self.max_attempts)
+
+    def fetched_data(self, country, keyword, dataset):
+        """Data checkpointed by mark_fetched() for an item not yet written, or None"""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                'SELECT data FROM jobs WHERE country = ? AND keyword = ? AND dataset = ? AND status = ?',
+                (country, keyword, dataset, FETCHED)
+            ).fetchone()
+        return pickle.loads(row[0]) if row and row[0] is not None else None
+
+    def mark_fetched(self, entries):
+        """
+        Checkpoint fetched items together with their data
+
+        Args:
+            entries (list): (country, keyword, dataset, data) tuples
+        """
+        now = time.time()
+        rows = [(FETCHED, sqlite3.Binary(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)), now,
+                 country, keyword, dataset) for country, keyword, dataset, data in entries]
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                'UPDATE jobs SET status = ?, data = ?, error = NULL, updated = ? '
+                'WHERE country = ? AND keyword = ? AND dataset = ?', rows
+            )
+
+    def mark_written(self, items):
+        """Checkpoint (country, keyword, dataset) items as written and drop their stored data"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                'UPDATE jobs SET status = ?, data = NULL, updated = ? '
+                'WHERE country = ? AND keyword = ? AND dataset = ?',
+                [(WRITTEN, now, country, keyword, dataset) for country, keyword, dataset in items]
+            )
+
+    def mark_failed(self, country, keyword, dataset, error):
+        """Record a failed fetch; the item is retried by later restarts until max_attempts"""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, attempts = attempts + 1, error = ?, updated = ? '
+                'WHERE country = ? AND keyword = ? AND dataset = ?',
+                (FAILED, str(error), time.time(), country, keyword, dataset)
+            )
+
+    def counts(self):
+        """Number of items per status"""
+        with self._lock, self._connect() as conn:
+            return dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+    def summary(self):
+        """Short human readable statistics line"""
+        counts = self.counts()
+        return ", ".join(f"{counts.get(status, 0)} {status}" for status in (WRITTEN, FETCHED, PENDING, FAILED))
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Long-Range Daily Interest Over Time
+Fetches a multi-year range as overlapping daily windows (Trends only answers
+daily data for about 9 months per payload) and stitches them into one
+continuous daily series
+"""
+
+import numpy as np
+import pandas as pd
+
+from concurrent_collector import ConcurrentRunner
+from fetch_engine import clean_interest_frame
+
+# Windows ending this many days before today no longer change and are cached for long
+CLOSED_AFTER_DAYS = 7
+
+
+def plan_windows(start, end, window_days=270, overlap_days=60):
+    """
+    Split a date range into overlapping windows
+
+    Windows start every window_days - overlap_days days from start, so the
+    windows of a range stay the same when its end moves forward; only windows
+    reaching the new end are new.
+
+    Returns:
+        list: (first day, last day) Timestamp pairs
+    """
+    start = pd.Timestamp(start).normalize()
+    end = pd.Timestamp(end).normalize()
+    step = max(1, window_days - overlap_days)
+    windows = []
+    first = start
+    while not windows or windows[-1][1] < end:
+        windows.append((first, min(first + pd.Timedelta(days=window_days - 1), end)))
+        first += pd.Timedelta(days=step)
+    return windows
+
+
+def window_timeframe(first, last):
+    """Trends timeframe string of a date range"""
+    return f"{first:%Y-%m-%d} {last:%Y-%m-%d}"
+
+
+def stitch_windows(frames):
+    """
+    Chain overlapping window frames onto the scale of the first window
+
+    Each window is multiplied by the ratio of the previous (already rescaled)
+    window's total to its own total over the days they share. The ratio is
+    one number for all keywords, keeping the keywords of a payload comparable.
+    Days covered twice take the mean, and the result peaks at 100.
+
+    Args:
+        frames (list): Date + keyword column frames in date order
+
+    Returns:
+        DataFrame: Date column plus one column per keyword
+    """
+    frames = [df.set_index('Date').astype(float) for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+
+    factors = [1.0]
+    for index in range(1, len(frames)):
+        previous, current = frames[index - 1], frames[index]
+        overlap = previous.index.intersection(current.index)
+        previous_total = previous.loc[overlap].to_numpy().sum()
+        current_total = current.loc[overlap].to_numpy().sum()
+        if previous_total > 0 and current_total > 0:
+            factors.append(factors[-1] * previous_total / current_total)
+        else:
+            print(f"    ⚠️ Window {index + 1} has no overlapping data, left on its own scale")
+            factors.append(factors[-1])
+
+    scaled = pd.concat([df * factor for df, factor in zip(frames, factors)])
+    combined = scaled.groupby(level=0).mean()
+    return _normalise(combined)
+
+
+def calibrate_to_weekly(daily, weekly):
+    """
+    Correct the drift of a stitched daily series with the weekly series of the whole range
+
+    Every day is scaled so that the mean of its week matches the weekly value.
+    Weeks the weekly series cannot calibrate (no data, zero mean) use the
+    overall ratio of the two series.
+
+    Args:
+        daily (DataFrame): Stitched Date + keyword columns frame
+        weekly (DataFrame): Date + keyword columns frame with one row per week
+
+    Returns:
+        DataFrame: Calibrated Date + keyword columns frame
+    """
+    if daily.empty or weekly.empty:
+        return daily
+    daily = daily.set_index('Date').astype(float)
+    weekly = weekly.set_index('Date')[daily.columns].astype(float).sort_index()
+
+    # Week each day belongs to (the latest weekly point on or before it)
+    positions = weekly.index.searchsorted(daily.index, side='right') - 1
+    inside = positions >= 0
+    week_of_day = pd.Series(pd.NaT, index=daily.index)
+    week_of_day[inside] = weekly.index[positions[inside]]
+
+    week_means = daily[inside].groupby(week_of_day[inside].to_numpy()).mean()
+    week_factors = weekly.reindex(week_means.index) / week_means.replace(0, np.nan)
+    overall = weekly.to_numpy().sum() / max(week_means.to_numpy().sum(), 1e-9)
+    week_factors = week_factors.replace([np.inf, -np.inf], np.nan).fillna(overall)
+
+    day_factors = week_factors.reindex(week_of_day.to_numpy()).fillna(overall).to_numpy()
+    return _normalise(daily * day_factors)
+
+
+def _normalise(df):
+    peak = df.max().max()
+    if peak > 0:
+        df = df * (100.0 / peak)
+    df = df.round(2)
+    df.index.name = 'Date'
+    return df.reset_index()
+
+
+def fetch_long_range(fetchers, keywords, geo_code, start, end=None, window_days=270, overlap_days=60,
+                     calibrate=True, metrics=None):
+    """
+    Fetch a daily Interest Over Time series of any length
+
+    The windows (and the weekly overview used for calibration) are fetched in
+    parallel, one per fetcher at a time, each paced by its fetcher's rate
+    limiter. Windows that closed more than CLOSED_AFTER_DAYS ago are cached
+    as 'interest_window' entries, so extending the range only fetches the new
+    windows.
+
+    Args:
+        fetchers (list): fetch_engine.TrendsFetcher instances, one per session
+        keywords (list): Keywords of the payload
+        start, end: First and last day (end defaults to today)
+        window_days (int): Days per window (daily data needs at most ~270)
+        overlap_days (int): Days shared by neighbouring windows
+        calibrate (bool): Correct the stitched series with the weekly series of the whole range
+        metrics (RunMetrics): Receives the stitching time
+
+    Returns:
+        DataFrame: Date column plus one column per keyword; errors of any window propagate
+    """
+    end = pd.Timestamp(end).normalize() if end is not None else pd.Timestamp.today().normalize()
+    windows = plan_windows(start, end, window_days, overlap_days)
+    closed_before = pd.Timestamp.today().normalize() - pd.Timedelta(days=CLOSED_AFTER_DAYS)
+    jobs = [(index, first, last) for index, (first, last) in enumerate(windows)]
+    if calibrate and len(windows) > 1:
+        jobs.append((None, windows[0][0], end))
+
+    def fetch(fetcher, job):
+        index, first, last = job
+        kind = 'interest_window' if index is not None and last < closed_before else None
+        fetched = fetcher.fetch(keywords, geo_code, window_timeframe(first, last), ['interest'], interest_kind=kind)
+        if 'interest' in fetched['errors']:
+            raise fetched['errors']['interest']
+        return clean_interest_frame(fetched['interest'])
+
+    frames = {}
+    errors = []
+
+    def handle(job, result, error):
+        if error is not None:
+            errors.append(error)
+        else:
+            frames[job[0]] = result
+
+    ConcurrentRunner(list(fetchers)).run(jobs, fetch, handle)
+    if errors:
+        raise errors[0]
+
+    def stitch():
+        daily = stitch_windows([frames[index] for index in range(len(windows))])
+        if None in frames:
+            daily = calibrate_to_weekly(daily, frames[None])
+        return daily
+
+    if metrics is None:
+        return stitch()
+    with metrics.timer('postprocess', dataset='interest_stitch'):
+        return stitch()
@@ -5,59 +5,358 @@ Main script for collecting Google Trends data and writing to Google Sheets
 """
 
 import pandas as pd
-from pytrends.request import TrendReq
-import gspread
-from gspread_dataframe import set_with_dataframe
-from gspread.exceptions import SpreadsheetNotFound
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from interest_state import InterestState
+from data_store import TrendsDataStore
+from analytics import ALERTS_TAB, TrendAnalytics
+from sheet_writer import SheetWriteBuffer
+from write_pipeline import BackgroundWriter
+from sheet_layout import SHEETS_CELL_LIMIT, STALE_TAB_PATTERN, layout_cells, long_layout, select_pairs
+from concurrent_collector import ConcurrentRunner, create_in_flight_limit
+from session_pool import KeepAliveTrendReq, SessionPool
+from credential_cache import CredentialCache, open_spreadsheet, service_account
+from job_queue import JobQueue, FETCHED
+from metrics import RunMetrics
+from fetch_engine import TrendsFetcher, clean_interest_frame, clean_region_frame
+from long_range import fetch_long_range
+from scheduler import RefreshScheduler
+from planning import make_keyword_batches, enabled_datasets as configured_datasets
+from settings import config_name, load_config, scoped_path
+import copy
+import re
 import time
 import json
 import sys
 import os
 
-# Import configuration
+# Configuration module (config.py, or the module named by $TRENDS_CONFIG)
 try:
-    # Check if we're running from test_minimal
-    if 'test_minimal' in ' '.join(sys.argv):
-        try:
-            from config_test import *
-            print("📋 Using test configuration")
-        except ImportError:
-            from config import *
-            print("📋 Using default configuration")
-    else:
-        from config import *
+    config = load_config()
 except ImportError:
-    print("❌ Configuration file 'config.py' not found!")
+    print(f"❌ Configuration file '{config_name()}.py' not found!")
     print("Please create config.py file with your settings.")
     sys.exit(1)
 
 
+def _format_related(data, keyword):
+    """Combine the top/rising frames of one related topics/queries result"""
+    dfs = []
+    
+    # Top items
+    if data['top'] is not None and not data['top'].empty:
+        top_df = data['top'].copy()
+        top_df['Type'] = 'Top'
+        top_df['Keyword'] = keyword
+        dfs.append(top_df)
+    
+    # Rising items
+    if data['rising'] is not None and not data['rising'].empty:
+        rising_df = data['rising'].copy()
+        rising_df['Type'] = 'Rising'
+        rising_df['Keyword'] = keyword
+        dfs.append(rising_df)
+    
+    if dfs:
+        return pd.concat(dfs, ignore_index=True)
+    return pd.DataFrame()
+
+
+def _merge_batch_frames(frames):
+    """Join batch frames fetched for the same window into one Date + keyword columns frame"""
+    frames = [df.set_index('Date') for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    combined = pd.concat(frames, axis=1)
+    combined = combined.loc[:, ~combined.columns.duplicated()]
+    combined.index.name = 'Date'
+    return combined.reset_index()
+
+
+def rescale_to_anchor(frames, anchor, index='Date'):
+    """
+    Merge batch frames onto one common 0-100 scale using the shared anchor keyword
+    
+    Every batch is multiplied by the ratio of the anchor's total in the first
+    batch to its total in that batch, then the merged frame is renormalised so
+    its overall peak is 100.
+    
+    Args:
+        frames (list): Date (or other index column) + keyword column frames, one per batch
+        anchor (str): Keyword present in every frame
+        index (str): Column the batches are aligned on, e.g. 'Geo_Code' for region breakdowns
+    
+    Returns:
+        DataFrame: Index column plus one column per keyword
+    """
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    
+    reference_total = frames[0][anchor].sum()
+    scaled = []
+    for position, df in enumerate(frames):
+        df = df.set_index(index).astype(float)
+        if position > 0:
+            batch_total = df[anchor].sum()
+            if reference_total > 0 and batch_total > 0:
+                df = df * (reference_total / batch_total)
+            else:
+                print(f"    ⚠️ Anchor '{anchor}' has no data in batch {position + 1}, values left unscaled")
+            df = df.drop(columns=[anchor])
+        scaled.append(df)
+    
+    combined = pd.concat(scaled, axis=1)
+    peak = combined.max().max()
+    if peak > 0:
+        combined = combined * (100.0 / peak)
+    combined = combined.round(2)
+    combined.index.name = index
+    return combined.reset_index()
+
+
+def rescale_to_reference(df, anchor, reference):
+    """
+    Put a merged Date + keyword columns frame on the scale of the stored anchor series
+    
+    Every column is multiplied by the ratio of the stored anchor total to the
+    fetched anchor total over the dates both cover, so payloads fetched
+    separately stay comparable with each other and with the stored history.
+    
+    Args:
+        df (DataFrame): Date plus one column per keyword, the anchor included
+        anchor (str): Keyword whose stored series sets the scale
+        reference (Series): Stored anchor values by date
+    
+    Returns:
+        DataFrame: df on the stored scale (unchanged without a usable overlap)
+    """
+    if df.empty or anchor not in df.columns:
+        return df
+    dates = pd.to_datetime(df['Date'])
+    overlap = dates.isin(reference.index)
+    fetched_total = df.loc[overlap, anchor].sum()
+    stored_total = reference.reindex(dates[overlap]).sum()
+    if fetched_total <= 0 or stored_total <= 0:
+        print(f"    ⚠️ Anchor '{anchor}' has no usable stored overlap, values left on their own scale")
+        return df
+    
+    df = df.copy()
+    columns = [column for column in df.columns if column != 'Date']
+    df[columns] = (df[columns].astype(float) * (stored_total / fetched_total)).round(2)
+    return df
+
+
+def explode_regions(df, names):
+    """
+    Long-format Interest by Region rows of a Geo_Code + keyword columns frame
+    
+    Args:
+        df (DataFrame): One row per geo, one column per keyword
+        names (dict): Geo code -> geo name
+    
+    Returns:
+        DataFrame: Keyword, Geo_Code, Geo_Name, Value rows, strongest geos first
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['Keyword', 'Geo_Code', 'Geo_Name', 'Value'])
+    rows = df.melt(id_vars=['Geo_Code'], var_name='Keyword', value_name='Value')
+    rows['Geo_Name'] = rows['Geo_Code'].map(names)
+    rows = rows.sort_values(['Keyword', 'Value'], ascending=[True, False], kind='stable')
+    return rows[['Keyword', 'Geo_Code', 'Geo_Name', 'Value']].reset_index(drop=True)
+
+
+def rate_limit_settings(in_flight=None, metrics=None):
+    """RateLimiter arguments from configuration"""
+    return {
+        'requests_per_minute': config.RATE_LIMIT_REQUESTS_PER_MINUTE,
+        'min_per_minute': config.RATE_LIMIT_MIN_PER_MINUTE,
+        'max_per_minute': config.RATE_LIMIT_MAX_PER_MINUTE,
+        'burst': config.RATE_LIMIT_BURST,
+        'max_retries': config.RATE_LIMIT_MAX_RETRIES,
+        'backoff_base': config.RATE_LIMIT_BACKOFF_BASE,
+        'max_backoff': config.RATE_LIMIT_MAX_BACKOFF,
+        'in_flight': in_flight,
+        'metrics': metrics,
+    }
+
+
+def create_rate_limiter(metrics=None):
+    """Create the shared Trends rate limiter from configuration"""
+    return RateLimiter(**rate_limit_settings(metrics=metrics))
+
+
+def create_budget_limiter(metrics=None):
+    """Trends rate limiter of the daemon: SCHEDULER_REQUESTS_PER_HOUR spread evenly, never faster"""
+    pace = config.SCHEDULER_REQUESTS_PER_HOUR / 60.0
+    settings = rate_limit_settings(metrics=metrics)
+    settings.update(requests_per_minute=pace, min_per_minute=min(config.RATE_LIMIT_MIN_PER_MINUTE, pace),
+                    max_per_minute=pace, burst=1)
+    return RateLimiter(**settings)
+
+
+def create_session_pool(metrics=None, sessions=None, credentials=None):
+    """
+    Create the Trends session pool for concurrent runs from configuration
+    
+    One member per configured proxy, or CONCURRENT_SESSIONS (or sessions) direct
+    identities; all members share the CONCURRENT_MAX_IN_FLIGHT limit and the
+    credential cache of their NID cookies.
+    """
+    proxies = config.TRENDS_PROXIES or [None] * (sessions or config.CONCURRENT_SESSIONS)
+    return SessionPool(
+        proxies,
+        limiter_settings=rate_limit_settings(create_in_flight_limit(config.CONCURRENT_MAX_IN_FLIGHT), metrics),
+        cooldown=config.SESSION_COOLDOWN,
+        min_success_rate=config.SESSION_MIN_SUCCESS_RATE,
+        credentials=credentials,
+    )
+
+
+def create_response_cache():
+    """Create the shared on-disk response cache from configuration (None when disabled)"""
+    if not config.CACHE_ENABLED:
+        return None
+    return ResponseCache(config.CACHE_FILE, ttl=config.CACHE_TTL, max_bytes=config.CACHE_MAX_MB * 1024 * 1024)
+
+
+def create_credential_cache():
+    """Open the cache of cookies, OAuth tokens and spreadsheet IDs (None when disabled)"""
+    if not config.CREDENTIAL_CACHE_FILE:
+        return None
+    return CredentialCache(config.CREDENTIAL_CACHE_FILE)
+
+
+def create_interest_state(scope=None):
+    """Load the incremental Interest Over Time state (None when incremental mode is off)"""
+    if not config.INCREMENTAL_INTEREST:
+        return None
+    return InterestState(scoped_path(config.INCREMENTAL_STATE_FILE, scope),
+                         overlap_days=config.INCREMENTAL_OVERLAP_DAYS)
+
+
+def create_job_queue(scope=None):
+    """Open the persistent job queue from configuration (None when disabled)"""
+    if not config.JOB_QUEUE_ENABLED:
+        return None
+    return JobQueue(scoped_path(config.JOB_QUEUE_FILE, scope), max_attempts=config.JOB_MAX_ATTEMPTS,
+                    max_age=config.JOB_RESUME_MAX_AGE_HOURS * 3600)
+
+
+def enabled_datasets():
+    """Data sets switched on in the configuration, named like the local store tables"""
+    return configured_datasets(config)
+
+
+def create_scheduler():
+    """Refresh scheduler of every (country, keyword, data set) from configuration"""
+    items = {}
+    for country_name in config.GEO_MAPPING:
+        for keyword in config.KEYWORDS:
+            priorities = config.SCHEDULER_PRIORITIES
+            priority = priorities.get((keyword, country_name), priorities.get(keyword, 1))
+            for dataset in enabled_datasets():
+                interval = config.SCHEDULER_INTERVAL_HOURS.get(dataset, 24) * 3600
+                items[(country_name, keyword, dataset)] = (interval, priority)
+    return RefreshScheduler(items, config.SCHEDULER_STATE_FILE, retry_delay=config.SCHEDULER_RETRY_MINUTES * 60)
+
+
+def create_data_store(scope=None):
+    """Create the local data store from configuration (None when disabled)"""
+    if not config.STORAGE_ENABLED:
+        return None
+    return TrendsDataStore(scoped_path(config.STORAGE_DIR, scope))
+
+
+def create_trend_analytics(scope=None):
+    """Load the per-series trend analytics state (None when analytics or the store are off)"""
+    if not config.ANALYTICS_ENABLED or not config.STORAGE_ENABLED:
+        return None
+    return TrendAnalytics(scoped_path(config.ANALYTICS_STATE_DIR, scope), window=config.ANALYTICS_WINDOW,
+                          alpha=config.ANALYTICS_EWMA_ALPHA, spike_z=config.ANALYTICS_SPIKE_Z,
+                          min_value=config.ANALYTICS_MIN_VALUE, min_points=config.ANALYTICS_MIN_POINTS,
+                          breakout_percent=config.ANALYTICS_BREAKOUT_PERCENT,
+                          alert_days=config.ANALYTICS_ALERT_DAYS)
+
+
+def export_run_metrics(metrics, success):
+    """Finish the run metrics and write them where the configuration says"""
+    metrics.finish(success)
+    try:
+        for path in metrics.export(config.METRICS_DIR, config.METRICS_TEXTFILE_DIR):
+            print(f"📈 Metrics written to {path}")
+    except Exception as e:
+        print(f"⚠️ Could not export run metrics: {e}")
+
+
 class GoogleTrendsCollector:
     """Main class for collecting Google Trends data"""
     
-    def __init__(self):
+    def __init__(self, rate_limiter=None, cache=None, metrics=None, keywords=None, geo_mapping=None,
+                 timeframe=None, country_keywords=None, state_scope=None, sheets_sync=None):
+        """
+        Initialize the collector
+        
+        Args:
+            keywords, geo_mapping, timeframe: Scope of the run (default: the configuration's)
+            country_keywords (dict): Country name -> keywords collected there (default: all keywords everywhere)
+            state_scope (str): Suffix of the store, job queue and incremental state
+                paths, for runs that must not share them (None = configured paths)
+            sheets_sync (bool): Mirror to Google Sheets (default: SHEETS_SYNC)
+        """
+        self.keywords = list(config.KEYWORDS if keywords is None else keywords)
+        self.geo_mapping = dict(config.GEO_MAPPING if geo_mapping is None else geo_mapping)
+        self.timeframe = timeframe or config.TIMEFRAME
+        self.country_keywords = country_keywords
+        self.state_scope = state_scope
+        self.sheets_sync = config.SHEETS_SYNC if sheets_sync is None else sheets_sync
         self.pytrends = None
         self.spreadsheet = None
         self.gc = None
+        self.metrics = metrics or RunMetrics('collector')
+        self.rate_limiter = rate_limiter or create_rate_limiter(self.metrics)
+        self.cache = cache if cache is not None else create_response_cache()
+        self.credentials = create_credential_cache()
+        self.interest_state = create_interest_state(state_scope)
+        self.store = create_data_store(state_scope)
+        self.analytics = create_trend_analytics(state_scope)
+        self.sheet_buffer = None
+        self.sheet_pipeline = None
+        self.session_pool = None
+        self.job_queue = None
+        self._written = []
+        self.fetcher = None
+        self._long_range_fetchers = None
         
     def initialize_google_sheets(self):
         """Initialize connection to Google Sheets"""
+        # Imported here: runs without Sheets sync never load gspread
+        from gspread.exceptions import SpreadsheetNotFound
         try:
-            self.gc = gspread.service_account(filename=SERVICE_ACCOUNT_FILE)
+            self.gc = service_account(config.SERVICE_ACCOUNT_FILE, self.credentials)
             print("✅ Google Sheets authentication successful")
             
             try:
-                self.spreadsheet = self.gc.open(SPREADSHEET_NAME)
-                print(f"✅ Connected to Google Sheet: '{SPREADSHEET_NAME}'")
+                self.spreadsheet = open_spreadsheet(self.gc, config.SPREADSHEET_NAME, self.credentials,
+                                                    identity=config.SERVICE_ACCOUNT_FILE)
+                print(f"✅ Connected to Google Sheet: '{config.SPREADSHEET_NAME}'")
+                if config.SHEETS_BATCH_WRITES:
+                    self.sheet_buffer = SheetWriteBuffer(
+                        self.spreadsheet,
+                        flush_size=config.SHEETS_FLUSH_SIZE,
+                        writes_per_minute=config.SHEETS_WRITES_PER_MINUTE,
+                        diff=config.SHEETS_DIFF_SYNC,
+                        metrics=self.metrics
+                    )
                 return True
                 
             except SpreadsheetNotFound:
-                print(f"❌ Google Sheet '{SPREADSHEET_NAME}' not found")
+                print(f"❌ Google Sheet '{config.SPREADSHEET_NAME}' not found")
                 self._show_sheet_setup_help()
                 return False
                 
         except FileNotFoundError:
-            print(f"❌ Service account file '{SERVICE_ACCOUNT_FILE}' not found")
+            print(f"❌ Service account file '{config.SERVICE_ACCOUNT_FILE}' not found")
             print("Please add your service_account.json file to the project directory")
             return False
             
@@ -68,12 +367,12 @@ class GoogleTrendsCollector:
     def _show_sheet_setup_help(self):
         """Show help for setting up Google Sheet"""
         try:
-            with open(SERVICE_ACCOUNT_FILE, 'r') as f:
+            with open(config.SERVICE_ACCOUNT_FILE, 'r') as f:
                 data = json.load(f)
                 email = data.get('client_email', 'Unknown')
                 print(f"\n📧 Service Account Email: {email}")
                 print("\n🔗 To create and share Google Sheet:")
-                print("1. Create new Google Sheet named exactly:", SPREADSHEET_NAME)
+                print("1. Create new Google Sheet named exactly:", config.SPREADSHEET_NAME)
                 print("2. Share it with the email above")
                 print("3. Give 'Editor' permissions")
         except:
@@ -82,59 +381,54 @@ class GoogleTrendsCollector:
     def initialize_pytrends(self):
         """Initialize pytrends connection"""
         try:
-            self.pytrends = TrendReq(hl='en-US', tz=360)
+            self.pytrends = KeepAliveTrendReq(credentials=self.credentials, hl=config.TRENDS_HL, tz=config.TRENDS_TZ)
+            self.fetcher = TrendsFetcher(self.pytrends, self.rate_limiter, self.cache)
             print("✅ Google Trends connection initialized")
             return True
         except Exception as e:
             print(f"❌ Failed to initialize Google Trends: {e}")
             return False
     
-    def get_interest_over_time(self, keyword, geo_code):
+    def _fetch(self, dataset, keywords, geo_code, timeframe=None, skip=()):
+        """Fetch one data set of a payload through the fetch engine, errors propagate"""
+        fetched = self.fetcher.fetch(keywords, geo_code, timeframe or self.timeframe, [dataset], skip=skip)
+        if dataset in fetched['errors']:
+            raise fetched['errors'][dataset]
+        return fetched[dataset]
+    
+    def get_interest_over_time(self, keyword, geo_code, timeframe=None):
         """Get Interest Over Time data"""
+        return self.get_interest_over_time_batch([keyword], geo_code, timeframe)
+    
+    def get_interest_over_time_batch(self, batch, geo_code, timeframe=None):
+        """
+        Get Interest Over Time data for up to five keywords in one payload
+        
+        In incremental mode partial (still changing) points are left out so the
+        stored history only ever contains final values.
+        """
         try:
-            self.pytrends.build_payload([keyword], cat=0, timeframe=TIMEFRAME, geo=geo_code, gprop='')
-            df = self.pytrends.interest_over_time()
-            
-            if not df.empty:
-                if 'isPartial' in df.columns:
-                    df = df.drop(columns=['isPartial'])
-                df.reset_index(inplace=True)
-                df.rename(columns={'date': 'Date'}, inplace=True)
-                return df
-            return pd.DataFrame()
+            return self._fetch_interest(batch, geo_code, timeframe)
             
         except Exception as e:
             print(f"    ❌ Interest Over Time error: {e}")
             return pd.DataFrame()
     
+    def _fetch_interest(self, batch, geo_code, timeframe=None):
+        """Fetch a cleaned Interest Over Time frame, errors propagate"""
+        df = self._fetch('interest', batch, geo_code, timeframe)
+        with self.metrics.timer('postprocess', dataset='interest'):
+            return clean_interest_frame(df, complete_only=self.interest_state is not None)
+    
     def get_related_topics(self, keyword, geo_code):
         """Get Related Topics data"""
         try:
-            related_topics = self.pytrends.related_topics()
+            related_topics = self._fetch('related_topics', [keyword], geo_code)
             
-            if not related_topics or keyword not in related_topics:
+            if keyword not in related_topics:
                 return pd.DataFrame()
             
-            data = related_topics[keyword]
-            dfs = []
-            
-            # Top topics
-            if data['top'] is not None and not data['top'].empty:
-                top_df = data['top'].copy()
-                top_df['Type'] = 'Top'
-                top_df['Keyword'] = keyword
-                dfs.append(top_df)
-            
-            # Rising topics
-            if data['rising'] is not None and not data['rising'].empty:
-                rising_df = data['rising'].copy()
-                rising_df['Type'] = 'Rising'
-                rising_df['Keyword'] = keyword
-                dfs.append(rising_df)
-            
-            if dfs:
-                return pd.concat(dfs, ignore_index=True)
-            return pd.DataFrame()
+            return _format_related(related_topics[keyword], keyword)
             
         except Exception as e:
             print(f"    ❌ Related Topics error: {e}")
@@ -143,150 +437,1110 @@ class GoogleTrendsCollector:
     def get_related_queries(self, keyword, geo_code):
         """Get Related Queries data"""
         try:
-            related_queries = self.pytrends.related_queries()
+            related_queries = self._fetch('related_queries', [keyword], geo_code)
             
-            if not related_queries or keyword not in related_queries:
+            if keyword not in related_queries:
                 return pd.DataFrame()
             
-            data = related_queries[keyword]
-            dfs = []
-            
-            # Top queries
-            if data['top'] is not None and not data['top'].empty:
-                top_df = data['top'].copy()
-                top_df['Type'] = 'Top'
-                top_df['Keyword'] = keyword
-                dfs.append(top_df)
-            
-            # Rising queries
-            if data['rising'] is not None and not data['rising'].empty:
-                rising_df = data['rising'].copy()
-                rising_df['Type'] = 'Rising'
-                rising_df['Keyword'] = keyword
-                dfs.append(rising_df)
-            
-            if dfs:
-                return pd.concat(dfs, ignore_index=True)
-            return pd.DataFrame()
+            return _format_related(related_queries[keyword], keyword)
             
         except Exception as e:
             print(f"    ❌ Related Queries error: {e}")
             return pd.DataFrame()
     
-    def write_to_sheet(self, df, tab_name):
-        """Write DataFrame to Google Sheet tab"""
+    def write_to_sheet(self, df, tab_name, fit=False):
+        """
+        Write DataFrame to Google Sheet tab (queued when batched writes are on)
+        
+        Args:
+            fit (bool): Size the tab to exactly the data (no spare rows and columns)
+        """
         if df.empty:
             return False
+        
+        if self._in_background(tab_name, self.write_to_sheet, df, tab_name, fit=fit):
+            return True
+        
+        if self.sheet_buffer is not None:
+            self.sheet_buffer.write(df, tab_name, fit=fit)
+            return True
+        
+        import gspread
+        from gspread_dataframe import set_with_dataframe
+        try:
+            with self.metrics.timer('sheet_write', mode='direct'):
+                try:
+                    worksheet = self.spreadsheet.worksheet(tab_name)
+                    print(f"    📄 Tab '{tab_name}' found, clearing old data")
+                except gspread.WorksheetNotFound:
+                    print(f"    📄 Creating new tab '{tab_name}'")
+                    rows, cols = (len(df) + 1, len(df.columns)) if fit else (max(200, len(df) + 10), 20)
+                    worksheet = self.spreadsheet.add_worksheet(title=tab_name, rows=rows, cols=cols)
+                
+                worksheet.clear()
+                set_with_dataframe(worksheet, df, resize=fit)
+            self.metrics.count('sheet_tabs_written')
+            self.metrics.count('sheet_rows_written', len(df))
+            print(f"    ✅ Written {len(df)} rows to '{tab_name}'")
+            return True
             
+        except Exception as e:
+            print(f"    ❌ Failed to write to '{tab_name}': {e}")
+            return False
+    
+    def append_to_sheet(self, df, tab_name):
+        """Append DataFrame rows below the existing data of a Google Sheet tab"""
+        if df.empty:
+            return False
+        
+        if self._in_background(tab_name, self.append_to_sheet, df, tab_name):
+            return True
+        
+        if self.sheet_buffer is not None:
+            self.sheet_buffer.append(df, tab_name)
+            return True
+        
+        import gspread
         try:
             try:
                 worksheet = self.spreadsheet.worksheet(tab_name)
-                print(f"    📄 Tab '{tab_name}' found, clearing old data")
             except gspread.WorksheetNotFound:
-                print(f"    📄 Creating new tab '{tab_name}'")
-                worksheet = self.spreadsheet.add_worksheet(title=tab_name, rows=max(200, len(df) + 10), cols=20)
+                return self.write_to_sheet(df, tab_name)
             
-            worksheet.clear()
-            set_with_dataframe(worksheet, df)
-            print(f"    ✅ Written {len(df)} rows to '{tab_name}'")
+            values = [[str(value) for value in row] for row in df.itertuples(index=False)]
+            with self.metrics.timer('sheet_write', mode='append'):
+                worksheet.append_rows(values, value_input_option='USER_ENTERED')
+            self.metrics.count('sheet_tabs_written')
+            self.metrics.count('sheet_rows_written', len(df))
+            print(f"    ✅ Appended {len(df)} rows to '{tab_name}'")
             return True
             
         except Exception as e:
-            print(f"    ❌ Failed to write to '{tab_name}': {e}")
+            print(f"    ❌ Failed to append to '{tab_name}': {e}")
+            return False
+    
+    def _in_background(self, label, write, *args, on_success=None, **kwargs):
+        """
+        Hand a Sheets write to the background writer (SHEETS_BACKGROUND_WRITES)
+        
+        The write counts as failed when it returns False, raises, or a flush of
+        the tab buffer fails meanwhile.
+        
+        Args:
+            on_success (callable): Run on this thread once the write succeeded
+        
+        Returns:
+            bool: False when the write has to run here (no background writer, or already on its thread)
+        """
+        pipeline = self.sheet_pipeline
+        if pipeline is None or pipeline.in_writer_thread():
+            return False
+        buffer = self.sheet_buffer
+        
+        def task():
+            failed = buffer.tabs_failed if buffer is not None else 0
+            written = write(*args, **kwargs)
+            return written is not False and (buffer is None or buffer.tabs_failed == failed)
+        
+        pipeline.submit(task, label=label, on_success=on_success)
+        return True
+    
+    def start_sheet_pipeline(self):
+        """Start the background writer shared by every spreadsheet of the run"""
+        if not self.sheets_sync or not config.SHEETS_BACKGROUND_WRITES:
+            return
+        self.sheet_pipeline = BackgroundWriter(max_pending=config.SHEETS_WRITE_QUEUE_SIZE, metrics=self.metrics)
+        for writer in self.sheet_writers():
+            writer.sheet_pipeline = self.sheet_pipeline
+    
+    def finish_sheet_pipeline(self):
+        """
+        Wait for every background write and stop the writer
+        
+        Returns:
+            bool: False when a background write failed
+        """
+        pipeline = self.sheet_pipeline
+        if pipeline is None:
+            return True
+        success = pipeline.close()
+        self.sheet_pipeline = None
+        for writer in self.sheet_writers():
+            writer.sheet_pipeline = None
+        print(f"📤 Background writer: {pipeline.summary()}")
+        if not success:
+            print(f"❌ Failed Sheets writes: {', '.join(pipeline.errors[:10])}"
+                  + (f" and {len(pipeline.errors) - 10} more" if len(pipeline.errors) > 10 else ''))
+        return success
+    
+    def write_interest(self, df, keyword, country_name, geo_code, incremental=False):
+        """
+        Store one keyword's Interest Over Time series locally and in its *_Interest tab
+        
+        Args:
+            df (DataFrame): Date + keyword frame
+            incremental (bool): df is an overlapping window to rescale and append,
+                otherwise it replaces the whole tab
+        """
+        incremental = incremental and self.interest_state is not None
+        if incremental:
+            df = self.interest_state.rescale_window(keyword, geo_code, df)
+            if df.empty:
+                print(f"    📄 {keyword} ({country_name}) interest already up to date")
+                return True
+        
+        if self.store is not None:
+            self.store.add_interest(df, keyword, country_name, geo_code)
+        
+        def advance_state():
+            if self.interest_state is None:
+                return
+            if incremental:
+                self.interest_state.extend(keyword, geo_code, df)
+            else:
+                self.interest_state.record(keyword, geo_code, df)
+            self.interest_state.save()
+        
+        # The consolidated layout is rewritten from the store instead (see write_long_layout)
+        if self.sheets_sync and config.SHEETS_LAYOUT == 'tabs':
+            targets = self.sheet_targets(keyword, country_name, 'Interest')
+            if targets and (self.sheet_pipeline is not None
+                            or all(writer.sheet_buffer is not None for writer, _ in targets)):
+                # The state only advances once the queued rows are really written (to every target)
+                left = [len(targets)]
+                
+                def target_written():
+                    left[0] -= 1
+                    if not left[0]:
+                        advance_state()
+                
+                for writer, tab_name in targets:
+                    if writer.sheet_buffer is None:
+                        write = writer.append_to_sheet if incremental else writer.write_to_sheet
+                        writer._in_background(tab_name, write, df, tab_name, on_success=target_written)
+                        continue
+                    queue = writer.sheet_buffer.append if incremental else writer.sheet_buffer.write
+                    if writer.sheet_pipeline is None:
+                        queue(df, tab_name, on_written=target_written)
+                    else:
+                        writer._in_background(tab_name, queue, df, tab_name,
+                                              on_written=writer.sheet_pipeline.deferred(target_written))
+                return True
+            for writer, tab_name in targets:
+                written = (writer.append_to_sheet(df, tab_name) if incremental
+                           else writer.write_to_sheet(df, tab_name))
+                if not written:
+                    return False
+        
+        advance_state()
+        return True
+    
+    def write_related(self, kind, df, keyword, country_name, geo_code):
+        """
+        Store one keyword's related topics or queries locally and in its tab
+        
+        Args:
+            kind (str): 'related_topics' or 'related_queries'
+        """
+        if self.store is not None:
+            self.store.add_related(kind, df, keyword, country_name, geo_code)
+        if not self.sheets_sync or config.SHEETS_LAYOUT != 'tabs':
+            return True
+        suffix = 'Topics' if kind == 'related_topics' else 'Queries'
+        targets = self.sheet_targets(keyword, country_name, suffix)
+        return all([writer.write_to_sheet(df, tab_name) for writer, tab_name in targets])
+    
+    def keywords_for(self, country_name, keywords=None):
+        """Keywords collected in a country, out of keywords (default: the run's)"""
+        keywords = self.keywords if keywords is None else keywords
+        if self.country_keywords is None:
+            return list(keywords)
+        tracked = self.country_keywords.get(country_name, ())
+        return [keyword for keyword in keywords if keyword in tracked]
+    
+    def sheet_targets(self, keyword, country_name, suffix):
+        """
+        Spreadsheets showing one keyword's data set of a country
+        
+        Returns:
+            list: (collector writing the spreadsheet, tab name) pairs
+        """
+        return [(self, f"{country_name}_{keyword}_{suffix}")]
+    
+    def sheet_writers(self):
+        """Collectors writing a spreadsheet in this run"""
+        return [self]
+    
+    def sheet_scopes(self):
+        """
+        Keywords shown in each spreadsheet of the consolidated layout
+        
+        Returns:
+            list: (collector writing the spreadsheet, {(stored country, keyword): country name shown}) pairs
+        """
+        return [(self, {(country_name, keyword): country_name for country_name in self.geo_mapping
+                        for keyword in self.keywords_for(country_name)})]
+    
+    def flush_sheets(self):
+        """
+        Send the writes buffered for every spreadsheet
+        
+        Returns:
+            bool: False when a flush on this thread failed (its tabs stay queued);
+                  background flushes report through finish_sheet_pipeline()
+        """
+        success = True
+        for writer in self.sheet_writers():
+            buffer = writer.sheet_buffer
+            if buffer is None or writer._in_background('flush', buffer.flush):
+                continue
+            failed = buffer.tabs_failed
+            buffer.flush()
+            success = success and buffer.tabs_failed == failed
+        return success
+    
+    def write_long_layout(self):
+        """
+        Rewrite the consolidated tabs of every spreadsheet from the local store (SHEETS_LAYOUT = 'long')
+        
+        Each data set is one long-format table split into tabs of at most
+        SHEETS_LONG_TAB_ROWS rows, sized to their data, plus an Index tab with
+        the range of every keyword. The tab count grows with the data volume,
+        not with the number of keywords.
+        
+        Returns:
+            bool: True when every tab was written (or queued)
+        """
+        if not self.sheets_sync or config.SHEETS_LAYOUT != 'long' or self.store is None:
+            return True
+        self._flush_store()
+        with self.metrics.timer('postprocess', dataset='long_layout'):
+            tables = self.store.long_tables()
+        
+        success = True
+        for writer, pairs in self.sheet_scopes():
+            tabs = long_layout(select_pairs(tables, pairs), config.SHEETS_LONG_TAB_ROWS)
+            if not tabs:
+                continue
+            cells = layout_cells(tabs)
+            print(f"\n📑 Consolidated layout: {len(tabs)} tabs, {cells} cells")
+            if cells > SHEETS_CELL_LIMIT:
+                print(f"  ⚠️ Above the {SHEETS_CELL_LIMIT} cells Google Sheets allows per spreadsheet")
+            for tab_name, df in tabs.items():
+                success = writer.write_to_sheet(df, tab_name, fit=True) and success
+            success = writer.remove_stale_tabs(tabs) and success
+        return success
+    
+    def remove_stale_tabs(self, keep):
+        """Delete continuation tabs of the consolidated layout that are not in keep"""
+        if self._in_background('stale tabs', self.remove_stale_tabs, keep):
+            return True
+        if self.sheet_buffer is not None:
+            self.sheet_buffer.remove_stale(STALE_TAB_PATTERN)
+            return True
+        
+        try:
+            for worksheet in self.spreadsheet.worksheets():
+                if worksheet.title not in keep and re.fullmatch(STALE_TAB_PATTERN, worksheet.title):
+                    print(f"    🗑️ Deleting stale tab '{worksheet.title}'")
+                    self.spreadsheet.del_worksheet(worksheet)
+            return True
+        except Exception as e:
+            print(f"    ❌ Failed to delete stale tabs: {e}")
+            return False
+    
+    def run_analytics(self, pairs=None):
+        """
+        Update the trend statistics of the collected series and report new alerts (ANALYTICS_ENABLED)
+        
+        Spikes and breakouts are appended to the store's alerts table; the
+        Alerts tab shows those of the last ANALYTICS_ALERT_DAYS days.
+        
+        Args:
+            pairs (list): (country name, keyword) series to update (default: all of the run)
+        
+        Returns:
+            bool: True unless the analytics stage failed
+        """
+        if self.analytics is None or self.store is None:
+            return True
+        self._flush_store()
+        if pairs is None:
+            pairs = [(country_name, keyword) for country_name in self.geo_mapping
+                     for keyword in self.keywords_for(country_name)]
+        try:
+            with self.metrics.timer('postprocess', dataset='analytics'):
+                alerts = self.analytics.update(self.store, pairs)
+                self.store.add_alerts(alerts)
+                self.store.flush()
+                self.analytics.save()
+        except Exception as e:
+            print(f"  ⚠️ Trend analytics failed: {e}")
             return False
+        self.metrics.count('alerts', len(alerts))
+        kinds = ', '.join(f"{n} {kind}" for kind, n in alerts['Alert'].value_counts().items())
+        print(f"\n🔔 Trend alerts: {len(alerts)} new" + (f" ({kinds})" if kinds else ''))
+        return self.write_alerts_tab() if len(alerts) else True
+    
+    def write_alerts_tab(self):
+        """Rewrite the Alerts tab of every spreadsheet with the recent alerts from the store"""
+        if not self.sheets_sync or self.store is None:
+            return True
+        since = self.store.collected_at.normalize() - pd.Timedelta(days=config.ANALYTICS_ALERT_DAYS)
+        alerts = self.store.read('alerts', start=since, latest=False)
+        if alerts.empty:
+            return True
+        alerts = alerts.drop(columns=['Collected_At']).astype({'Country': str, 'Keyword': str, 'Alert': str})
+        success = True
+        for writer, pairs in self.sheet_scopes():
+            df = select_pairs({'alerts': alerts}, pairs)['alerts']
+            df = df.sort_values(['Date', 'Country', 'Keyword'], ascending=[False, True, True], kind='stable')
+            if not df.empty:
+                success = writer.write_to_sheet(df.reset_index(drop=True), ALERTS_TAB, fit=True) and success
+        return success
+    
+    def _interest_window(self, keywords, geo_code):
+        """Incremental timeframe for keywords, or None for a full TIMEFRAME (or long-range) fetch"""
+        if self.interest_state is None or config.LONG_RANGE_START:
+            return None
+        return self.interest_state.window_timeframe(keywords, geo_code)
     
     def collect_data_for_keyword(self, keyword, country_name, geo_code):
         """Collect all data for a specific keyword and country"""
         print(f"\n🔍 Processing: {keyword} ({country_name})")
         
-        success_count = 0
+        window = self._interest_window([keyword], geo_code)
+        if window:
+            print(f"  📅 Incremental window: {window}")
+        datasets = self._datasets_to_fetch([keyword], country_name)
+        result = self.fetch_batch([keyword], geo_code, window=window, datasets=datasets)
+        return self.write_batch_results([keyword], country_name, geo_code, [result], window=window)
+    
+    def _datasets_to_fetch(self, keywords, country_name, batch=None):
+        """
+        Data sets a batch of a country still has to fetch
+        
+        Without a job queue that is every enabled data set. Otherwise Interest
+        Over Time is fetched when any keyword of the country needs it (the batches
+        are rescaled together), related data when a keyword of the batch needs it.
+        """
+        datasets = enabled_datasets()
+        if self.job_queue is None:
+            return set(datasets)
+        batch = batch or keywords
+        needed = set()
+        if 'interest' in datasets and any(
+                self.job_queue.needs_fetch(country_name, kw, 'interest') for kw in keywords):
+            needed.add('interest')
+        for kind in ('related_topics', 'related_queries'):
+            if kind in datasets and any(self.job_queue.needs_fetch(country_name, kw, kind) for kw in batch):
+                needed.add(kind)
+        return needed
+    
+    def fetch_batch(self, batch, geo_code, skip=(), window=None, datasets=None):
+        """
+        Fetch Interest Over Time, Related Topics and Related Queries of one keyword batch
+        
+        Args:
+            batch (list): Keywords sharing one payload
+            skip (iterable): Keywords whose related data an earlier batch already fetched
+            window (str): Incremental timeframe, or None for TIMEFRAME
+            datasets (set): Data sets to fetch (default: all enabled ones)
+        
+        Returns:
+            dict: 'batch', 'interest' DataFrame, 'topics' and 'queries' dicts of
+                  keyword -> DataFrame, 'errors' dict of data set -> error message
+        """
+        datasets = set(enabled_datasets()) if datasets is None else datasets
+        result = {'batch': batch, 'interest': pd.DataFrame(), 'topics': {}, 'queries': {}, 'errors': {}}
+        if not datasets:
+            print("  ⏭️  Already collected")
+            return result
+        
+        # One payload serves every data set, except an incremental interest window
+        # and long-range interest (stitched from windows of its own)
+        timeframes = {}
+        fetched = {'errors': {}}
+        if config.LONG_RANGE_START and 'interest' in datasets:
+            print(f"  📡 Collecting interest since {config.LONG_RANGE_START}...")
+            try:
+                fetched['interest'] = self.fetch_long_range(batch, geo_code)
+            except Exception as e:
+                fetched['errors']['interest'] = e
+            datasets = datasets - {'interest'}
+        for dataset in sorted(datasets):
+            timeframe = window if dataset == 'interest' and window else self.timeframe
+            timeframes.setdefault(timeframe, []).append(dataset)
+        for timeframe, group in timeframes.items():
+            print(f"  📡 Collecting {', '.join(group)}...")
+            part = self.fetcher.fetch(batch, geo_code, timeframe, group, skip=skip)
+            fetched['errors'].update(part.pop('errors'))
+            fetched.update(part)
+        
+        for dataset, error in fetched['errors'].items():
+            result['errors'][dataset] = str(error)
+            self.metrics.count('fetch_errors', dataset=dataset)
+            print(f"    ❌ {dataset} error: {error}")
         
         # 1. Interest Over Time
-        if COLLECT_INTEREST_OVER_TIME:
-            print("  📈 Collecting Interest Over Time...")
-            df = self.get_interest_over_time(keyword, geo_code)
-            if not df.empty:
-                tab_name = f"{country_name}_{keyword}_Interest"
-                if self.write_to_sheet(df, tab_name):
-                    success_count += 1
+        if fetched.get('interest') is not None and config.LONG_RANGE_START:
+            result['interest'] = fetched['interest']
+            if result['interest'].empty:
+                print("    ⚠️ No Interest Over Time data for this batch")
+        elif fetched.get('interest') is not None:
+            with self.metrics.timer('postprocess', dataset='interest'):
+                result['interest'] = clean_interest_frame(fetched['interest'],
+                                                           complete_only=self.interest_state is not None)
+            if result['interest'].empty:
+                print("    ⚠️ No Interest Over Time data for this batch")
         
-        # Small delay between different data types
-        time.sleep(2)
+        # 2. Related Topics and Related Queries
+        for dataset, key in (('related_topics', 'topics'), ('related_queries', 'queries')):
+            if fetched.get(dataset) is None:
+                continue
+            with self.metrics.timer('postprocess', dataset=dataset):
+                for kw, data in fetched[dataset].items():
+                    result[key][kw] = _format_related(data, kw)
         
-        # 2. Related Topics
-        if COLLECT_RELATED_TOPICS:
-            print("  🏷️  Collecting Related Topics...")
-            df = self.get_related_topics(keyword, geo_code)
-            if not df.empty:
-                tab_name = f"{country_name}_{keyword}_Topics"
-                if self.write_to_sheet(df, tab_name):
-                    success_count += 1
+        return result
+    
+    def fetch_long_range(self, batch, geo_code):
+        """Daily Interest Over Time of a batch since LONG_RANGE_START, errors propagate"""
+        return fetch_long_range(self._long_range_sessions(), batch, geo_code, config.LONG_RANGE_START,
+                                window_days=config.LONG_RANGE_WINDOW_DAYS, overlap_days=config.LONG_RANGE_OVERLAP_DAYS,
+                                calibrate=config.LONG_RANGE_CALIBRATE, metrics=self.metrics)
+    
+    def _long_range_sessions(self):
+        """
+        Fetchers the windows of a long range are spread over
+        
+        Serial runs start a pool of LONG_RANGE_PARALLEL sessions for them on first
+        use. Concurrent runs already spread their jobs over the pool, so each
+        worker fetches its windows with its own session.
+        """
+        if self.session_pool is not None or config.LONG_RANGE_PARALLEL <= 1:
+            return [self.fetcher]
+        if self._long_range_fetchers is None:
+            pool = create_session_pool(self.metrics, sessions=config.LONG_RANGE_PARALLEL,
+                                       credentials=self.credentials)
+            if pool.warm_up(hl=config.TRENDS_HL, tz=config.TRENDS_TZ):
+                self._long_range_fetchers = [
+                    TrendsFetcher(m.trendreq(hl=config.TRENDS_HL, tz=config.TRENDS_TZ), m.rate_limiter, self.cache)
+                    for m in pool.members if not m.disabled]
+                print(f"  ⚡ {len(self._long_range_fetchers)} sessions fetch long-range windows")
+            else:
+                print("  ⚠️ Long-range sessions could not start, fetching windows serially")
+                self._long_range_fetchers = [self.fetcher]
+        return self._long_range_fetchers
+    
+    def _checkpoint_fetched(self, keywords, country_name, fresh, errors):
+        """
+        Decide what to write for every item and checkpoint it as fetched
         
-        time.sleep(2)
+        Args:
+            fresh (dict): (keyword, data set) -> freshly fetched DataFrame
+            errors (dict): (keyword, data set) -> error message of a failed fetch
         
-        # 3. Related Queries
-        if COLLECT_RELATED_QUERIES:
-            print("  🔍 Collecting Related Queries...")
-            df = self.get_related_queries(keyword, geo_code)
-            if not df.empty:
-                tab_name = f"{country_name}_{keyword}_Queries"
-                if self.write_to_sheet(df, tab_name):
+        Returns:
+            dict: (keyword, data set) -> DataFrame to write
+        """
+        items = {}
+        for keyword in keywords:
+            for dataset in enabled_datasets():
+                df = fresh.get((keyword, dataset))
+                if self.job_queue is not None:
+                    status, _ = self.job_queue.status(country_name, keyword, dataset)
+                    if status == FETCHED:
+                        # Fetched by an interrupted run, write that data instead
+                        df = self.job_queue.fetched_data(country_name, keyword, dataset)
+                    elif not self.job_queue.needs_fetch(country_name, keyword, dataset):
+                        continue
+                    elif (keyword, dataset) in errors:
+                        self.job_queue.mark_failed(country_name, keyword, dataset, errors[(keyword, dataset)])
+                        continue
+                    elif df is None or df.empty:
+                        # Nothing to write, the item is done
+                        self.job_queue.mark_written([(country_name, keyword, dataset)])
+                        continue
+                if df is not None and not df.empty:
+                    items[(keyword, dataset)] = df
+        
+        if self.job_queue is not None and items:
+            self.job_queue.mark_fetched([(country_name, kw, ds, df) for (kw, ds), df in items.items()])
+        return items
+    
+    def write_batch_results(self, keywords, country_name, geo_code, results, anchor=None, window=None,
+                            reference=None, due=None):
+        """
+        Merge the fetched batches of one country and write every keyword's data sets
+        
+        Args:
+            results (list): fetch_batch() results, first batch first
+            anchor (str): Keyword shared by all batches, None when there is nothing to rescale
+            window (str): Incremental timeframe the batches were fetched with
+            reference (Series): Stored anchor values by date to put the merged batches on
+            due (set): Only write these (keyword, data set) pairs (None = all)
+        
+        Returns:
+            int: Number of data sets written
+        """
+        frames = [r['interest'] for r in results if not r['interest'].empty]
+        fresh = {}
+        errors = {}
+        for r in results:
+            for kind, key in (('related_topics', 'topics'), ('related_queries', 'queries')):
+                for kw, df in r[key].items():
+                    fresh.setdefault((kw, kind), df)
+            for dataset, error in r['errors'].items():
+                for kw in r['batch']:
+                    errors.setdefault((kw, dataset), error)
+        if due is not None:
+            errors = {item: error for item, error in errors.items() if item in due}
+        
+        # Incremental windows are rescaled per keyword against the stored history instead
+        with self.metrics.timer('postprocess', dataset='interest_merge'):
+            if window or anchor is None:
+                interest = _merge_batch_frames(frames)
+            else:
+                interest = rescale_to_anchor(frames, anchor)
+                if reference is not None:
+                    interest = rescale_to_reference(interest, anchor, reference)
+            for keyword in keywords:
+                if keyword in interest.columns:
+                    fresh[(keyword, 'interest')] = interest[['Date', keyword]]
+        if due is not None:
+            fresh = {item: df for item, df in fresh.items() if item in due}
+        
+        items = self._checkpoint_fetched(keywords, country_name, fresh, errors)
+        
+        success_count = 0
+        for keyword in keywords:
+            datasets = [ds for ds in enabled_datasets() if (keyword, ds) in items]
+            if not datasets:
+                continue
+            print(f"\n💾 Writing: {keyword} ({country_name})")
+            for dataset in datasets:
+                df = items[(keyword, dataset)]
+                if dataset == 'interest':
+                    written = self.write_interest(df, keyword, country_name, geo_code,
+                                                  incremental=window is not None)
+                else:
+                    written = self.write_related(dataset, df, keyword, country_name, geo_code)
+                if written:
                     success_count += 1
+                    self._written.append((country_name, keyword, dataset))
+                    self.metrics.count('datasets_written', dataset=dataset)
+                    self.metrics.count('rows', len(df), dataset=dataset)
+                else:
+                    self.metrics.count('datasets_failed', dataset=dataset)
         
         return success_count
     
-    def run(self):
-        """Main execution method"""
+    def collect_data_for_country_batched(self, keywords, country_name, geo_code):
+        """Collect all data for a country using batched payloads with a shared anchor keyword"""
+        anchor = config.ANCHOR_KEYWORD or keywords[0]
+        batches = make_keyword_batches(keywords, anchor, config.BATCH_SIZE)
+        print(f"  📦 {len(keywords)} keywords in {len(batches)} batch(es), anchor: '{anchor}'")
+        
+        results = []
+        fetched = set()
+        window = self._interest_window(keywords, geo_code)
+        if window:
+            print(f"  📅 Incremental window: {window}")
+        
+        for index, batch in enumerate(batches):
+            print(f"\n🔍 Batch {index + 1}/{len(batches)}: {', '.join(batch)} ({country_name})")
+            datasets = self._datasets_to_fetch(keywords, country_name, batch)
+            results.append(self.fetch_batch(batch, geo_code, skip=set(fetched), window=window, datasets=datasets))
+            fetched.update(batch)
+        
+        return self.write_batch_results(keywords, country_name, geo_code, results, anchor, window)
+    
+    def collect_regional(self, keywords):
+        """
+        Collect Interest by Region of all keywords with one request per keyword batch
+        
+        The breakdown of one payload over REGION_GEO holds every country (or
+        subregion) at once, so it replaces a full payload per country. Batches
+        are rescaled onto one scale through the anchor keyword and written as a
+        single long-format table.
+        
+        Returns:
+            tuple: (data sets written, keywords attempted)
+        """
+        scope = next((name for name, code in self.geo_mapping.items() if code == config.REGION_GEO),
+                     config.REGION_GEO or 'Global')
+        anchor = config.ANCHOR_KEYWORD or keywords[0]
+        batches = make_keyword_batches(keywords, anchor, config.BATCH_SIZE)
+        print(f"\n🗺️  Interest by Region ({scope}, {config.REGION_RESOLUTION.lower()}): "
+              f"{len(keywords)} keywords in {len(batches)} request(s), anchor: '{anchor}'")
+        
+        frames = []
+        names = {}
+        for index, batch in enumerate(batches):
+            print(f"\n🔍 Batch {index + 1}/{len(batches)}: {', '.join(batch)}")
+            fetched = self.fetcher.fetch(batch, config.REGION_GEO, self.timeframe, ['interest_by_region'],
+                                         resolution=config.REGION_RESOLUTION,
+                                         low_volume=config.REGION_INCLUDE_LOW_VOLUME)
+            error = fetched['errors'].get('interest_by_region')
+            if error is not None:
+                print(f"    ❌ interest_by_region error: {error}")
+                self.metrics.count('fetch_errors', dataset='interest_by_region')
+                if index == 0:
+                    print("  ❌ Anchor batch failed, the other batches cannot be rescaled")
+                    return 0, len(keywords)
+                continue
+            with self.metrics.timer('postprocess', dataset='interest_by_region'):
+                df = clean_region_frame(fetched['interest_by_region'])
+                names.update(zip(df['Geo_Code'], df['Geo_Name']))
+                frames.append(df.drop(columns=['Geo_Name']))
+        
+        with self.metrics.timer('postprocess', dataset='interest_by_region_merge'):
+            combined = rescale_to_anchor(frames, anchor, index='Geo_Code')
+            worldwide = not config.REGION_GEO and config.REGION_RESOLUTION == 'COUNTRY'
+            if config.REGION_ONLY_MAPPED and worldwide and not combined.empty:
+                combined = combined[combined['Geo_Code'].isin([code for code in self.geo_mapping.values() if code])]
+            rows = explode_regions(combined, names)
+        
+        if rows.empty:
+            print("    ⚠️ No Interest by Region data")
+            return 0, len(keywords)
+        
+        if self.store is not None:
+            self.store.add_region(rows, scope, config.REGION_RESOLUTION)
+        written = self.write_to_sheet(rows, f"{scope}_Regional_Interest") if self.sheets_sync else True
+        self._flush_store()
+        
+        if not written:
+            self.metrics.count('datasets_failed', len(keywords), dataset='interest_by_region')
+            return 0, len(keywords)
+        success_count = rows['Keyword'].nunique()
+        self.metrics.count('datasets_written', success_count, dataset='interest_by_region')
+        self.metrics.count('rows', len(rows), dataset='interest_by_region')
+        print(f"  ✅ {len(rows)} geo rows for {success_count} keywords")
+        return success_count, len(keywords)
+    
+    def _flush_store(self):
+        """Bulk append buffered rows to the local store and checkpoint the written items"""
+        if self.store is not None:
+            written = self.store.flush()
+            if written:
+                print(f"  💾 Stored locally: {', '.join(f'{n} {t} rows' for t, n in written.items())}")
+        # Without a store, buffered and background Sheets writes only count once they are done
+        if self.store is not None or (self.sheet_pipeline is None and
+                                      all(writer.sheet_buffer is None for writer in self.sheet_writers())):
+            self._checkpoint_written()
+    
+    def _checkpoint_written(self):
+        """Mark items written since the last checkpoint as done in the job queue"""
+        if self.job_queue is not None and self._written:
+            self.job_queue.mark_written(self._written)
+        self._written = []
+    
+    def spawn_session(self, member):
+        """
+        Collector for a worker thread using a pool member's TrendReq session and
+        pacing, sharing cache, incremental state and store (workers only fetch, never write)
+        """
+        session = copy.copy(self)
+        session.rate_limiter = member.rate_limiter
+        session.pytrends = member.trendreq(hl=config.TRENDS_HL, tz=config.TRENDS_TZ)
+        session.fetcher = TrendsFetcher(session.pytrends, member.rate_limiter, self.cache)
+        session.sheet_buffer = None
+        return session
+    
+    def plan_jobs(self, keywords, geo_mapping):
+        """
+        Split a run into independent fetch jobs
+        
+        Batch mode gives one job per (batch, country); the batches of a country
+        form one group that is rescaled and written together once all arrived.
+        Otherwise every (keyword, country) is its own job and group.
+        """
+        jobs = []
+        for country_name, geo_code in geo_mapping.items():
+            country_keywords = self.keywords_for(country_name, keywords)
+            if config.BATCH_KEYWORDS:
+                anchor = config.ANCHOR_KEYWORD or country_keywords[0]
+                window = self._interest_window(country_keywords, geo_code)
+                batches = make_keyword_batches(country_keywords, anchor, config.BATCH_SIZE)
+                for index, batch in enumerate(batches):
+                    jobs.append({
+                        'group': (country_name, None), 'size': len(batches), 'index': index,
+                        'keywords': country_keywords, 'batch': batch, 'anchor': anchor, 'window': window,
+                        'skip': {anchor} if index else set(),
+                        'datasets': self._datasets_to_fetch(country_keywords, country_name, batch),
+                        'country': country_name, 'geo': geo_code
+                    })
+            else:
+                for keyword in country_keywords:
+                    jobs.append({
+                        'group': (country_name, keyword), 'size': 1, 'index': 0,
+                        'keywords': [keyword], 'batch': [keyword], 'anchor': None,
+                        'window': self._interest_window([keyword], geo_code), 'skip': set(),
+                        'datasets': self._datasets_to_fetch([keyword], country_name),
+                        'country': country_name, 'geo': geo_code
+                    })
+        return jobs
+    
+    def collect_concurrently(self, keywords, geo_mapping):
+        """
+        Collect all countries with CONCURRENT_SESSIONS parallel workers
+        
+        Workers take the healthiest idle member of the session pool for every
+        job; each member keeps the configured per-session pace and at most
+        CONCURRENT_MAX_IN_FLIGHT requests run at the same time. Writing happens
+        in this thread as soon as a country (or keyword) group is complete.
+        
+        Returns:
+            tuple: (data sets written, keyword/country pairs attempted), or None
+                   when no session could be started
+        """
+        pool = create_session_pool(self.metrics, credentials=self.credentials)
+        if not pool.warm_up(hl=config.TRENDS_HL, tz=config.TRENDS_TZ):
+            print("❌ Failed to initialize Google Trends sessions")
+            return None
+        self.session_pool = pool
+        sessions = {m.name: self.spawn_session(m) for m in pool.members if not m.disabled}
+        print(f"✅ Google Trends session pool initialized ({len(sessions)} sessions)")
+        
+        jobs = self.plan_jobs(keywords, geo_mapping)
+        workers = min(config.CONCURRENT_SESSIONS, len(sessions))
+        print(f"\n⚡ {len(jobs)} jobs on {workers} workers, {len(sessions)} sessions "
+              f"(max {config.CONCURRENT_MAX_IN_FLIGHT} requests in flight)")
+        
+        pending = {}
+        totals = {'success': 0, 'attempts': 0}
+        
+        def fetch(member, job):
+            print(f"\n🔍 Fetching: {', '.join(job['batch'])} ({job['country']}) via {member.name}")
+            session = sessions[member.name]
+            return session.fetch_batch(job['batch'], job['geo'], skip=job['skip'], window=job['window'],
+                                       datasets=job['datasets'])
+        
+        def handle(job, result, error):
+            if error is not None:
+                print(f"  ❌ Failed to fetch {', '.join(job['batch'])} ({job['country']}): {error}")
+                result = {'batch': job['batch'], 'interest': pd.DataFrame(), 'topics': {}, 'queries': {},
+                          'errors': {dataset: str(error) for dataset in job['datasets']}}
+            group = pending.setdefault(job['group'], {'results': [None] * job['size'], 'left': job['size']})
+            group['results'][job['index']] = result
+            group['left'] -= 1
+            if group['left']:
+                return
+            
+            del pending[job['group']]
+            try:
+                totals['success'] += self.write_batch_results(
+                    job['keywords'], job['country'], job['geo'], group['results'], job['anchor'], job['window'])
+            except Exception as e:
+                print(f"  ❌ Failed to write '{job['country']}': {e}")
+            totals['attempts'] += len(job['keywords'])
+            self._flush_store()
+        
+        runner = ConcurrentRunner(pool, workers=workers)
+        runner.run(jobs, fetch, handle)
+        return totals['success'], totals['attempts']
+    
+    def run(self, export_metrics=True):
+        """
+        Main execution method; run metrics are exported whatever the outcome
+        
+        Args:
+            export_metrics (bool): False when the caller exports metrics shared by several runs
+        """
+        success = False
+        try:
+            success = self._run()
+        finally:
+            # Writes queued before an error still reach the spreadsheet
+            self.finish_sheet_pipeline()
+            if export_metrics:
+                export_run_metrics(self.metrics, success)
+        return success
+    
+    def refresh_unit(self, country_name, keywords, due):
+        """
+        Fetch and write one scheduler work unit
+        
+        The keywords share one payload (with the anchor keyword in batch mode);
+        only the data sets due for some keyword are fetched, and only due items
+        are written. A fully fetched unit is put on the scale of the stored
+        anchor series, so units stay comparable with each other and with the
+        last full sweep.
+        
+        Args:
+            keywords (list): Due keywords of the country
+            due (set): (keyword, data set) pairs that are due
+        
+        Returns:
+            list: (country, keyword, data set) items written
+        """
+        # Only this unit's items are reported to the scheduler
+        self._written = []
+        geo_code = self.geo_mapping[country_name]
+        anchor = (config.ANCHOR_KEYWORD or self.keywords[0]) if config.BATCH_KEYWORDS else None
+        batches = make_keyword_batches(keywords, anchor, config.BATCH_SIZE) if anchor else [[kw] for kw in keywords]
+        unit_keywords = list(dict.fromkeys(kw for batch in batches for kw in batch))
+        window = self._interest_window(unit_keywords, geo_code)
+        related_due = {keyword for keyword, dataset in due if dataset != 'interest'}
+        
+        results = []
+        fetched = set()
+        for batch in batches:
+            print(f"\n🔍 {', '.join(batch)} ({country_name})")
+            datasets = {dataset for keyword, dataset in due if keyword in batch}
+            skip = fetched | (set(batch) - related_due)
+            results.append(self.fetch_batch(batch, geo_code, skip=skip, window=window, datasets=datasets))
+            fetched.update(batch)
+        
+        reference = self._anchor_reference(anchor, country_name, geo_code) if anchor and not window else None
+        self.write_batch_results(unit_keywords, country_name, geo_code, results,
+                                 anchor if len(batches) > 1 or reference is not None else None, window,
+                                 reference=reference, due=due)
+        written = list(self._written)
+        self._flush_store()
+        if written:
+            self.run_analytics(list(dict.fromkeys((country_name, keyword) for _, keyword, _ in written)))
+            self.write_long_layout()
+        self.flush_sheets()
+        return written
+    
+    def _anchor_reference(self, anchor, country_name, geo_code):
+        """Stored interest of the anchor keyword by date, or None when none is stored yet"""
+        reference = None
+        if self.store is not None:
+            df = self.store.read('interest', keyword=anchor, country=country_name)
+            if not df.empty:
+                reference = pd.Series(df['Value'].to_numpy(dtype=float), index=pd.to_datetime(df['Date']))
+        if reference is None and self.interest_state is not None:
+            reference = self.interest_state.tail(anchor, geo_code)
+        return reference if reference is not None and not reference.empty else None
+    
+    def run_daemon(self, max_units=None):
+        """
+        Resident scheduler mode: keep every item fresh within the request budget
+        
+        The Trends and Sheets sessions stay connected for the life of the
+        process. Work is taken from the refresh scheduler, stalest item first,
+        and every Trends request is paced to SCHEDULER_REQUESTS_PER_HOUR. Run
+        metrics are exported after every unit.
+        
+        Args:
+            max_units (int): Stop after this many work units (None = run until interrupted)
+        
+        Returns:
+            bool: False when the connections could not be set up
+        """
+        print("🚀 Google Trends Scheduler Daemon")
+        print("=" * 40)
+        if config.REGIONAL_MODE or config.CONCURRENT_SESSIONS > 1 or config.TRENDS_PROXIES:
+            print("⚠️ The daemon runs one direct session; REGIONAL_MODE, CONCURRENT_SESSIONS and TRENDS_PROXIES are ignored")
+        if config.SHEETS_LAYOUT == 'long' and self.store is None:
+            print("❌ SHEETS_LAYOUT = 'long' is built from the local store, enable STORAGE_ENABLED")
+            return False
+        if self.sheets_sync and not self.initialize_google_sheets():
+            return False
+        if not self.initialize_pytrends():
+            return False
+        self.start_sheet_pipeline()
+        
+        scheduler = create_scheduler()
+        max_keywords = config.BATCH_SIZE - 1 if config.BATCH_KEYWORDS else 1
+        print(f"📅 {scheduler.summary()}, budget {config.SCHEDULER_REQUESTS_PER_HOUR} requests/hour")
+        
+        units = 0
+        try:
+            while max_units is None or units < max_units:
+                wait = scheduler.seconds_until_due()
+                if wait > 0:
+                    time.sleep(min(wait, config.SCHEDULER_IDLE_SECONDS))
+                    continue
+                
+                country_name, keywords, due = scheduler.next_unit(max_keywords)
+                due_items = {(country_name, keyword, dataset) for keyword, dataset in due}
+                try:
+                    written = self.refresh_unit(country_name, keywords, due)
+                except Exception as e:
+                    print(f"  ❌ Failed to refresh {', '.join(keywords)} ({country_name}): {e}")
+                    written = []
+                scheduler.mark_refreshed(written)
+                scheduler.mark_failed(due_items - set(written))
+                scheduler.save()
+                units += 1
+                
+                export_run_metrics(self.metrics, bool(written) and not due_items - set(written))
+                print(f"📅 {scheduler.summary()} | {self.rate_limiter.summary()}")
+        except KeyboardInterrupt:
+            print("\n🛑 Scheduler stopped")
+        
+        self.flush_sheets()
+        self.finish_sheet_pipeline()
+        self._flush_store()
+        return True
+    
+    def _run(self):
+        """Connect, collect and write everything (see run)"""
         print("🚀 Google Trends Data Collector")
         print("=" * 40)
         
-        # Initialize connections
-        if not self.initialize_google_sheets():
+        # Initialize connections (Sheets only when mirroring to it)
+        if config.SHEETS_LAYOUT == 'long' and self.store is None:
+            print("❌ SHEETS_LAYOUT = 'long' is built from the local store, enable STORAGE_ENABLED")
+            return False
+        if self.sheets_sync and not self.initialize_google_sheets():
             return False
             
-        if not self.initialize_pytrends():
+        # Concurrent and proxied runs use the session pool instead (regional runs are a few requests)
+        concurrent = (config.CONCURRENT_SESSIONS > 1 or bool(config.TRENDS_PROXIES)) and not config.REGIONAL_MODE
+        if not concurrent and not self.initialize_pytrends():
             return False
+        self.start_sheet_pipeline()
         
         print(f"\n📊 Configuration:")
-        print(f"  Keywords: {', '.join(KEYWORDS)}")
-        print(f"  Countries: {', '.join(GEO_MAPPING.keys())}")
-        print(f"  Timeframe: {TIMEFRAME}")
-        print(f"  Request delay: {REQUEST_DELAY}s")
+        print(f"  Keywords: {', '.join(self.keywords)}")
+        if config.REGIONAL_MODE:
+            print(f"  Regional mode: {config.REGION_GEO or 'worldwide'} by {config.REGION_RESOLUTION.lower()}")
+        else:
+            print(f"  Countries: {', '.join(self.geo_mapping.keys())}")
+        print(f"  Timeframe: {self.timeframe}")
+        print(f"  Rate limit: {config.RATE_LIMIT_REQUESTS_PER_MINUTE} req/min "
+              f"(adaptive {config.RATE_LIMIT_MIN_PER_MINUTE}-{config.RATE_LIMIT_MAX_PER_MINUTE})")
+        batch_mode = f"on ({config.BATCH_SIZE} keywords/payload)" if config.BATCH_KEYWORDS else 'off'
+        print(f"  Batch mode: {batch_mode}")
+        background = ' (background writer)' if self.sheet_pipeline is not None else ''
+        print(f"  Local store: {self.store.root if self.store is not None else 'off'}, "
+              f"Sheets sync: {'on' + background if self.sheets_sync else 'off'}")
+        print(f"  Sessions: {config.CONCURRENT_SESSIONS}" + (" (concurrent)" if concurrent else "")
+              + (f", {len(config.TRENDS_PROXIES)} proxies" if config.TRENDS_PROXIES else ""))
+        
+        # Resume an interrupted run from its checkpoints
+        self.job_queue = create_job_queue(self.state_scope) if not config.REGIONAL_MODE else None
+        if self.job_queue is not None:
+            items = [(country_name, keyword, dataset) for country_name in self.geo_mapping
+                     for keyword in self.keywords_for(country_name) for dataset in enabled_datasets()]
+            if self.job_queue.start(items):
+                print(f"\n♻️  Resuming interrupted run: {self.job_queue.summary()}")
         
         total_success = 0
         total_attempts = 0
         
-        # Process each country
-        for country_name, geo_code in GEO_MAPPING.items():
-            print(f"\n🌍 Processing country: {country_name} ({geo_code})")
-            
-            # Process each keyword
-            for keyword in KEYWORDS:
-                try:
-                    success = self.collect_data_for_keyword(keyword, country_name, geo_code)
-                    total_success += success
-                    total_attempts += 1
-                    
-                    # Rate limiting delay
-                    if keyword != KEYWORDS[-1] or country_name != list(GEO_MAPPING.keys())[-1]:
-                        print(f"  ⏳ Waiting {REQUEST_DELAY}s to avoid rate limiting...")
-                        time.sleep(REQUEST_DELAY)
-                        
-                except Exception as e:
-                    print(f"  ❌ Failed to process '{keyword}': {e}")
-                    total_attempts += 1
+        if config.REGIONAL_MODE:
+            total_success, total_attempts = self.collect_regional(self.keywords)
+        elif concurrent:
+            totals = self.collect_concurrently(self.keywords, self.geo_mapping)
+            if totals is None:
+                return False
+            total_success, total_attempts = totals
+        else:
+            # Process each country
+            for country_name, geo_code in self.geo_mapping.items():
+                print(f"\n🌍 Processing country: {country_name} ({geo_code})")
+                keywords = self.keywords_for(country_name)
+                
+                if config.BATCH_KEYWORDS:
+                    try:
+                        total_success += self.collect_data_for_country_batched(keywords, country_name, geo_code)
+                    except Exception as e:
+                        print(f"  ❌ Failed to process '{country_name}': {e}")
+                    total_attempts += len(keywords)
+                else:
+                    # Process each keyword
+                    for keyword in keywords:
+                        try:
+                            success = self.collect_data_for_keyword(keyword, country_name, geo_code)
+                            total_success += success
+                            total_attempts += 1
+                            
+                        except Exception as e:
+                            print(f"  ❌ Failed to process '{keyword}': {e}")
+                            total_attempts += 1
+                
+                # Bulk append this country's rows to the local store
+                self._flush_store()
+        
+        if not config.REGIONAL_MODE:
+            self.run_analytics()
+            self.write_long_layout()
+        pending = sum(len(writer.sheet_buffer) for writer in self.sheet_writers() if writer.sheet_buffer is not None)
+        if pending:
+            print(f"\n📤 Flushing {pending} pending Sheets tab(s)...")
+        sheets_flushed = self.flush_sheets()
+        # A failed Sheets write leaves its items unmarked, so the next run writes them again
+        sheets_written = self.finish_sheet_pipeline() and sheets_flushed
+        if sheets_written:
+            self._checkpoint_written()
         
         print(f"\n✅ Collection completed!")
-        print(f"📊 Success rate: {total_success}/{total_attempts * 3} data sets collected")
-        print(f"🔗 Google Sheet: {self.spreadsheet.url if self.spreadsheet else 'N/A'}")
+        datasets_per_attempt = 1 if config.REGIONAL_MODE else len(enabled_datasets())
+        print(f"📊 Success rate: {total_success}/{total_attempts * datasets_per_attempt} data sets collected")
+        if self.session_pool is not None:
+            for member in self.session_pool.members:
+                print(f"⏱️  Session {member.summary()} | {member.rate_limiter.summary()}")
+        else:
+            print(f"⏱️  Rate limiter: {self.rate_limiter.summary()}")
+        if self.cache is not None:
+            print(f"💾 Response cache: {self.cache.summary()}")
+        if self.job_queue is not None:
+            print(f"📋 Job queue: {self.job_queue.summary()}")
+        for writer in self.sheet_writers():
+            if writer.sheet_buffer is not None:
+                print(f"📤 Sheets writes: {writer.sheet_buffer.summary()}")
+        print(f"📈 Time: {self.metrics.summary()}")
+        for writer in self.sheet_writers():
+            print(f"🔗 Google Sheet: {writer.spreadsheet.url if writer.spreadsheet else 'N/A'}")
         
-        return True
+        return sheets_written
 
 
-def main():
-    """Main function"""
+def collect(daemon=False, projects=None, shard=None, merge_shards=None, run_id=None):
+    """
+    Run one collection sweep, or the resident scheduler with daemon=True; returns success
+    
+    Args:
+        projects (str): Project directory for a multi-project sweep (see multi_project.py)
+        shard (str): 'i/N' collects only the i-th of N shards into the store (see sharding.py)
+        merge_shards (int): Write the N finished shards of a run to Google Sheets instead
+        run_id (str): Run of the shard or merge (default: today's date)
+    """
+    if shard or merge_shards:
+        import sharding
+        if daemon or projects:
+            print("⚠️ Sharded runs collect the configuration once; --daemon and --projects are ignored")
+        if merge_shards:
+            return sharding.merge_shards(merge_shards, run_id)
+        return sharding.run_shard(shard, run_id)
+    if projects:
+        from multi_project import run_projects
+        if daemon:
+            print("⚠️ The daemon runs a single configuration, collecting the projects once instead")
+        return run_projects(projects)
+    if daemon:
+        metrics = RunMetrics('daemon')
+        collector = GoogleTrendsCollector(rate_limiter=create_budget_limiter(metrics), metrics=metrics)
+        return collector.run_daemon()
     collector = GoogleTrendsCollector()
-    success = collector.run()
+    return collector.run()
+
+
+def _option(name):
+    """Value following a command line flag, None when the flag is absent"""
+    if name not in sys.argv[:-1]:
+        return None
+    return sys.argv[sys.argv.index(name) + 1]
+
+
+def main():
+    """
+    Main function (--daemon starts the resident scheduler instead of a single sweep,
+    --projects collects every project of PROJECTS_DIR, --shard i/N one shard of a
+    sharded run and --merge-shards N writes a sharded run to Google Sheets;
+    --run-id names the run of a shard or merge)
+    """
+    projects = config.PROJECTS_DIR if '--projects' in sys.argv else None
+    merge_shards = _option('--merge-shards')
+    success = collect(daemon='--daemon' in sys.argv, projects=projects, shard=_option('--shard'),
+                      merge_shards=int(merge_shards) if merge_shards else None, run_id=_option('--run-id'))
     sys.exit(0 if success else 1)
 
 
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Run Metrics
+Stage timing histograms and counters of a collection run, exported as JSON and
+as a Prometheus node_exporter textfile
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Prefix of every exported Prometheus metric
+METRIC_PREFIX = 'google_trends'
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}' if pairs else ''
+
+
+class RunMetrics:
+    """
+    Timings and counters of one run of a collector script
+
+    Stages are timed into histograms labelled by stage plus any extra labels:
+    'request' (every rate limited API call, labelled by api and call, so the
+    payload build is call="build_payload"), 'rate_limit_sleep' (pacing and
+    backoff waits), 'postprocess' (DataFrame work) and 'sheet_write'. Counters
+    count rows, API requests, retries and 429s. Everything is thread-safe, so
+    concurrent sessions share one instance.
+    """
+
+    def __init__(self, script='collector', buckets=DEFAULT_BUCKETS, clock=time.perf_counter):
+        """
+        Initialize the metrics
+
+        Args:
+            script (str): Value of the script label on every exported metric
+            buckets (tuple): Histogram bucket upper bounds in seconds
+            clock (callable): Monotonic clock function
+        """
+        self.script = script
+        self.buckets = tuple(buckets)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._started = clock()
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """Time the enclosed block as one observation of a stage"""
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.observe(stage, self._clock() - start, **labels)
+
+    def observe(self, stage, seconds, **labels):
+        """Add one duration to a stage histogram"""
+        key = _label_key(dict(labels, stage=stage))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    'buckets': [0] * len(self.buckets), 'count': 0, 'sum': 0.0, 'max': 0.0}
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram['buckets'][index] += 1
+                    break
+            histogram['count'] += 1
+            histogram['sum'] += seconds
+            histogram['max'] = max(histogram['max'], seconds)
+
+    def count(self, name, value=1, **labels):
+        """Increase a counter"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Set a gauge"""
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def counter_total(self, name):
+        """Sum of a counter over all its labels"""
+        with self._lock:
+            return sum(value for (counter, _), value in self._counters.items() if counter == name)
+
+    def stage_seconds(self, stage):
+        """Seconds spent in a stage, summed over all its labels (and threads)"""
+        with self._lock:
+            return sum(h['sum'] for key, h in self._histograms.items() if ('stage', stage) in key)
+
+    def finish(self, success=True):
+        """Record the run duration, outcome and throughput gauges"""
+        duration = self._clock() - self._started
+        self.set('run_duration_seconds', round(duration, 3))
+        self.set('run_success', 1 if success else 0)
+        self.set('last_run_timestamp_seconds', int(time.time()))
+        written = self.counter_total('datasets_written')
+        self.set('datasets_per_minute', round(written * 60 / duration, 3) if duration > 0 else 0.0)
+
+    def to_dict(self):
+        """All metrics as plain JSON-serialisable data"""
+        with self._lock:
+            stages = []
+            for key, histogram in sorted(self._histograms.items()):
+                cumulative, buckets = 0, {}
+                for bound, count in zip(self.buckets, histogram['buckets']):
+                    cumulative += count
+                    buckets[str(bound)] = cumulative
+                buckets['+Inf'] = histogram['count']
+                stages.append(dict(key, count=histogram['count'], sum=round(histogram['sum'], 6),
+                                   max=round(histogram['max'], 6), buckets=buckets))
+            return {
+                'script': self.script,
+                'gauges': [dict(key, name=name, value=value) for (name, key), value in sorted(self._gauges.items())],
+                'counters': [dict(key, name=name, value=value)
+                             for (name, key), value in sorted(self._counters.items())],
+                'stages': stages,
+            }
+
+    def to_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        data = self.to_dict()
+        script = ('script', self.script)
+        lines = []
+
+        for entry in data['gauges']:
+            name = f"{METRIC_PREFIX}_{entry['name']}"
+            lines.append(f"# TYPE {name} gauge")
+            labels = [script] + [(k, v) for k, v in entry.items() if k not in ('name', 'value')]
+            lines.append(f"{name}{_format_labels(labels)} {entry['value']}")
+
+        counter_names = sorted({entry['name'] for entry in data['counters']})
+        for counter in counter_names:
+            name = f"{METRIC_PREFIX}_{counter}_total"
+            lines.append(f"# TYPE {name} counter")
+            for entry in data['counters']:
+                if entry['name'] == counter:
+                    labels = [script] + [(k, v) for k, v in entry.items() if k not in ('name', 'value')]
+                    lines.append(f"{name}{_format_labels(labels)} {entry['value']}")
+
+        if data['stages']:
+            name = f"{METRIC_PREFIX}_stage_seconds"
+            lines.append(f"# TYPE {name} histogram")
+            for entry in data['stages']:
+                labels = [script] + [(k, v) for k, v in entry.items()
+                                     if k not in ('count', 'sum', 'max', 'buckets')]
+                for bound, count in entry['buckets'].items():
+                    lines.append(f"{name}_bucket{_format_labels(labels + [('le', bound)])} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {entry['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {entry['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, json_dir=None, textfile_dir=None):
+        """
+        Write the metrics as <script>.json and as a <script>.prom node_exporter textfile
+
+        The textfile is replaced atomically so node_exporter never reads a partial file.
+
+        Returns:
+            list: Paths written
+        """
+        written = []
+        for directory, extension, render in ((json_dir, 'json', lambda: json.dumps(self.to_dict(), indent=2)),
+                                             (textfile_dir, 'prom', self.to_prometheus)):
+            if not directory:
+                continue
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"trends_{self.script}.{extension}")
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w') as f:
+                f.write(render())
+            os.replace(temp_path, path)
+            written.append(path)
+        return written
+
+    def summary(self):
+        """Short human readable line: where the run's time went"""
+        duration = self._gauges.get(('run_duration_seconds', ()), self._clock() - self._started)
+        return (f"{duration:.0f}s run, {self.stage_seconds('request'):.0f}s in API requests, "
+                f"{self.stage_seconds('rate_limit_sleep'):.0f}s rate limit waiting, "
+                f"{self.stage_seconds('postprocess'):.1f}s processing data, "
+                f"{self.counter_total('api_retries')} retries, {self.counter_total('api_throttled')} x 429")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Multi-Project Collection
+One process collecting every project of PROJECTS_DIR: keywords tracked by
+several projects are fetched once, all requests share one rate limiter and
+response cache, and every result is written to each project's spreadsheet
+"""
+
+import copy
+import sys
+
+from credential_cache import open_spreadsheet, service_account
+from main import (GoogleTrendsCollector, config, create_rate_limiter, create_response_cache,
+                  export_run_metrics)
+from metrics import RunMetrics
+from planning import group_projects
+from settings import load_projects, validate_projects
+from sheet_writer import SheetWriteBuffer
+
+
+class ProjectsCollector(GoogleTrendsCollector):
+    """
+    Collector of the projects sharing one timeframe
+
+    Runs like a single configuration over the united keywords and countries
+    of its projects, then writes each keyword's tabs to the spreadsheet of
+    every project tracking it, named with that project's country names.
+    """
+
+    def __init__(self, group, timeframe, sheets_limiter=None, **kwargs):
+        """
+        Initialize the collector
+
+        Args:
+            group (dict): planning.group_projects() entry of the timeframe
+            sheets_limiter (RateLimiter): Sheets quota limiter shared by all spreadsheets
+        """
+        super().__init__(keywords=group['keywords'], geo_mapping=group['geo_mapping'], timeframe=timeframe,
+                         country_keywords=group['country_keywords'], **kwargs)
+        self.projects = group['projects']
+        self.sheets_limiter = sheets_limiter
+        self.writers = {}
+        self._project_keywords = {project['name']: set(project['keywords']) for project in self.projects}
+
+    def initialize_google_sheets(self):
+        """Open the spreadsheet of every project; projects that fail are collected but not written"""
+        clients = {}
+        for project in self.projects:
+            try:
+                path = project['service_account_file']
+                if path not in clients:
+                    clients[path] = service_account(path, self.credentials)
+                writer = copy.copy(self)
+                writer.gc = clients[path]
+                writer.spreadsheet = open_spreadsheet(clients[path], project['spreadsheet_name'], self.credentials,
+                                                      identity=path)
+                writer.sheet_buffer = None
+                if config.SHEETS_BATCH_WRITES:
+                    writer.sheet_buffer = SheetWriteBuffer(
+                        writer.spreadsheet,
+                        flush_size=config.SHEETS_FLUSH_SIZE,
+                        writes_per_minute=config.SHEETS_WRITES_PER_MINUTE,
+                        rate_limiter=self.sheets_limiter,
+                        diff=config.SHEETS_DIFF_SYNC,
+                        metrics=self.metrics
+                    )
+                    self.sheets_limiter = writer.sheet_buffer.rate_limiter
+                self.writers[project['name']] = writer
+                print(f"✅ {project['name']}: connected to Google Sheet '{project['spreadsheet_name']}'")
+            except Exception as e:
+                print(f"❌ {project['name']}: Google Sheet '{project['spreadsheet_name']}' failed: {e!r}")
+        return bool(self.writers)
+
+    def sheet_targets(self, keyword, country_name, suffix):
+        """Tabs of every project tracking the keyword in the country's geo"""
+        geo_code = self.geo_mapping[country_name]
+        targets = []
+        for project in self.projects:
+            writer = self.writers.get(project['name'])
+            if writer is None or keyword not in self._project_keywords[project['name']]:
+                continue
+            for project_country, project_geo in project['geo_mapping'].items():
+                if project_geo == geo_code:
+                    targets.append((writer, f"{project_country}_{keyword}_{suffix}"))
+        return targets
+
+    def sheet_writers(self):
+        return list(self.writers.values())
+
+    def sheet_scopes(self):
+        """Each project's keywords, under the project's own country names"""
+        names = {geo_code: name for name, geo_code in self.geo_mapping.items()}
+        scopes = []
+        for project in self.projects:
+            writer = self.writers.get(project['name'])
+            if writer is None:
+                continue
+            pairs = {}
+            for project_country, project_geo in project['geo_mapping'].items():
+                for keyword in project['keywords']:
+                    pairs[(names[project_geo], keyword)] = project_country
+            scopes.append((writer, pairs))
+        return scopes
+
+
+def run_projects(directory=None):
+    """
+    Collect every project of a directory in one process
+
+    Projects are grouped by timeframe; the group of the configured TIMEFRAME
+    uses the configured store, job queue and incremental state, other groups
+    get paths of their own (e.g. job_queue.today_12-m.sqlite).
+
+    Returns:
+        bool: True when every group ran
+    """
+    directory = directory or config.PROJECTS_DIR
+    print("🚀 Google Trends Multi-Project Collector")
+    print("=" * 40)
+    try:
+        projects = load_projects(directory, config)
+    except Exception as e:
+        print(f"❌ Could not load projects from '{directory}': {e}")
+        return False
+    problems = validate_projects(projects)
+    if config.REGIONAL_MODE:
+        problems.append("REGIONAL_MODE is not supported in multi-project runs")
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        return False
+
+    groups = group_projects(projects)
+    tracked = sum(len(p['keywords']) * len(p['geo_mapping']) for p in projects)
+    fetched = sum(len(kws) for g in groups.values() for kws in g['country_keywords'].values())
+    print(f"📁 {len(projects)} projects in '{directory}': {tracked} keyword/country pairs tracked, "
+          f"{fetched} fetched in {len(groups)} timeframe(s)")
+
+    metrics = RunMetrics('projects')
+    rate_limiter = create_rate_limiter(metrics)
+    cache = create_response_cache()
+    sheets_limiter = None
+    results = []
+    try:
+        for timeframe, group in groups.items():
+            print(f"\n📁 {timeframe}: {', '.join(p['name'] for p in group['projects'])}")
+            collector = ProjectsCollector(group, timeframe, sheets_limiter=sheets_limiter,
+                                          rate_limiter=rate_limiter, cache=cache, metrics=metrics,
+                                          state_scope=None if timeframe == config.TIMEFRAME else timeframe)
+            results.append(collector.run(export_metrics=False))
+            sheets_limiter = collector.sheets_limiter
+    finally:
+        export_run_metrics(metrics, bool(results) and all(results))
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_projects(sys.argv[1] if len(sys.argv) > 1 else None) else 1)
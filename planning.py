@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Run Planning
+Keyword batching and request estimates of a collection run, in plain Python so
+dry runs start without pandas, pytrends or gspread
+"""
+
+import bisect
+import functools
+import hashlib
+import math
+from datetime import date
+
+# Points of every shard on the hash ring; more points spread the work more evenly
+SHARD_RING_POINTS = 64
+
+
+def make_keyword_batches(keywords, anchor, batch_size=5):
+    """
+    Split keywords into payload-sized batches that all start with the anchor keyword
+
+    Args:
+        keywords (list): Keywords to collect
+        anchor (str): Keyword shared by every batch, used for rescaling
+        batch_size (int): Maximum keywords per payload (Google allows 5)
+
+    Returns:
+        list: List of keyword lists
+    """
+    if batch_size < 2:
+        raise ValueError('batch_size must be at least 2 to fit the anchor keyword')
+    others = [kw for kw in keywords if kw != anchor]
+    step = batch_size - 1
+    batches = [[anchor] + others[i:i + step] for i in range(0, len(others), step)]
+    return batches or [[anchor]]
+
+
+def enabled_datasets(config):
+    """Data sets switched on in a configuration, named like the local store tables"""
+    return [name for name, enabled in (('interest', config.COLLECT_INTEREST_OVER_TIME),
+                                       ('related_topics', config.COLLECT_RELATED_TOPICS),
+                                       ('related_queries', config.COLLECT_RELATED_QUERIES)) if enabled]
+
+
+def long_range_windows(start, end, window_days=270, overlap_days=60):
+    """Number of windows long_range.plan_windows splits a date range into"""
+    days = (end - start).days + 1
+    if days <= window_days:
+        return 1
+    return 1 + math.ceil((days - window_days) / max(1, window_days - overlap_days))
+
+
+def group_projects(projects):
+    """
+    Merge the projects of a multi-project run into one collection per timeframe
+
+    Keywords and countries (by geo code) of projects sharing a timeframe are
+    united, so every (keyword, geo, timeframe) is fetched once however many
+    projects track it, and only in the geos of projects tracking it. A geo is
+    named like in the first project that has it.
+
+    Returns:
+        dict: timeframe -> {'keywords': list, 'geo_mapping': dict of country
+              name -> geo code, 'country_keywords': dict of country name ->
+              keywords, 'projects': list of project dicts}
+    """
+    groups = {}
+    for project in projects:
+        group = groups.setdefault(project['timeframe'], {'keywords': {}, 'geo_mapping': {}, 'country_keywords': {},
+                                                         'projects': []})
+        group['projects'].append(project)
+        group['keywords'].update(dict.fromkeys(project['keywords']))
+        names = {geo_code: name for name, geo_code in group['geo_mapping'].items()}
+        for country_name, geo_code in project['geo_mapping'].items():
+            if geo_code not in names:
+                if country_name in group['geo_mapping']:
+                    # Same name for another geo in an earlier project
+                    country_name = f"{country_name} ({geo_code or 'Global'})"
+                group['geo_mapping'][country_name] = geo_code
+                names[geo_code] = country_name
+            group['country_keywords'].setdefault(names[geo_code], {}).update(dict.fromkeys(project['keywords']))
+    for group in groups.values():
+        group['keywords'] = list(group['keywords'])
+        group['country_keywords'] = {name: list(kws) for name, kws in group['country_keywords'].items()}
+    return groups
+
+
+def parse_shard(text):
+    """
+    Parse a shard argument like '2/4' (the second of four shards)
+
+    Returns:
+        tuple: (index, count), raises ValueError when malformed
+    """
+    index, _, count = str(text).partition('/')
+    if not (index.isdigit() and count.isdigit() and 1 <= int(index) <= int(count)):
+        raise ValueError(f"shard must look like i/N with 1 <= i <= N, not '{text}'")
+    return int(index), int(count)
+
+
+def _ring_hash(text):
+    # md5 rather than hash(): the same on every host and Python version
+    return int.from_bytes(hashlib.md5(text.encode('utf-8')).digest()[:8], 'big')
+
+
+@functools.lru_cache(maxsize=None)
+def _shard_ring(count, points):
+    return sorted((_ring_hash(f"shard-{shard}-{point}"), shard)
+                  for shard in range(1, count + 1) for point in range(points))
+
+
+def assign_shards(keys, count, points=SHARD_RING_POINTS):
+    """
+    Place keys on count shards by consistent hashing with bounded loads
+
+    Each key, taken in hash order, goes to the first shard clockwise from its
+    point on the ring that still has room, so shard loads differ by at most
+    one key even when there are few keys (e.g. countries). Every host computes
+    the same placement, and a key keeps its shard while the others change as
+    long as loads allow.
+
+    Returns:
+        dict: key -> shard (1..count)
+    """
+    ring = _shard_ring(count, points)
+    # Every shard takes base keys, the first `extra` shards to fill up one more
+    base, extra = divmod(len(keys), count)
+    loads = dict.fromkeys(range(1, count + 1), 0)
+    owners = {}
+    for point, key in sorted((_ring_hash(key), key) for key in keys):
+        position = bisect.bisect(ring, (point,))
+        for step in range(len(ring)):
+            shard = ring[(position + step) % len(ring)][1]
+            if loads[shard] < base or (loads[shard] == base and extra):
+                break
+        if loads[shard] == base:
+            extra -= 1
+        loads[shard] += 1
+        owners[key] = shard
+    return owners
+
+
+def shard_scope(config, index, count):
+    """
+    Keywords and countries collected by one shard of a run
+
+    Batch mode places whole countries, since the batches of a country are
+    rescaled together through the anchor keyword; otherwise every
+    (keyword, country) pair is placed on its own. Either way a shard fetches
+    the same payloads the unsharded run would, so its data is identical.
+
+    Returns:
+        dict: 'keywords', 'geo_mapping' (countries with work on the shard) and
+              'country_keywords' (country name -> keywords)
+    """
+    if config.BATCH_KEYWORDS:
+        units = {country_name: (country_name, list(config.KEYWORDS)) for country_name in config.GEO_MAPPING}
+    else:
+        units = {f"{country_name}|{keyword}": (country_name, [keyword])
+                 for country_name in config.GEO_MAPPING for keyword in config.KEYWORDS}
+    owners = assign_shards(list(units), count)
+    country_keywords = {}
+    for key, (country_name, keywords) in units.items():
+        if owners[key] == index:
+            country_keywords.setdefault(country_name, []).extend(keywords)
+    return {
+        'keywords': [kw for kw in config.KEYWORDS if any(kw in kws for kws in country_keywords.values())],
+        'geo_mapping': {name: geo_code for name, geo_code in config.GEO_MAPPING.items() if name in country_keywords},
+        'country_keywords': country_keywords,
+    }
+
+
+def build_plan(config, today=None, keywords=None, geo_mapping=None):
+    """
+    Trends requests and time of one collect run of a configuration
+
+    Counts every rate limited request (payload builds, interest and one per
+    related widget) as if nothing were cached, resumed or incremental.
+
+    Args:
+        keywords, geo_mapping: Scope of the run (default: the configuration's)
+
+    Returns:
+        dict: 'mode', 'countries', 'keywords', 'datasets', 'batches' per
+              country, 'requests' and 'minutes' at the configured pace
+    """
+    keywords = list(config.KEYWORDS if keywords is None else keywords)
+    countries = len(config.GEO_MAPPING if geo_mapping is None else geo_mapping)
+    datasets = enabled_datasets(config)
+    related = len([d for d in datasets if d != 'interest'])
+    anchor = getattr(config, 'ANCHOR_KEYWORD', None) or (keywords[0] if keywords else None)
+
+    if getattr(config, 'REGIONAL_MODE', False):
+        batches = len(make_keyword_batches(keywords, anchor, config.BATCH_SIZE)) if keywords else 0
+        # Regional mode covers every country with one payload per batch
+        mode, countries, datasets = 'regional', 1, ['interest_by_region']
+        requests = batches * 2
+    else:
+        if config.BATCH_KEYWORDS and keywords:
+            batches = len(make_keyword_batches(keywords, anchor, config.BATCH_SIZE))
+            mode = 'batched'
+        else:
+            batches = len(keywords)
+            mode = 'per keyword'
+        interest_requests = 1 if 'interest' in datasets else 0
+        long_range_start = getattr(config, 'LONG_RANGE_START', None)
+        if long_range_start and interest_requests:
+            windows = long_range_windows(date.fromisoformat(str(long_range_start)), today or date.today(),
+                                         config.LONG_RANGE_WINDOW_DAYS, config.LONG_RANGE_OVERLAP_DAYS)
+            calibration = 1 if config.LONG_RANGE_CALIBRATE and windows > 1 else 0
+            # Every window and the weekly overview have a payload of their own
+            interest_requests = 2 * (windows + calibration)
+            mode += ', long range'
+            payload = 1 if related else 0
+        else:
+            payload = 1 if datasets else 0
+        per_country = batches * (payload + interest_requests) + len(keywords) * related
+        requests = per_country * countries
+
+    sessions = max(1, getattr(config, 'CONCURRENT_SESSIONS', 1))
+    pace = config.RATE_LIMIT_REQUESTS_PER_MINUTE * sessions
+    return {
+        'mode': mode,
+        'countries': countries,
+        'keywords': len(keywords),
+        'datasets': datasets,
+        'batches': batches,
+        'requests': requests,
+        'minutes': round(requests / pace, 1) if pace > 0 else None,
+    }
+
+
+def build_projects_plan(config, projects, today=None):
+    """
+    Trends requests of a multi-project run next to separate runs per project
+
+    Returns:
+        dict: 'projects', 'timeframes', 'pairs' (keyword/country pairs fetched),
+              'requests' and 'minutes' of the shared run, 'separate_requests'
+              of one run per project
+    """
+    groups = group_projects(projects).values()
+    requests = sum(build_plan(config, today, keywords, {country_name: group['geo_mapping'][country_name]})['requests']
+                   for group in groups for country_name, keywords in group['country_keywords'].items())
+    separate = sum(build_plan(config, today, project['keywords'], project['geo_mapping'])['requests']
+                   for project in projects)
+    sessions = max(1, getattr(config, 'CONCURRENT_SESSIONS', 1))
+    pace = config.RATE_LIMIT_REQUESTS_PER_MINUTE * sessions
+    return {
+        'projects': len(projects),
+        'timeframes': len(groups),
+        'pairs': sum(len(keywords) for group in groups for keywords in group['country_keywords'].values()),
+        'requests': requests,
+        'minutes': round(requests / pace, 1) if pace > 0 else None,
+        'separate_requests': separate,
+    }
+
+
+def build_shards_plan(config, count, today=None):
+    """
+    Work of every shard of a sharded run
+
+    Returns:
+        list: One dict per shard with 'shard', 'countries', 'pairs' and 'requests'
+    """
+    shards = []
+    for index in range(1, count + 1):
+        scope = shard_scope(config, index, count)
+        requests = sum(build_plan(config, today, keywords, {country_name: scope['geo_mapping'][country_name]})['requests']
+                       for country_name, keywords in scope['country_keywords'].items())
+        shards.append({
+            'shard': f"{index}/{count}",
+            'countries': len(scope['geo_mapping']),
+            'pairs': sum(len(keywords) for keywords in scope['country_keywords'].values()),
+            'requests': requests,
+        })
+    return shards
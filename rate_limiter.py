@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Adaptive Rate Limiter
+Token-bucket pacing with 429-aware exponential backoff, shared by all Trends collectors
+"""
+
+import random
+import threading
+import time
+
+from pytrends.exceptions import ResponseError, TooManyRequestsError
+
+# Tolerance for float rounding when comparing token counts and deadlines
+_EPSILON = 1e-6
+
+
+def is_rate_limit_error(error):
+    """Return True if the exception means Google is throttling us (Trends or Sheets API)"""
+    if isinstance(error, TooManyRequestsError):
+        return True
+    response = getattr(error, 'response', None)
+    if response is not None and getattr(response, 'status_code', None) is not None:
+        return response.status_code == 429
+    if isinstance(error, ResponseError):
+        return False
+    return '429' in str(error)
+
+
+class RateLimiter:
+    """
+    Token-bucket request budget that slows down on 429 responses and speeds up again
+
+    Each request takes tokens from a bucket refilled at the current rate. When Google
+    answers with 429 the rate is cut and every caller waits an exponentially growing,
+    jittered backoff. After a run of successful requests the rate is raised step by
+    step until it reaches max_per_minute again.
+    """
+
+    # Sleep and clock of limiters not given their own (a cassette replay swaps in a virtual clock)
+    default_sleep = staticmethod(time.sleep)
+    default_clock = staticmethod(time.monotonic)
+
+    def __init__(self, requests_per_minute=6, min_per_minute=1, max_per_minute=20, burst=2,
+                 max_retries=4, backoff_base=30, max_backoff=600, speedup_after=5,
+                 speedup_factor=1.25, slowdown_factor=0.5, jitter=0.5,
+                 in_flight=None, metrics=None, api='trends', sleep=None, clock=None):
+        """
+        Initialize the limiter
+
+        Args:
+            requests_per_minute (float): Starting request rate
+            min_per_minute (float): Lowest rate after repeated throttling
+            max_per_minute (float): Highest rate reached by speeding up
+            burst (int): Bucket capacity, i.e. requests allowed back to back
+            max_retries (int): Retries of a throttled call before giving up
+            backoff_base (float): First backoff in seconds, doubled per consecutive 429
+            max_backoff (float): Upper bound for a single backoff in seconds
+            speedup_after (int): Consecutive successes needed before raising the rate
+            speedup_factor (float): Rate multiplier applied when speeding up
+            slowdown_factor (float): Rate multiplier applied on a 429
+            jitter (float): Fraction of each backoff that is randomised (0-1)
+            in_flight (threading.Semaphore): Limit on concurrent requests shared with other limiters
+            metrics (RunMetrics): Receives request timings, waits, retries and 429s
+            api (str): Value of the api label of the recorded metrics
+            sleep (callable): Sleep function, replaceable for replays and benchmarks (default: default_sleep)
+            clock (callable): Monotonic clock function (default: default_clock)
+        """
+        self.min_rate = min_per_minute / 60.0
+        self.max_rate = max_per_minute / 60.0
+        self.rate = min(max(requests_per_minute / 60.0, self.min_rate), self.max_rate)
+        self.capacity = max(1, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.speedup_after = speedup_after
+        self.speedup_factor = speedup_factor
+        self.slowdown_factor = slowdown_factor
+        self.jitter = jitter
+        self.in_flight = in_flight
+        self.metrics = metrics
+        self.api = api
+        self._sleep = sleep or RateLimiter.default_sleep
+        self._clock = clock or RateLimiter.default_clock
+
+        self._lock = threading.Lock()
+        self._tokens = float(self.capacity)
+        self._last_refill = self._clock()
+        self._blocked_until = 0.0
+        self._consecutive_successes = 0
+        self._consecutive_throttles = 0
+
+        # Run statistics
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.sleep_seconds = 0.0
+
+    def _refill(self, now):
+        """Add tokens earned since the last refill"""
+        elapsed = max(0.0, now - self._last_refill)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def acquire(self, cost=1):
+        """
+        Block until the budget allows a request costing `cost` tokens
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                wait = self._blocked_until - now
+                if wait <= _EPSILON:
+                    # Expensive calls may run the bucket into debt instead of waiting forever
+                    needed = min(cost, self.capacity)
+                    if self._tokens >= needed - _EPSILON:
+                        self._tokens -= cost
+                        self.requests += cost
+                        return waited
+                    wait = (needed - self._tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+            with self._lock:
+                self.sleep_seconds += wait
+            if self.metrics is not None:
+                self.metrics.observe('rate_limit_sleep', wait, api=self.api)
+
+    def record_success(self):
+        """Register a successful request and speed up after enough of them"""
+        with self._lock:
+            self._consecutive_throttles = 0
+            self._consecutive_successes += 1
+            if self._consecutive_successes >= self.speedup_after and self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate * self.speedup_factor)
+                self._consecutive_successes = 0
+
+    def record_throttled(self):
+        """
+        Register a 429 response: slow down and block all callers for a jittered backoff
+
+        Returns:
+            float: Backoff in seconds
+        """
+        with self._lock:
+            self.throttled += 1
+            self._consecutive_successes = 0
+            self._consecutive_throttles += 1
+            self.rate = max(self.min_rate, self.rate * self.slowdown_factor)
+
+            backoff = min(self.max_backoff, self.backoff_base * 2 ** (self._consecutive_throttles - 1))
+            backoff = backoff * (1 - self.jitter) + random.uniform(0, backoff * self.jitter)
+            self._blocked_until = max(self._blocked_until, self._clock() + backoff)
+            self._tokens = 0.0
+            return backoff
+
+    def call(self, func, *args, cost=1, **kwargs):
+        """
+        Run func under the rate limit, retrying with backoff when it is throttled
+
+        Args:
+            func (callable): Function making the request(s)
+            cost (int): Number of requests the call makes
+
+        Returns:
+            Whatever func returns; the last rate limit error is re-raised after max_retries
+        """
+        attempt = 0
+        name = getattr(func, '__name__', 'call')
+        while True:
+            self.acquire(cost)
+            start = time.perf_counter()
+            try:
+                if self.in_flight is None:
+                    result = func(*args, **kwargs)
+                else:
+                    with self.in_flight:
+                        result = func(*args, **kwargs)
+            except Exception as e:
+                throttled = is_rate_limit_error(e)
+                self._record_metrics(name, cost, start, throttled)
+                if not throttled or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.retries += 1
+                if self.metrics is not None:
+                    self.metrics.count('api_retries', api=self.api)
+                backoff = self.record_throttled()
+                print(f"    ⏳ Rate limited (429), backing off {backoff:.0f}s "
+                      f"(retry {attempt}/{self.max_retries}, now {self.rate * 60:.1f} req/min)")
+                continue
+            self._record_metrics(name, cost, start)
+            self.record_success()
+            return result
+
+    def _record_metrics(self, name, cost, start, throttled=False):
+        """Report one finished attempt of a call to the run metrics"""
+        if self.metrics is None:
+            return
+        self.metrics.observe('request', time.perf_counter() - start, api=self.api, call=name)
+        self.metrics.count('api_requests', cost, api=self.api, call=name)
+        if throttled:
+            self.metrics.count('api_throttled', api=self.api)
+
+    def summary(self):
+        """Short human readable statistics line"""
+        return (f"{self.requests} requests, {self.throttled} throttled, "
+                f"{self.sleep_seconds:.0f}s waiting, final pace {self.rate * 60:.1f} req/min")
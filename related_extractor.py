@@ -8,38 +8,98 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from pytrends.request import TrendReq
+import numpy as np
 import pandas as pd
 import gspread
 from gspread_dataframe import set_with_dataframe
+import copy
 import json
-import time
 from datetime import datetime
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from data_store import TrendsDataStore
+from sheet_writer import SheetWriteBuffer
+from concurrent_collector import ConcurrentRunner, create_in_flight_limit
+from session_pool import KeepAliveTrendReq, SessionPool
+from credential_cache import CredentialCache, open_spreadsheet, service_account
+from metrics import RunMetrics
+from fetch_engine import TrendsFetcher
+from spill_file import SpillFile
+from settings import load_config
+
+def rate_limit_settings(in_flight=None, metrics=None):
+    """RateLimiter arguments from config.py"""
+    config = load_config()
+    return {
+        'requests_per_minute': config.RATE_LIMIT_REQUESTS_PER_MINUTE,
+        'min_per_minute': config.RATE_LIMIT_MIN_PER_MINUTE,
+        'max_per_minute': config.RATE_LIMIT_MAX_PER_MINUTE,
+        'burst': config.RATE_LIMIT_BURST,
+        'max_retries': config.RATE_LIMIT_MAX_RETRIES,
+        'backoff_base': config.RATE_LIMIT_BACKOFF_BASE,
+        'max_backoff': config.RATE_LIMIT_MAX_BACKOFF,
+        'in_flight': in_flight,
+        'metrics': metrics
+    }
 
 class GoogleTrendsRelatedExtractor:
     """Extract Related Topics and Queries from Google Trends"""
     
-    def __init__(self, hl='en-US', tz=360):
-        """Initialize the extractor"""
+    def __init__(self, hl='en-US', tz=360, rate_limiter=None, cache=None, store=None, metrics=None,
+                 streaming=False, spill_dir=None, upload_chunk_rows=5000, credentials=None):
+        """
+        Initialize the extractor
+        
+        Args:
+            streaming (bool): Spill every result to disk instead of keeping the frames
+                of the whole run, and upload the tabs in chunks (flat peak memory)
+            spill_dir (str): Spill directory in streaming mode (default: a temporary one)
+            upload_chunk_rows (int): Rows per Sheets request in streaming mode
+            credentials (CredentialCache): Cookies, OAuth token and spreadsheet ID kept across runs
+        """
         self.hl = hl
         self.tz = tz
+        self.metrics = metrics or RunMetrics('related')
+        self.rate_limiter = rate_limiter or RateLimiter(metrics=self.metrics)
+        self.cache = cache
+        self.store = store
+        self.sheet_buffer = None
+        self.timeframe = 'today 3-m'
+        self.streaming = streaming
+        self.spill_dir = spill_dir
+        self.upload_chunk_rows = upload_chunk_rows
+        self.credentials = credentials
+        self.run_timestamp = None
+        self.fetcher = None
         self.pytrends = None
         self.gc = None
         self.spreadsheet = None
         
-    def initialize(self):
-        """Initialize Google Trends and Google Sheets connections"""
+    def initialize(self, connect_sheets=True):
+        """Initialize Google Trends and (optionally) Google Sheets connections"""
         try:
             # Initialize pytrends
-            self.pytrends = TrendReq(hl=self.hl, tz=self.tz)
+            self.pytrends = KeepAliveTrendReq(credentials=self.credentials, hl=self.hl, tz=self.tz)
+            self.fetcher = TrendsFetcher(self.pytrends, self.rate_limiter, self.cache)
             print("✅ Google Trends connection initialized")
             
+            if not connect_sheets:
+                return True
+            
             # Initialize Google Sheets
             try:
-                import config
-                self.gc = gspread.service_account(filename=config.SERVICE_ACCOUNT_FILE)
-                self.spreadsheet = self.gc.open(config.SPREADSHEET_NAME)
+                config = load_config()
+                self.gc = service_account(config.SERVICE_ACCOUNT_FILE, self.credentials)
+                self.spreadsheet = open_spreadsheet(self.gc, config.SPREADSHEET_NAME, self.credentials,
+                                                    identity=config.SERVICE_ACCOUNT_FILE)
                 print(f"✅ Connected to Google Sheet: '{config.SPREADSHEET_NAME}'")
+                if config.SHEETS_BATCH_WRITES:
+                    self.sheet_buffer = SheetWriteBuffer(
+                        self.spreadsheet,
+                        writes_per_minute=config.SHEETS_WRITES_PER_MINUTE,
+                        diff=config.SHEETS_DIFF_SYNC,
+                        metrics=self.metrics
+                    )
                 return True
             except Exception as e:
                 print(f"❌ Google Sheets connection failed: {e}")
@@ -49,22 +109,36 @@ class GoogleTrendsRelatedExtractor:
             print(f"❌ Initialization failed: {e}")
             return False
     
-    def extract_related_data(self, keywords, geo_mapping, timeframe='today 3-m', delay=30):
+    def extract_related_data(self, keywords, geo_mapping, timeframe='today 3-m', sessions=1, max_in_flight=2,
+                             proxies=None, pool_settings=None):
         """
         Extract Related Topics and Queries for given parameters
         
+        Requests are paced by self.rate_limiter instead of fixed delays. With
+        sessions > 1 or proxies the (keyword, country) jobs run in parallel on a
+        session pool, each pooled session paced like a single serial run.
+        
         Args:
             keywords (list): List of keywords to analyze
             geo_mapping (dict): Dictionary mapping country names to geo codes
             timeframe (str): Time period (e.g., 'today 3-m')
-            delay (int): Delay between requests in seconds
+            sessions (int): Parallel workers (1 = serial unless proxies are given)
+            max_in_flight (int): Requests running at the same time across sessions
+            proxies (list): Proxy URLs, one pooled session each (default: `sessions` direct sessions)
+            pool_settings (dict): Extra SessionPool arguments (cooldown, min_success_rate)
         
         Returns:
-            dict: Results with related topics and queries data
+            dict: Results with related topics and queries data ('spill' holds
+                  them instead of the frame lists in streaming mode)
         """
+        self.timeframe = timeframe
+        # Every row of a run carries the same extraction time
+        self.run_timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         results = {
             'related_topics': [],
             'related_queries': [],
+            'datasets': {'related_topics': 0, 'related_queries': 0},
+            'spill': SpillFile(self.spill_dir) if self.streaming else None,
             'success_count': 0,
             'total_requests': 0
         }
@@ -75,137 +149,171 @@ class GoogleTrendsRelatedExtractor:
         print(f"  Keywords: {', '.join(keywords)}")
         print(f"  Countries: {', '.join(geo_mapping.keys())}")
         print(f"  Timeframe: {timeframe}")
-        print(f"  Request delay: {delay}s")
+        print(f"  Rate limit: {self.rate_limiter.rate * 60:.1f} req/min (adaptive)")
+        if self.streaming:
+            print(f"  Streaming: results spilled to '{results['spill'].directory}'")
+        
+        if sessions > 1 or proxies:
+            pool = SessionPool(proxies or [None] * sessions,
+                               limiter_settings=rate_limit_settings(create_in_flight_limit(max_in_flight),
+                                                                    self.metrics),
+                               credentials=self.credentials,
+                               **(pool_settings or {}))
+            self._extract_concurrently(keywords, geo_mapping, results, pool, sessions)
+            print()
+            for member in pool.members:
+                print(f"⏱️  Session {member.summary()} | {member.rate_limiter.summary()}")
+            if self.cache is not None:
+                print(f"💾 Response cache: {self.cache.summary()}")
+            return results
         
         for country_name, geo_code in geo_mapping.items():
             print(f"\n🌍 Processing country: {country_name} ({geo_code})")
             
             for keyword in keywords:
                 print(f"\n🔍 Processing: {keyword} ({country_name})")
-                results['total_requests'] += 1
                 
                 try:
-                    # Build payload
-                    self.pytrends.build_payload(
-                        kw_list=[keyword],
-                        cat=0,
-                        timeframe=timeframe,
-                        geo=geo_code,
-                        gprop=''
-                    )
-                    
-                    # Extract Related Topics
-                    topics_data = self._extract_related_topics(keyword, country_name, geo_code)
-                    if topics_data is not None and not topics_data.empty:
-                        results['related_topics'].append(topics_data)
-                        print(f"  ✅ Related Topics: {len(topics_data)} items")
-                        results['success_count'] += 1
-                    else:
-                        print(f"  ⚠️ No Related Topics data")
-                    
-                    # Extract Related Queries
-                    queries_data = self._extract_related_queries(keyword, country_name, geo_code)
-                    if queries_data is not None and not queries_data.empty:
-                        results['related_queries'].append(queries_data)
-                        print(f"  ✅ Related Queries: {len(queries_data)} items")
-                        results['success_count'] += 1
-                    else:
-                        print(f"  ⚠️ No Related Queries data")
-                    
+                    # The payload is built on cache misses only
+                    topics_data, queries_data = self._collect_keyword(keyword, country_name, geo_code)
+                    self._record(results, keyword, country_name, geo_code, topics_data, queries_data)
                 except Exception as e:
+                    results['total_requests'] += 1
                     print(f"  ❌ Error processing {keyword}: {e}")
-                
-                # Rate limiting delay
-                if delay > 0:
-                    print(f"  ⏳ Waiting {delay}s to avoid rate limiting...")
-                    time.sleep(delay)
+            
+            self._flush_store()
         
+        print(f"\n⏱️  Rate limiter: {self.rate_limiter.summary()}")
+        if self.cache is not None:
+            print(f"💾 Response cache: {self.cache.summary()}")
         return results
     
-    def _extract_related_topics(self, keyword, country_name, geo_code):
-        """Extract Related Topics using official pytrends API"""
-        try:
-            # Use official pytrends related_topics() method
-            related_topics = self.pytrends.related_topics()
-            
-            if not related_topics or keyword not in related_topics:
-                print(f"    📝 No related topics data for '{keyword}'")
-                return None
-            
-            data = related_topics[keyword]
-            dfs = []
-            
-            # Process top topics
-            if 'top' in data and data['top'] is not None and not data['top'].empty:
-                top_df = data['top'].copy()
-                top_df['Type'] = 'Top'
-                top_df['Keyword'] = keyword
-                top_df['Country'] = country_name
-                top_df['Geo_Code'] = geo_code
-                top_df['Extracted_Date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                dfs.append(top_df)
-                print(f"    📊 Top topics: {len(top_df)} items")
-            
-            # Process rising topics
-            if 'rising' in data and data['rising'] is not None and not data['rising'].empty:
-                rising_df = data['rising'].copy()
-                rising_df['Type'] = 'Rising'
-                rising_df['Keyword'] = keyword
-                rising_df['Country'] = country_name
-                rising_df['Geo_Code'] = geo_code
-                rising_df['Extracted_Date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                dfs.append(rising_df)
-                print(f"    📈 Rising topics: {len(rising_df)} items")
-            
-            if dfs:
-                return pd.concat(dfs, ignore_index=True)
-            return None
-            
-        except Exception as e:
-            print(f"    ❌ Related Topics error: {e}")
-            return None
+    def _collect_keyword(self, keyword, country_name, geo_code):
+        """Fetch Related Topics and Related Queries of one keyword and country from one payload"""
+        fetched = self.fetcher.fetch([keyword], geo_code, self.timeframe, ('related_topics', 'related_queries'))
+        topics_data = self._extract_related_topics(keyword, country_name, geo_code, fetched)
+        queries_data = self._extract_related_queries(keyword, country_name, geo_code, fetched)
+        return topics_data, queries_data
+    
+    def _record(self, results, keyword, country_name, geo_code, topics_data, queries_data):
+        """Add one keyword's fetched data sets to the results and the local store"""
+        results['total_requests'] += 1
+        for kind, data, label in (('related_topics', topics_data, 'Related Topics'),
+                                  ('related_queries', queries_data, 'Related Queries')):
+            if data is not None and not data.empty:
+                if results['spill'] is not None:
+                    results['spill'].append(kind, data)
+                else:
+                    results[kind].append(data)
+                results['datasets'][kind] += 1
+                self.metrics.count('datasets_written', dataset=kind)
+                self.metrics.count('rows', len(data), dataset=kind)
+                if self.store is not None:
+                    self.store.add_related(kind, data, keyword, country_name, geo_code)
+                print(f"  ✅ {label} ({keyword}, {country_name}): {len(data)} items")
+                results['success_count'] += 1
+            else:
+                self.metrics.count('datasets_empty', dataset=kind)
+                print(f"  ⚠️ No {label} data ({keyword}, {country_name})")
+        if self.streaming and self.store is not None and self.store.pending_rows() >= self.upload_chunk_rows:
+            # Bounded store buffer too, instead of one flush per country
+            self._flush_store()
+    
+    def _flush_store(self):
+        """Bulk append buffered rows to the local store"""
+        if self.store is None:
+            return
+        written = self.store.flush()
+        if written:
+            print(f"  💾 Stored locally: {', '.join(f'{n} {t} rows' for t, n in written.items())}")
     
-    def _extract_related_queries(self, keyword, country_name, geo_code):
-        """Extract Related Queries using official pytrends API"""
+    def spawn_session(self, member):
+        """Extractor for a worker thread using a pool member's Trends session and pacing"""
+        session = copy.copy(self)
+        session.rate_limiter = member.rate_limiter
+        session.sheet_buffer = None
+        session.pytrends = member.trendreq(hl=self.hl, tz=self.tz)
+        session.fetcher = TrendsFetcher(session.pytrends, member.rate_limiter, self.cache)
+        return session
+    
+    def _extract_concurrently(self, keywords, geo_mapping, results, pool, workers):
+        """
+        Fetch all (keyword, country) jobs on the session pool; results are
+        recorded in this thread, and each country is flushed to the store
+        once all of its keywords arrived
+        """
+        if not pool.warm_up(hl=self.hl, tz=self.tz):
+            print("❌ Failed to initialize Google Trends sessions")
+            return
+        sessions = {m.name: self.spawn_session(m) for m in pool.members if not m.disabled}
+        workers = min(workers, len(sessions))
+        jobs = [(keyword, country_name, geo_code)
+                for country_name, geo_code in geo_mapping.items() for keyword in keywords]
+        left = {country_name: len(keywords) for country_name in geo_mapping}
+        print(f"\n⚡ {len(jobs)} jobs on {workers} workers, {len(sessions)} sessions")
+        
+        def fetch(member, job):
+            print(f"\n🔍 Processing: {job[0]} ({job[1]}) via {member.name}")
+            return sessions[member.name]._collect_keyword(*job)
+        
+        def handle(job, result, error):
+            keyword, country_name, geo_code = job
+            if error is None:
+                self._record(results, keyword, country_name, geo_code, *result)
+            else:
+                results['total_requests'] += 1
+                print(f"  ❌ Error processing {keyword}: {error}")
+            left[country_name] -= 1
+            if not left[country_name]:
+                self._flush_store()
+        
+        ConcurrentRunner(pool, workers=workers).run(jobs, fetch, handle)
+    
+    def _extract_related_topics(self, keyword, country_name, geo_code, fetched):
+        """Format the Related Topics of a fetch engine result"""
+        return self._extract_related('related_topics', 'topics', keyword, country_name, geo_code, fetched)
+    
+    def _extract_related_queries(self, keyword, country_name, geo_code, fetched):
+        """Format the Related Queries of a fetch engine result"""
+        return self._extract_related('related_queries', 'queries', keyword, country_name, geo_code, fetched)
+    
+    def _extract_related(self, kind, label, keyword, country_name, geo_code, fetched):
+        """
+        Top and rising rows of one related data set in a single frame
+        
+        The frames are concatenated once and the annotation columns are
+        assigned to the whole result, with the run timestamp.
+        """
         try:
-            # Use official pytrends related_queries() method
-            related_queries = self.pytrends.related_queries()
+            if kind in fetched['errors']:
+                raise fetched['errors'][kind]
+            related = fetched[kind]
             
-            if not related_queries or keyword not in related_queries:
-                print(f"    📝 No related queries data for '{keyword}'")
+            if keyword not in related:
+                print(f"    📝 No related {label} data for '{keyword}'")
                 return None
             
-            data = related_queries[keyword]
-            dfs = []
-            
-            # Process top queries
-            if 'top' in data and data['top'] is not None and not data['top'].empty:
-                top_df = data['top'].copy()
-                top_df['Type'] = 'Top'
-                top_df['Keyword'] = keyword
-                top_df['Country'] = country_name
-                top_df['Geo_Code'] = geo_code
-                top_df['Extracted_Date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                dfs.append(top_df)
-                print(f"    📊 Top queries: {len(top_df)} items")
-            
-            # Process rising queries
-            if 'rising' in data and data['rising'] is not None and not data['rising'].empty:
-                rising_df = data['rising'].copy()
-                rising_df['Type'] = 'Rising'
-                rising_df['Keyword'] = keyword
-                rising_df['Country'] = country_name
-                rising_df['Geo_Code'] = geo_code
-                rising_df['Extracted_Date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                dfs.append(rising_df)
-                print(f"    📈 Rising queries: {len(rising_df)} items")
-            
-            if dfs:
-                return pd.concat(dfs, ignore_index=True)
-            return None
+            with self.metrics.timer('postprocess', dataset=kind):
+                data = related[keyword]
+                parts = []
+                for part, part_type, icon in (('top', 'Top', '📊'), ('rising', 'Rising', '📈')):
+                    df = data.get(part)
+                    if df is not None and not df.empty:
+                        parts.append((part_type, df))
+                        print(f"    {icon} {part_type} {label}: {len(df)} items")
+                
+                if not parts:
+                    return None
+                result = pd.concat([df for _, df in parts], ignore_index=True)
+                result['Type'] = np.repeat([part_type for part_type, _ in parts], [len(df) for _, df in parts])
+                result['Keyword'] = keyword
+                result['Country'] = country_name
+                result['Geo_Code'] = geo_code
+                result['Extracted_Date'] = self.run_timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                return result
             
         except Exception as e:
-            print(f"    ❌ Related Queries error: {e}")
+            print(f"    ❌ Related {label.title()} error: {e}")
             return None
     
     def save_to_sheets(self, results):
@@ -214,6 +322,9 @@ class GoogleTrendsRelatedExtractor:
             print("❌ Google Sheets not initialized")
             return False
         
+        if results.get('spill') is not None:
+            return self._save_spilled(results['spill'])
+        
         saved_count = 0
         
         # Save Related Topics
@@ -228,21 +339,84 @@ class GoogleTrendsRelatedExtractor:
             if self._write_to_sheet(queries_df, "Related Queries"):
                 saved_count += 1
         
+        if self.sheet_buffer is not None:
+            saved_count = self.sheet_buffer.flush()
+            print(f"📤 Sheets writes: {self.sheet_buffer.summary()}")
+        
         return saved_count > 0
-        """Write DataFrame to Google Sheet tab"""
+    
+    def _save_spilled(self, spill):
+        """Upload the spilled results tab by tab, one chunk of rows at a time, then remove them"""
+        saved_count = 0
+        try:
+            if self.sheet_buffer is not None:
+                # Tabs queued before the streamed ones keep their order
+                self.sheet_buffer.flush()
+            for kind, tab_name in (('related_topics', 'Related Topics'), ('related_queries', 'Related Queries')):
+                if not spill.rows.get(kind):
+                    continue
+                print(f"📤 Uploading {spill.rows[kind]} rows to '{tab_name}' in chunks of {self.upload_chunk_rows}")
+                if self._write_chunks(spill.chunks(kind, self.upload_chunk_rows), tab_name):
+                    saved_count += 1
+            if self.sheet_buffer is not None:
+                print(f"📤 Sheets writes: {self.sheet_buffer.summary()}")
+        finally:
+            spill.cleanup()
+        return saved_count > 0
+    
+    def _write_chunks(self, chunks, tab_name):
+        """Replace a tab's contents with a stream of DataFrames"""
+        if self.sheet_buffer is not None:
+            with self.metrics.timer('sheet_write', mode='stream'):
+                return self.sheet_buffer.write_chunks(chunks, tab_name) > 0
+        
+        rows = 0
+        try:
+            with self.metrics.timer('sheet_write', mode='stream'):
+                try:
+                    worksheet = self.spreadsheet.worksheet(tab_name)
+                    print(f"📄 Tab '{tab_name}' found, clearing old data")
+                    worksheet.clear()
+                except gspread.WorksheetNotFound:
+                    print(f"📄 Creating new tab '{tab_name}'")
+                    worksheet = self.spreadsheet.add_worksheet(title=tab_name, rows=200, cols=20)
+                
+                for chunk in chunks:
+                    # The header row goes above the first chunk, the others continue below
+                    set_with_dataframe(worksheet, chunk, row=rows + 2 if rows else 1,
+                                       include_column_header=not rows)
+                    rows += len(chunk)
+            self.metrics.count('sheet_tabs_written')
+            self.metrics.count('sheet_rows_written', rows)
+            print(f"✅ Written {rows} rows to '{tab_name}'")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Failed to write to '{tab_name}' after {rows} rows: {e}")
+            return False
+    
+    def _write_to_sheet(self, df, tab_name):
+        """Write DataFrame to Google Sheet tab (queued when batched writes are on)"""
         if df.empty:
             return False
+        
+        if self.sheet_buffer is not None:
+            self.sheet_buffer.write(df, tab_name)
+            return True
             
         try:
-            try:
-                worksheet = self.spreadsheet.worksheet(tab_name)
-                print(f"📄 Tab '{tab_name}' found, clearing old data")
-            except gspread.WorksheetNotFound:
-                print(f"📄 Creating new tab '{tab_name}'")
-                worksheet = self.spreadsheet.add_worksheet(title=tab_name, rows=max(200, len(df) + 10), cols=20)
-            
-            worksheet.clear()
-            set_with_dataframe(worksheet, df)
+            with self.metrics.timer('sheet_write', mode='direct'):
+                try:
+                    worksheet = self.spreadsheet.worksheet(tab_name)
+                    print(f"📄 Tab '{tab_name}' found, clearing old data")
+                except gspread.WorksheetNotFound:
+                    print(f"📄 Creating new tab '{tab_name}'")
+                    worksheet = self.spreadsheet.add_worksheet(title=tab_name, rows=max(200, len(df) + 10), cols=20)
+                
+                worksheet.clear()
+                set_with_dataframe(worksheet, df)
+            self.metrics.count('sheet_tabs_written')
+            self.metrics.count('sheet_rows_written', len(df))
             print(f"✅ Written {len(df)} rows to '{tab_name}'")
             return True
             
@@ -250,17 +424,45 @@ class GoogleTrendsRelatedExtractor:
             print(f"❌ Failed to write to '{tab_name}': {e}")
             return False
 
+def export_metrics(metrics, success):
+    """Finish the run metrics and write them where config.py says"""
+    config = load_config()
+    metrics.finish(success)
+    try:
+        for path in metrics.export(config.METRICS_DIR, config.METRICS_TEXTFILE_DIR):
+            print(f"📈 Metrics written to {path}")
+    except Exception as e:
+        print(f"⚠️ Could not export run metrics: {e}")
+
 def main():
     """Main function to extract related data"""
+    metrics = RunMetrics('related')
     try:
         # Load configuration
-        import config
+        config = load_config()
         
         # Initialize extractor
-        extractor = GoogleTrendsRelatedExtractor(hl='sk-SK', tz=60)
+        rate_limiter = RateLimiter(**rate_limit_settings(metrics=metrics))
+        cache = None
+        if config.CACHE_ENABLED:
+            cache = ResponseCache(
+                config.CACHE_FILE,
+                ttl=config.CACHE_TTL,
+                max_bytes=config.CACHE_MAX_MB * 1024 * 1024
+            )
+        store = TrendsDataStore(config.STORAGE_DIR) if config.STORAGE_ENABLED else None
+        credentials = CredentialCache(config.CREDENTIAL_CACHE_FILE) if config.CREDENTIAL_CACHE_FILE else None
+        extractor = GoogleTrendsRelatedExtractor(
+            hl=config.RELATED_TRENDS_HL or config.TRENDS_HL,
+            tz=config.TRENDS_TZ if config.RELATED_TRENDS_TZ is None else config.RELATED_TRENDS_TZ,
+            rate_limiter=rate_limiter, cache=cache, store=store, metrics=metrics,
+            streaming=config.RELATED_STREAMING, spill_dir=config.RELATED_SPILL_DIR,
+            upload_chunk_rows=config.RELATED_UPLOAD_CHUNK_ROWS, credentials=credentials
+        )
         
-        if not extractor.initialize():
+        if not extractor.initialize(connect_sheets=config.SHEETS_SYNC):
             print("❌ Failed to initialize extractor")
+            export_metrics(metrics, success=False)
             return
         
         # Extract related data
@@ -268,18 +470,30 @@ def main():
             keywords=config.KEYWORDS,
             geo_mapping=config.GEO_MAPPING,
             timeframe=config.TIMEFRAME,
-            delay=config.REQUEST_DELAY
+            sessions=config.CONCURRENT_SESSIONS,
+            max_in_flight=config.CONCURRENT_MAX_IN_FLIGHT,
+            proxies=config.TRENDS_PROXIES,
+            pool_settings={
+                'cooldown': config.SESSION_COOLDOWN,
+                'min_success_rate': config.SESSION_MIN_SUCCESS_RATE
+            }
         )
         
         # Print summary
         print(f"\n📊 Extraction Summary:")
         print(f"  Total requests: {results['total_requests']}")
         print(f"  Successful extractions: {results['success_count']}")
-        print(f"  Related Topics datasets: {len(results['related_topics'])}")
-        print(f"  Related Queries datasets: {len(results['related_queries'])}")
+        print(f"  Related Topics datasets: {results['datasets']['related_topics']}")
+        print(f"  Related Queries datasets: {results['datasets']['related_queries']}")
+        if results['spill'] is not None:
+            print(f"  Spilled: {results['spill'].summary()}")
         
         # Save to Google Sheets
-        if results['related_topics'] or results['related_queries']:
+        if not config.SHEETS_SYNC:
+            if results['spill'] is not None:
+                results['spill'].cleanup()
+            print(f"\n💾 Sheets sync disabled, data kept in '{config.STORAGE_DIR}'")
+        elif any(results['datasets'].values()):
             print(f"\n💾 Saving to Google Sheets...")
             if extractor.save_to_sheets(results):
                 print(f"✅ Data saved successfully!")
@@ -290,11 +504,14 @@ def main():
             print(f"\n⚠️ No data to save")
         
         print(f"\n✅ Related data extraction completed!")
+        print(f"📈 Time: {metrics.summary()}")
+        export_metrics(metrics, success=results['success_count'] > 0)
         
     except Exception as e:
         print(f"❌ Main error: {e}")
         import traceback
         traceback.print_exc()
+        export_metrics(metrics, success=False)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Trends Response Cache
+Persistent SQLite cache for pytrends results with per-type TTL and LRU eviction
+"""
+
+import hashlib
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Default time-to-live per data type in seconds
+DEFAULT_TTL = {
+    'interest_over_time': 6 * 3600,
+    'related_topics': 24 * 3600,
+    'related_queries': 24 * 3600,
+    'interest_window': 30 * 24 * 3600,
+    'interest_by_region': 24 * 3600,
+}
+
+
+def make_cache_key(kind, keywords, geo, timeframe, cat=0, gprop='', hl='en-US', tz=360, **options):
+    """Build a stable cache key from the data type, the full payload parameters and any request options"""
+    payload = {
+        'kind': kind,
+        'keywords': list(keywords),
+        'geo': geo,
+        'timeframe': timeframe,
+        'cat': cat,
+        'gprop': gprop,
+        'hl': hl,
+        'tz': tz,
+    }
+    payload.update(options)
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk cache of Trends fetch results
+
+    Entries live in one SQLite file, so several processes (e.g. main.py and
+    related_extractor.py run from cron) can share it safely. Each entry expires
+    after the TTL of its data type; when the file grows past max_bytes the least
+    recently used entries are evicted.
+    """
+
+    def __init__(self, path='trends_cache.sqlite', ttl=None, max_bytes=200 * 1024 * 1024):
+        """
+        Open (or create) the cache file
+
+        Args:
+            path (str): SQLite file path
+            ttl (dict): Seconds to keep each data type, merged over DEFAULT_TTL
+            max_bytes (int): Size cap of all stored values
+        """
+        self.path = path
+        self.ttl = dict(DEFAULT_TTL)
+        self.ttl.update(ttl or {})
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection that waits for other processes instead of failing on locks"""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, kind, params):
+        """
+        Return the cached value for a payload, or None when missing or expired
+
+        Args:
+            kind (str): Data type, e.g. 'interest_over_time'
+            params (dict): Keyword arguments for make_cache_key (keywords, geo, timeframe, ...)
+        """
+        key = make_cache_key(kind, **params)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute('SELECT value, created FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl.get(kind, 0):
+                self.misses += 1
+                if row is not None:
+                    conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                return None
+            conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+            self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, kind, params, value):
+        """Store a value for a payload and evict old entries above the size cap"""
+        key = make_cache_key(kind, **params)
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute(
+                    'INSERT OR REPLACE INTO entries (key, kind, value, size, created, accessed) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, kind, sqlite3.Binary(blob), len(blob), now, now)
+                )
+                self._evict(conn)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    def _evict(self, conn):
+        """Delete least recently used entries until the cache fits max_bytes"""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY accessed').fetchall():
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def get_or_fetch(self, kind, params, fetch):
+        """
+        Return the cached value or call fetch() and cache its result
+
+        Exceptions from fetch() propagate and nothing is cached.
+        """
+        value = self.get(kind, params)
+        if value is None:
+            value = fetch()
+            self.set(kind, params, value)
+        return value
+
+    def purge_expired(self):
+        """Remove all expired entries, returns the number removed"""
+        now = time.time()
+        removed = 0
+        with self._lock, self._connect() as conn:
+            for kind, ttl in self.ttl.items():
+                removed += conn.execute(
+                    'DELETE FROM entries WHERE kind = ? AND created < ?', (kind, now - ttl)
+                ).rowcount
+        return removed
+
+    def summary(self):
+        """Short human readable statistics line"""
+        return f"{self.hits} hits, {self.misses} misses"
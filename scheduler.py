@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Refresh Scheduler
+Staleness-ordered queue of (country, keyword, data set) items for the resident
+collector daemon, with refresh times kept across restarts
+"""
+
+import heapq
+import json
+import os
+import time
+
+
+class RefreshScheduler:
+    """
+    Priority queue of collection items ordered by staleness
+
+    Every item has a refresh interval and a priority; a priority of 2 halves
+    its interval. An item is due once its age reaches that effective interval,
+    and its staleness is age / effective interval, so overdue high-priority
+    items come first and items never refreshed come before everything else.
+    Failed items are retried after retry_delay instead of straight away.
+    """
+
+    def __init__(self, items, path='scheduler_state.json', retry_delay=900, clock=time.time):
+        """
+        Initialize the scheduler and load the refresh times of an earlier process
+
+        Args:
+            items (dict): (country, keyword, data set) -> (interval seconds, priority)
+            path (str): JSON state file path
+            retry_delay (float): Seconds before a failed item is tried again
+            clock (callable): Wall clock function (times are persisted)
+        """
+        self.items = {item: (interval / max(priority, 1e-9), priority)
+                      for item, (interval, priority) in items.items()}
+        self.path = path
+        self.retry_delay = retry_delay
+        self._clock = clock
+        self.refreshed = {}
+        self.retry_at = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            for key, entry in state.items():
+                country, rest = key.split('|', 1)
+                item = (country, *rest.rsplit('|', 1))
+                if item in self.items:
+                    if entry.get('refreshed') is not None:
+                        self.refreshed[item] = entry['refreshed']
+                    if entry.get('retry_at'):
+                        self.retry_at[item] = entry['retry_at']
+
+    def _due_at(self, item):
+        refreshed = self.refreshed.get(item)
+        due = refreshed + self.items[item][0] if refreshed is not None else 0.0
+        return max(due, self.retry_at.get(item, 0.0))
+
+    def staleness(self, item, now=None):
+        """Age of an item in effective intervals (inf when never refreshed)"""
+        refreshed = self.refreshed.get(item)
+        if refreshed is None:
+            return float('inf')
+        now = self._clock() if now is None else now
+        return (now - refreshed) / self.items[item][0]
+
+    def seconds_until_due(self, now=None):
+        """Seconds until the next item is due, 0 when something is due already"""
+        if not self.items:
+            return float('inf')
+        now = self._clock() if now is None else now
+        return max(0.0, min(self._due_at(item) for item in self.items) - now)
+
+    def due(self, now=None):
+        """Due items, stalest (then highest priority) first"""
+        now = self._clock() if now is None else now
+        ready = [item for item in self.items if self._due_at(item) <= now]
+        return heapq.nlargest(len(ready), ready,
+                              key=lambda item: (self.staleness(item, now), self.items[item][1]))
+
+    def next_unit(self, max_keywords, now=None):
+        """
+        Work unit around the stalest due item
+
+        Due items of the same country join it in staleness order until
+        max_keywords keywords are reached, so they share one payload.
+
+        Returns:
+            tuple: (country, keywords, set of (keyword, data set) due), or None when nothing is due
+        """
+        due = self.due(now)
+        if not due:
+            return None
+        country = due[0][0]
+        keywords = []
+        items = set()
+        for item_country, keyword, dataset in due:
+            if item_country != country:
+                continue
+            if keyword not in keywords:
+                if len(keywords) >= max_keywords:
+                    continue
+                keywords.append(keyword)
+            items.add((keyword, dataset))
+        return country, keywords, items
+
+    def mark_refreshed(self, items, when=None):
+        """Record (country, keyword, data set) items as freshly written"""
+        when = self._clock() if when is None else when
+        for item in items:
+            if item in self.items:
+                self.refreshed[item] = when
+                self.retry_at.pop(item, None)
+
+    def mark_failed(self, items, when=None):
+        """Postpone (country, keyword, data set) items that could not be refreshed"""
+        when = self._clock() if when is None else when
+        for item in items:
+            if item in self.items:
+                self.retry_at[item] = when + self.retry_delay
+
+    def save(self):
+        """Write the state file atomically"""
+        state = {}
+        for item in self.items:
+            if item in self.refreshed or item in self.retry_at:
+                state['|'.join(item)] = {'refreshed': self.refreshed.get(item),
+                                         'retry_at': self.retry_at.get(item)}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def summary(self, now=None):
+        """Short text summary of the queue"""
+        now = self._clock() if now is None else now
+        due = sum(1 for item in self.items if self._due_at(item) <= now)
+        never = sum(1 for item in self.items if item not in self.refreshed)
+        return f"{len(self.items)} items, {due} due, {never} never refreshed"
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Trends Session Pool
+Rotates TrendReq sessions across proxies/identities, tracks the health of each
+member and keeps throttled or failing members out of rotation for a while
+"""
+
+import functools
+import json
+import threading
+import time
+from collections import deque
+
+import requests
+from pytrends import exceptions
+from pytrends.request import BASE_TRENDS_URL, TrendReq
+
+from rate_limiter import RateLimiter, is_rate_limit_error
+
+# Longest reuse of a cached NID cookie, whatever expiry Google sets (often months)
+COOKIE_MAX_AGE = 24 * 3600
+
+
+def fetch_nid_cookie(session, hl, timeout, requests_args=None, credentials=None, identity='direct',
+                     max_age=COOKIE_MAX_AGE):
+    """
+    NID cookie of a Trends identity, from the credential cache while it is valid
+
+    Args:
+        session: requests.Session (or the requests module) making the cookie request
+        credentials (CredentialCache): Cache of cookies across runs (None = always fetch)
+        identity (str): Proxy or session name the cookie belongs to
+
+    Returns:
+        dict: {'NID': value}, empty when Google did not set one
+    """
+    key = f"nid:{identity}:{hl[-2:]}"
+    cached = credentials.get(key) if credentials is not None else None
+    if cached:
+        return dict(cached)
+    response = session.get(f'{BASE_TRENDS_URL}/explore/?geo={hl[-2:]}', timeout=timeout, **(requests_args or {}))
+    nid = [cookie for cookie in response.cookies if cookie.name == 'NID']
+    cookies = {cookie.name: cookie.value for cookie in nid}
+    if credentials is not None and cookies:
+        credentials.set(key, cookies, expires=min([c.expires for c in nid if c.expires] + [time.time() + max_age]))
+    return cookies
+
+
+class KeepAliveTrendReq(TrendReq):
+    """
+    TrendReq sending all its requests over one keep-alive HTTP session
+
+    pytrends opens a new session (and TLS connection) for every request; this
+    one keeps it for the life of the object. With a credential cache the NID
+    cookie is also reused across runs instead of being fetched on every start.
+    Proxy rotation through the pytrends proxies argument is not supported, the
+    session pool's members pass their proxy in requests_args instead.
+    """
+
+    def __init__(self, credentials=None, identity='direct', **kwargs):
+        """
+        Initialize the session
+
+        Args:
+            credentials (CredentialCache): Cache of the NID cookie across runs
+            identity (str): Name the cached cookie is stored under
+        """
+        self._http = requests.Session()
+        self._credentials = credentials
+        self._identity = identity
+        super().__init__(**kwargs)
+
+    def GetGoogleCookie(self):
+        return fetch_nid_cookie(self._http, self.hl, self.timeout, self.requests_args, self._credentials,
+                                self._identity)
+
+    def _get_data(self, url, method=TrendReq.GET_METHOD, trim_chars=0, **kwargs):
+        """Send a request on the kept-alive session and return the JSON response (like TrendReq._get_data)"""
+        self._http.headers.update(self.headers)
+        send = self._http.post if method == TrendReq.POST_METHOD else self._http.get
+        response = send(url, timeout=self.timeout, cookies=self.cookies, **kwargs, **self.requests_args)
+        content_type = response.headers.get('Content-Type', '')
+        if response.status_code == 200 and any(
+                kind in content_type for kind in ('application/json', 'application/javascript', 'text/javascript')):
+            # Responses start with garbage characters like ")]}'," to strip
+            return json.loads(response.text[trim_chars:])
+        if response.status_code == requests.codes.too_many_requests:
+            raise exceptions.TooManyRequestsError.from_response(response)
+        raise exceptions.ResponseError.from_response(response)
+
+
+class _PooledTrendReq(KeepAliveTrendReq):
+    """TrendReq that gets its NID cookie from its pool member instead of fetching one per instance"""
+
+    def __init__(self, member, **kwargs):
+        self._member = member
+        super().__init__(**kwargs)
+
+    def GetGoogleCookie(self):
+        return self._member.cookies(self.hl)
+
+
+class _MemberRateLimiter(RateLimiter):
+    """Rate limiter of one pool member that reports every request outcome to the member"""
+
+    def __init__(self, member, **kwargs):
+        super().__init__(**kwargs)
+        self.member = member
+
+    def call(self, func, *args, cost=1, **kwargs):
+        @functools.wraps(func)
+        def timed(*a, **kw):
+            start = time.monotonic()
+            try:
+                result = func(*a, **kw)
+            except Exception as e:
+                self.member.record(time.monotonic() - start, error=e)
+                raise
+            self.member.record(time.monotonic() - start)
+            return result
+
+        return super().call(timed, *args, cost=cost, **kwargs)
+
+
+class PoolMember:
+    """One proxy (or the direct connection) with its cookie, session, pacing and health statistics"""
+
+    def __init__(self, name, proxy=None, window=20, timeout=(2, 5), credentials=None):
+        self.name = name
+        self.proxy = proxy
+        self.timeout = timeout
+        self.credentials = credentials
+        self.rate_limiter = None
+        self.requests = 0
+        self.failures = 0
+        self.throttled = 0
+        self.total_latency = 0.0
+        self.cooldown_until = 0.0
+        self.disabled = False
+        self.in_use = False
+        self._outcomes = deque(maxlen=window)
+        self._consecutive_throttles = 0
+        self._cookies = None
+        self._trendreq = {}
+        self._lock = threading.Lock()
+
+    @property
+    def requests_args(self):
+        return {'proxies': {'http': self.proxy, 'https': self.proxy}} if self.proxy else {}
+
+    def cookies(self, hl):
+        """NID cookie of this identity, fetched once (or cached) and reused by all its TrendReq instances"""
+        with self._lock:
+            if self._cookies is None:
+                self._cookies = fetch_nid_cookie(requests, hl, self.timeout, self.requests_args,
+                                                 self.credentials, identity=self.name)
+            return dict(self._cookies)
+
+    def trendreq(self, hl='en-US', tz=360):
+        """This member's TrendReq session for a language/timezone, created on first use"""
+        key = (hl, tz)
+        if key not in self._trendreq:
+            self._trendreq[key] = _PooledTrendReq(self, hl=hl, tz=tz, timeout=self.timeout,
+                                                  requests_args=self.requests_args)
+        return self._trendreq[key]
+
+    def record(self, latency, error=None):
+        """Register the outcome of one request"""
+        throttled = error is not None and is_rate_limit_error(error)
+        with self._lock:
+            self.requests += 1
+            self.total_latency += latency
+            self._outcomes.append(error is None)
+            if error is not None:
+                self.failures += 1
+            if throttled:
+                self.throttled += 1
+                self._consecutive_throttles += 1
+            elif error is None:
+                self._consecutive_throttles = 0
+
+    @property
+    def success_rate(self):
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 1.0
+
+    @property
+    def mean_latency(self):
+        return self.total_latency / self.requests if self.requests else 0.0
+
+    def summary(self):
+        """Short human readable statistics line"""
+        return (f"{self.name}: {self.requests} requests, {self.success_rate:.0%} ok, "
+                f"{self.throttled} throttled, {self.mean_latency:.2f}s avg latency"
+                + (", disabled" if self.disabled else ""))
+
+
+class SessionPool:
+    """
+    Pool of Trends identities handed out to collection jobs
+
+    Each member is one proxy (None = direct connection) with its own warmed-up
+    NID cookie, TrendReq session and rate limiter. checkout() hands out the
+    healthiest idle member; members that were throttled (429) or whose recent
+    success rate fell below min_success_rate cool down before they are used again,
+    for cooldown seconds doubled per consecutive throttle.
+    """
+
+    def __init__(self, proxies=None, limiter_settings=None, cooldown=300, max_cooldown=3600,
+                 min_success_rate=0.5, min_requests=5, clock=time.monotonic, credentials=None):
+        """
+        Initialize the pool
+
+        Args:
+            proxies (list): Proxy URLs, one member each; None entries are direct identities
+            limiter_settings (dict): RateLimiter arguments for the pacing of each member
+            cooldown (float): Seconds a throttled or failing member stays out of rotation
+            max_cooldown (float): Longest cooldown after repeated throttling
+            min_success_rate (float): Recent success rate below which a member cools down
+            min_requests (int): Requests needed before the success rate is judged
+            clock (callable): Monotonic clock function
+            credentials (CredentialCache): Cache of the members' NID cookies across runs
+        """
+        proxies = list(proxies) if proxies else [None]
+        self.members = [PoolMember(proxy or f"direct-{index + 1}", proxy, credentials=credentials)
+                        for index, proxy in enumerate(proxies)]
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.min_success_rate = min_success_rate
+        self.min_requests = min_requests
+        self._clock = clock
+        self._condition = threading.Condition()
+        for member in self.members:
+            member.rate_limiter = _MemberRateLimiter(member, **(limiter_settings or {}))
+
+    def __len__(self):
+        return len([m for m in self.members if not m.disabled])
+
+    def warm_up(self, hl='en-US', tz=360):
+        """
+        Fetch the cookie and create the TrendReq session of every member
+
+        Members that cannot connect are disabled.
+
+        Returns:
+            int: Number of usable members
+        """
+        for member in self.members:
+            try:
+                member.trendreq(hl, tz)
+            except Exception as e:
+                member.disabled = True
+                print(f"    ❌ Session '{member.name}' could not connect: {e}")
+        return len(self)
+
+    def _is_healthy(self, member, now):
+        return not member.disabled and not member.in_use and member.cooldown_until <= now
+
+    def checkout(self):
+        """Take the healthiest available member, waiting while all are busy or cooling down"""
+        with self._condition:
+            while True:
+                if not len(self):
+                    raise RuntimeError('no usable Trends sessions left in the pool')
+                now = self._clock()
+                ready = [m for m in self.members if self._is_healthy(m, now)]
+                if ready:
+                    member = max(ready, key=lambda m: (m.success_rate, -m.mean_latency))
+                    member.in_use = True
+                    return member
+                waiting = [m.cooldown_until - now for m in self.members
+                           if not m.disabled and not m.in_use and m.cooldown_until > now]
+                self._condition.wait(timeout=min(waiting) if waiting else None)
+
+    def checkin(self, member):
+        """Return a member and send it to cooldown if it was throttled or keeps failing"""
+        with self._condition:
+            member.in_use = False
+            reason = None
+            if member._consecutive_throttles:
+                reason = f"{member._consecutive_throttles} consecutive 429s"
+                cooldown = self.cooldown * 2 ** (member._consecutive_throttles - 1)
+            elif len(member._outcomes) >= self.min_requests and member.success_rate < self.min_success_rate:
+                reason = f"success rate {member.success_rate:.0%}"
+                cooldown = self.cooldown
+                member._outcomes.clear()
+            if reason:
+                cooldown = min(cooldown, self.max_cooldown)
+                member.cooldown_until = self._clock() + cooldown
+                print(f"    🧊 Session '{member.name}' out of rotation for {cooldown:.0f}s ({reason})")
+            self._condition.notify_all()
+
+    def summary(self):
+        """One statistics line per member"""
+        return [member.summary() for member in self.members]
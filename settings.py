@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Configuration Loading
+Explicit loading and checking of the configuration module, without importing
+any of the heavy collection dependencies
+"""
+
+import importlib
+import importlib.util
+import os
+import re
+from datetime import date
+
+DEFAULT_CONFIG = 'config'
+# Environment variable naming another configuration module, e.g. TRENDS_CONFIG=config_test
+CONFIG_ENV = 'TRENDS_CONFIG'
+
+REQUIRED_SETTINGS = ['SERVICE_ACCOUNT_FILE', 'SPREADSHEET_NAME', 'KEYWORDS', 'GEO_MAPPING', 'TIMEFRAME']
+REGION_RESOLUTIONS = ('COUNTRY', 'REGION', 'DMA', 'CITY')
+# Settings every project definition must have (the others default to the configuration)
+PROJECT_SETTINGS = ['SPREADSHEET_NAME', 'KEYWORDS', 'GEO_MAPPING']
+
+
+def config_name():
+    """Name of the configuration module to load"""
+    return os.environ.get(CONFIG_ENV) or DEFAULT_CONFIG
+
+
+def load_config(name=None):
+    """
+    Import the configuration module
+
+    Args:
+        name (str): Module name (default: $TRENDS_CONFIG, else 'config')
+
+    Returns:
+        module: The configuration module, raises ImportError when it does not exist
+    """
+    return importlib.import_module(name or config_name())
+
+
+def validate_config(config):
+    """
+    Settings of a configuration module that would make a run fail or misbehave
+
+    Returns:
+        list: Problem descriptions, empty when the configuration is usable
+    """
+    problems = [f"{name} is missing" for name in REQUIRED_SETTINGS if not hasattr(config, name)]
+    if problems:
+        return problems
+
+    keywords = config.KEYWORDS
+    if not keywords:
+        problems.append("KEYWORDS is empty")
+    elif len(set(keywords)) != len(keywords):
+        problems.append("KEYWORDS contains duplicates")
+    if not config.GEO_MAPPING:
+        problems.append("GEO_MAPPING is empty")
+
+    if getattr(config, 'BATCH_KEYWORDS', False) and not 2 <= getattr(config, 'BATCH_SIZE', 5) <= 5:
+        problems.append("BATCH_SIZE must be between 2 and 5 (anchor keyword + up to 4 others)")
+    anchor = getattr(config, 'ANCHOR_KEYWORD', None)
+    if anchor and keywords and anchor not in keywords:
+        problems.append(f"ANCHOR_KEYWORD '{anchor}' is not in KEYWORDS")
+
+    low, start, high = (getattr(config, name, 1) for name in (
+        'RATE_LIMIT_MIN_PER_MINUTE', 'RATE_LIMIT_REQUESTS_PER_MINUTE', 'RATE_LIMIT_MAX_PER_MINUTE'))
+    if not 0 < low <= start <= high:
+        problems.append("RATE_LIMIT_MIN/REQUESTS/MAX_PER_MINUTE must satisfy 0 < min <= start <= max")
+    if getattr(config, 'CONCURRENT_SESSIONS', 1) < 1:
+        problems.append("CONCURRENT_SESSIONS must be at least 1")
+
+    long_range_start = getattr(config, 'LONG_RANGE_START', None)
+    if long_range_start:
+        try:
+            date.fromisoformat(str(long_range_start))
+        except ValueError:
+            problems.append(f"LONG_RANGE_START '{long_range_start}' is not a YYYY-MM-DD date")
+        window = getattr(config, 'LONG_RANGE_WINDOW_DAYS', 270)
+        overlap = getattr(config, 'LONG_RANGE_OVERLAP_DAYS', 60)
+        if window > 270:
+            problems.append("LONG_RANGE_WINDOW_DAYS above 270 returns weekly instead of daily data")
+        if not 0 < overlap < window:
+            problems.append("LONG_RANGE_OVERLAP_DAYS must be positive and shorter than the window")
+
+    resolution = getattr(config, 'REGION_RESOLUTION', 'COUNTRY')
+    if getattr(config, 'REGIONAL_MODE', False) and resolution not in REGION_RESOLUTIONS:
+        problems.append(f"REGION_RESOLUTION must be one of {', '.join(REGION_RESOLUTIONS)}")
+
+    layout = getattr(config, 'SHEETS_LAYOUT', 'tabs')
+    if layout not in ('tabs', 'long'):
+        problems.append("SHEETS_LAYOUT must be 'tabs' or 'long'")
+    elif layout == 'long' and not getattr(config, 'STORAGE_ENABLED', True):
+        problems.append("SHEETS_LAYOUT = 'long' is built from the local store and needs STORAGE_ENABLED")
+    if getattr(config, 'SHEETS_LONG_TAB_ROWS', 50000) < 1:
+        problems.append("SHEETS_LONG_TAB_ROWS must be at least 1")
+
+    if getattr(config, 'SHEETS_SYNC', True) and not os.path.exists(config.SERVICE_ACCOUNT_FILE):
+        problems.append(f"Service account file '{config.SERVICE_ACCOUNT_FILE}' not found (needed by SHEETS_SYNC)")
+    return problems
+
+
+def scoped_path(path, scope=None):
+    """
+    Path of a state file or directory for one scope of a run
+
+    Args:
+        path (str): Configured path, e.g. 'job_queue.sqlite'
+        scope (str): Scope like a timeframe, None for the path itself
+
+    Returns:
+        str: e.g. 'job_queue.today_12-m.sqlite'
+    """
+    if not scope:
+        return path
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', scope).strip('_')
+    root, ext = os.path.splitext(path)
+    return f"{root}.{slug}{ext}"
+
+
+def load_projects(directory, config):
+    """
+    Project definitions of a multi-project run
+
+    Every *.py file of the directory is one project, written like config.py:
+    SPREADSHEET_NAME, KEYWORDS and GEO_MAPPING, optionally TIMEFRAME and
+    SERVICE_ACCOUNT_FILE (default: the configuration's).
+
+    Returns:
+        list: Project dicts ('name', 'spreadsheet_name', 'service_account_file',
+              'keywords', 'geo_mapping', 'timeframe', 'missing') sorted by file
+              name; raises OSError when the directory does not exist
+    """
+    projects = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.py') or filename.startswith('_'):
+            continue
+        name = filename[:-3]
+        spec = importlib.util.spec_from_file_location(f"project_{name}", os.path.join(directory, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        projects.append({
+            'name': name,
+            'spreadsheet_name': getattr(module, 'SPREADSHEET_NAME', None),
+            'service_account_file': getattr(module, 'SERVICE_ACCOUNT_FILE', config.SERVICE_ACCOUNT_FILE),
+            'keywords': list(getattr(module, 'KEYWORDS', [])),
+            'geo_mapping': dict(getattr(module, 'GEO_MAPPING', {})),
+            'timeframe': getattr(module, 'TIMEFRAME', config.TIMEFRAME),
+            'missing': [setting for setting in PROJECT_SETTINGS if not hasattr(module, setting)],
+        })
+    return projects
+
+
+def validate_projects(projects):
+    """
+    Project definitions that would make a multi-project run fail or misbehave
+
+    Returns:
+        list: Problem descriptions, empty when every project is usable
+    """
+    if not projects:
+        return ["No project definitions found"]
+    problems = []
+    spreadsheets = {}
+    for project in projects:
+        name = project['name']
+        problems.extend(f"Project '{name}': {setting} is missing" for setting in project['missing'])
+        if not project['keywords']:
+            problems.append(f"Project '{name}': KEYWORDS is empty")
+        elif len(set(project['keywords'])) != len(project['keywords']):
+            problems.append(f"Project '{name}': KEYWORDS contains duplicates")
+        if not project['geo_mapping']:
+            problems.append(f"Project '{name}': GEO_MAPPING is empty")
+        other = spreadsheets.setdefault(project['spreadsheet_name'], name)
+        if other != name:
+            problems.append(f"Projects '{other}' and '{name}' write the same spreadsheet")
+    return problems
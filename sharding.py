@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Sharded Collection
+Several processes or hosts (e.g. one per egress IP) each collect one
+deterministic shard of the keyword x country matrix into a shared local
+store; a merge step then writes the finished run to Google Sheets once
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import socket
+import sys
+from datetime import datetime
+
+from main import GoogleTrendsCollector, config, create_data_store, export_run_metrics
+from metrics import RunMetrics
+from planning import parse_shard, shard_scope
+
+MERGED_MARKER = 'merged.json'
+
+
+def default_run_id():
+    """Run id shared by the shards of a daily sweep: today's date"""
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+def run_fingerprint(count):
+    """Short hash of everything that decides the partition; every shard of a run must agree on it"""
+    scope = {
+        'shards': count,
+        'keywords': list(config.KEYWORDS),
+        'geo_mapping': config.GEO_MAPPING,
+        'batch': bool(config.BATCH_KEYWORDS),
+        'timeframe': config.TIMEFRAME,
+    }
+    return hashlib.md5(json.dumps(scope, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+class ShardSpool:
+    """
+    Completion markers of the shards of one run, in SHARD_DIR/<run id>/
+
+    Each shard writes its marker atomically once its data is in the store.
+    The merge holds an exclusive file lock while it writes, and records that
+    the run was merged, so however often it is started (by every shard host's
+    cron, say) the spreadsheet is written once per run.
+    """
+
+    def __init__(self, directory, run_id, count):
+        """
+        Initialize the spool
+
+        Args:
+            directory (str): SHARD_DIR, shared by every shard and the merge
+            run_id (str): Run the shards belong to, e.g. '2024-05-01'
+            count (int): Number of shards of the run
+        """
+        self.path = os.path.join(directory, run_id)
+        self.run_id = run_id
+        self.count = count
+        self.fingerprint = run_fingerprint(count)
+        os.makedirs(self.path, exist_ok=True)
+
+    def _marker_path(self, index):
+        return os.path.join(self.path, f"shard-{index}-of-{self.count}.json")
+
+    def _write_json(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def mark_done(self, index, success, pairs):
+        """Record the outcome of a shard"""
+        self._write_json(self._marker_path(index), {
+            'shard': f"{index}/{self.count}",
+            'fingerprint': self.fingerprint,
+            'success': bool(success),
+            'pairs': pairs,
+            'host': socket.gethostname(),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+        })
+
+    def missing(self):
+        """
+        Shards that have not (successfully) finished the run with this configuration
+
+        Returns:
+            list: Descriptions like '2/4 failed', empty when the run can be merged
+        """
+        missing = []
+        for index in range(1, self.count + 1):
+            try:
+                with open(self._marker_path(index)) as f:
+                    marker = json.load(f)
+            except (OSError, ValueError):
+                missing.append(f"{index}/{self.count} not finished")
+                continue
+            if marker.get('fingerprint') != self.fingerprint:
+                missing.append(f"{index}/{self.count} ran another configuration")
+            elif not marker.get('success'):
+                missing.append(f"{index}/{self.count} failed")
+        return missing
+
+    def merged(self):
+        return os.path.exists(os.path.join(self.path, MERGED_MARKER))
+
+    def mark_merged(self):
+        self._write_json(os.path.join(self.path, MERGED_MARKER), {
+            'host': socket.gethostname(),
+            'merged_at': datetime.now().isoformat(timespec='seconds'),
+        })
+
+    def merge_lock(self):
+        """
+        Take the run's merge lock without waiting
+
+        Returns:
+            file: Open lock file (closing it releases the lock), None when another merge holds it
+        """
+        lock = open(os.path.join(self.path, 'merge.lock'), 'w')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return None
+        return lock
+
+
+def _check_sharding():
+    """Configuration problems that rule out a sharded run"""
+    problems = []
+    if not config.STORAGE_ENABLED:
+        problems.append("Sharded runs collect into the local store, enable STORAGE_ENABLED")
+    if config.REGIONAL_MODE:
+        problems.append("REGIONAL_MODE is not supported in sharded runs")
+    return problems
+
+
+def run_shard(shard, run_id=None):
+    """
+    Collect one shard into the shared store, without writing to Google Sheets
+
+    The shard has a job queue and incremental state of its own
+    (e.g. job_queue.shard2of4.sqlite), so shards on one host do not share them.
+
+    Args:
+        shard (str): 'i/N', the i-th of N shards
+        run_id (str): Run the shard belongs to (default: today's date)
+
+    Returns:
+        bool: True when the shard was collected
+    """
+    try:
+        index, count = parse_shard(shard)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    run_id = run_id or default_run_id()
+    problems = _check_sharding()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        return False
+
+    scope = shard_scope(config, index, count)
+    pairs = sum(len(keywords) for keywords in scope['country_keywords'].values())
+    spool = ShardSpool(config.SHARD_DIR, run_id, count)
+    print(f"🧩 Shard {index}/{count} of run '{run_id}': {pairs} keyword/country pairs "
+          f"in {len(scope['geo_mapping'])} countries")
+    if not pairs:
+        spool.mark_done(index, True, 0)
+        print("✅ Nothing to collect on this shard")
+        return True
+
+    metrics = RunMetrics(f"shard{index}of{count}")
+    collector = GoogleTrendsCollector(metrics=metrics, keywords=scope['keywords'],
+                                      geo_mapping=scope['geo_mapping'],
+                                      country_keywords=scope['country_keywords'],
+                                      state_scope=f"shard{index}of{count}", sheets_sync=False)
+    # All shards append to one store; its files are uniquely named, so they never collide
+    collector.store = create_data_store()
+    success = collector.run()
+    spool.mark_done(index, success, pairs)
+    return success
+
+
+def _write_from_store(collector):
+    """Write the configured keywords' tabs from the store; returns True when all were written"""
+    if config.SHEETS_LAYOUT == 'long':
+        success = collector.write_long_layout()
+    else:
+        names = {f"{country_name}_{keyword}_{suffix}" for country_name in collector.geo_mapping
+                 for keyword in collector.keywords for suffix in ('Interest', 'Topics', 'Queries')}
+        tabs = {name: df for name, df in collector.store.sheet_tabs().items() if name in names}
+        print(f"💾 Writing {len(tabs)} tabs from '{collector.store.root}'")
+        success = all([collector.write_to_sheet(df, name) for name, df in tabs.items()])
+    success = collector.write_alerts_tab() and success
+    collector.flush_sheets()
+    buffer = collector.sheet_buffer
+    return success and (buffer is None or not buffer.tabs_failed)
+
+
+def merge_shards(count, run_id=None):
+    """
+    Write a sharded run to Google Sheets once all its shards finished
+
+    Safe to start repeatedly and from several hosts: it waits for nothing,
+    writes only when every shard succeeded, and a run is merged once.
+
+    Args:
+        count (int): Number of shards of the run
+        run_id (str): Run to merge (default: today's date)
+
+    Returns:
+        bool: True when the run is (or already was) merged
+    """
+    run_id = run_id or default_run_id()
+    problems = _check_sharding()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        return False
+
+    spool = ShardSpool(config.SHARD_DIR, run_id, count)
+    lock = spool.merge_lock()
+    if lock is None:
+        print(f"⏳ Run '{run_id}' is being merged by another process")
+        return True
+    try:
+        if spool.merged():
+            print(f"✅ Run '{run_id}' was already merged")
+            return True
+        missing = spool.missing()
+        if missing:
+            print(f"⏳ Run '{run_id}' cannot be merged yet: {', '.join(missing)}")
+            return False
+
+        print(f"🧩 Merging {count} shards of run '{run_id}'")
+        metrics = RunMetrics('merge')
+        success = False
+        try:
+            if config.SHEETS_SYNC:
+                collector = GoogleTrendsCollector(metrics=metrics)
+                success = collector.initialize_google_sheets() and _write_from_store(collector)
+            else:
+                success = True
+        finally:
+            export_run_metrics(metrics, success)
+        if not success:
+            print("❌ Some tabs were not written, the merge will be retried")
+            return False
+        spool.mark_merged()
+        print(f"✅ Run '{run_id}' merged")
+        return True
+    finally:
+        lock.close()
+
+
+if __name__ == "__main__":
+    # python3 sharding.py 2/4 [run id]     collect shard 2 of 4
+    # python3 sharding.py merge 4 [run id] merge the 4 shards of a run
+    if len(sys.argv) > 2 and sys.argv[1] == 'merge':
+        ok = merge_shards(int(sys.argv[2]), sys.argv[3] if len(sys.argv) > 3 else None)
+    else:
+        ok = run_shard(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    sys.exit(0 if ok else 1)
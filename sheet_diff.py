@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Sheet Diff Planner
+Row-level diff between the current contents of a tab and new data, so only
+changed rows, new rows and deleted rows are sent to Google Sheets
+"""
+
+import re
+
+import pandas as pd
+
+# Columns that identify a row, used when present in the data
+DEFAULT_KEY_COLUMNS = ['Date', 'Keyword', 'Country', 'Geo_Code', 'Type', 'topic_mid', 'query']
+
+# Columns that change on every run and should not count as a change on their own
+DEFAULT_IGNORE_COLUMNS = ['Extracted_Date']
+
+_DATE_PATTERN = re.compile(r'^\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}')
+
+
+def normalize_cell(value):
+    """Comparable form of a cell, so '100', 100 and 100.0 or two spellings of a date match"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return round(float(value), 6)
+    text = str(value).strip()
+    try:
+        return round(float(text), 6)
+    except ValueError:
+        pass
+    if _DATE_PATTERN.match(text):
+        try:
+            return pd.Timestamp(text).isoformat()
+        except (ValueError, OverflowError):
+            pass
+    return text
+
+
+def _merge_blocks(updates):
+    """Group (row_number, values) pairs into blocks of consecutive rows"""
+    blocks = []
+    for row_number, values in sorted(updates, key=lambda item: item[0]):
+        if blocks and blocks[-1][0] + len(blocks[-1][1]) == row_number:
+            blocks[-1][1].append(values)
+        else:
+            blocks.append((row_number, [values]))
+    return blocks
+
+
+def _merge_ranges(rows):
+    """Group row numbers into (first, last) ranges of consecutive rows"""
+    ranges = []
+    for row in sorted(rows):
+        if ranges and ranges[-1][1] + 1 == row:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return [tuple(r) for r in ranges]
+
+
+def plan_diff(current, new, key_columns=None, ignore_columns=None):
+    """
+    Plan the minimal writes that turn the current tab contents into the new values
+
+    Rows are matched by their key columns, and the result keeps the row order of
+    the new data. While the kept rows stay in order and new rows only follow
+    them (a rolling date window), changed rows are updated in place, new rows
+    appended and rows that disappeared deleted. When kept rows move (a reranked
+    list) one block is rewritten from the first row that differs. When the
+    header changed or keys are not unique the whole range is overwritten in
+    place (still without clearing the tab first).
+
+    Args:
+        current (list): Current rows of the tab, header first (as returned by the API)
+        new (list): New rows, header first
+        key_columns (list): Columns identifying a row (default: DEFAULT_KEY_COLUMNS present)
+        ignore_columns (list): Columns not compared (default: DEFAULT_IGNORE_COLUMNS)
+
+    Returns:
+        dict: 'blocks' [(first_row, rows)], 'deletes' [(first_row, last_row)],
+              'last_row', 'changed', 'added', 'deleted', 'rewrite'
+    """
+    header = list(new[0]) if new else []
+    width = len(header)
+    key_columns = [c for c in (key_columns or DEFAULT_KEY_COLUMNS) if c in header]
+    ignore_columns = ignore_columns if ignore_columns is not None else DEFAULT_IGNORE_COLUMNS
+
+    def rewrite():
+        leftover = list(range(len(new) + 1, len(current) + 1))
+        # Blank out columns the new data no longer has
+        current_width = max([len(row) for row in current] + [width])
+        return {
+            'blocks': [(1, [list(row) + [''] * (current_width - len(row)) for row in new])],
+            'deletes': _merge_ranges(leftover),
+            'last_row': len(new),
+            'changed': max(0, min(len(current), len(new)) - 1),
+            'added': max(0, len(new) - len(current)),
+            'deleted': len(leftover),
+            'rewrite': True
+        }
+
+    current_header = [str(c) for c in current[0]] if current else []
+    if not current or current_header[:width] != [str(c) for c in header] or not key_columns:
+        return rewrite()
+
+    key_index = [header.index(c) for c in key_columns]
+    compare_index = [i for i, c in enumerate(header) if c not in ignore_columns]
+
+    existing = {}
+    for row_number, row in enumerate(current[1:], start=2):
+        row = list(row) + [''] * (width - len(row))
+        key = tuple(normalize_cell(row[i]) for i in key_index)
+        if key in existing:
+            return rewrite()
+        existing[key] = (row_number, row)
+
+    updates = []
+    additions = []
+    kept_rows = []
+    inserted = False
+    seen = set()
+    for row in new[1:]:
+        key = tuple(normalize_cell(row[i]) for i in key_index)
+        if key in seen:
+            return rewrite()
+        seen.add(key)
+        if key in existing:
+            row_number, old = existing[key]
+            # A new row before a kept one cannot simply be appended
+            inserted = inserted or bool(additions)
+            kept_rows.append(row_number)
+            if any(normalize_cell(old[i]) != normalize_cell(row[i]) for i in compare_index):
+                updates.append((row_number, list(row)))
+        else:
+            additions.append(list(row))
+    changed = len(updates)
+    free_rows = sorted(row_number for key, (row_number, _) in existing.items() if key not in seen)
+
+    if inserted or kept_rows != sorted(kept_rows):
+        # Rows move: rewrite everything from the first row that differs, so the order matches
+        first = 1
+        while first < min(len(current), len(new)):
+            old = list(current[first]) + [''] * width
+            if any(normalize_cell(old[i]) != normalize_cell(new[first][i]) for i in compare_index):
+                break
+            first += 1
+        return {
+            'blocks': [(first + 1, [list(row) for row in new[first:]])] if first < len(new) else [],
+            'deletes': _merge_ranges(range(len(new) + 1, len(current) + 1)),
+            'last_row': len(new),
+            'changed': changed,
+            'added': len(additions),
+            'deleted': len(free_rows),
+            'rewrite': False
+        }
+
+    # Kept rows stay in order and new rows follow them: append, then delete the freed rows above
+    next_row = len(current) + 1
+    for row in additions:
+        updates.append((next_row, row))
+        next_row += 1
+
+    return {
+        'blocks': _merge_blocks(updates),
+        'deletes': _merge_ranges(free_rows),
+        'last_row': next_row - 1,
+        'changed': changed,
+        'added': len(additions),
+        'deleted': len(free_rows),
+        'rewrite': False
+    }
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Consolidated Google Sheets Layout
+One long-format table per data set instead of one tab per country, keyword
+and data set, split into tabs of bounded size, with an index tab that points
+to each keyword's rows
+"""
+
+import pandas as pd
+
+# Data set -> name of its first tab; further tabs are numbered (Interest_2, ...)
+LONG_TAB_NAMES = {
+    'interest': 'Interest',
+    'related_topics': 'Topics',
+    'related_queries': 'Queries',
+}
+INDEX_TAB = 'Index'
+
+# Google Sheets cells allowed per spreadsheet
+SHEETS_CELL_LIMIT = 10_000_000
+
+# Continuation tabs of an earlier, longer run (deleted once no longer written)
+STALE_TAB_PATTERN = '(' + '|'.join(LONG_TAB_NAMES.values()) + r')_\d+'
+
+
+def partition_rows(df, max_rows):
+    """
+    Split a table sorted by Country and Keyword into parts of at most max_rows rows
+
+    A keyword's rows of one country stay in one part, unless they alone are
+    longer than max_rows.
+
+    Returns:
+        list: DataFrames, one per tab
+    """
+    if df.empty:
+        return []
+    sizes = df.groupby(['Country', 'Keyword'], sort=False).size()
+    parts, start, rows = [], 0, 0
+    for size in sizes:
+        if rows and rows + size > max_rows:
+            parts.append((start, start + rows))
+            start, rows = start + rows, 0
+        rows += size
+        while rows > max_rows:
+            parts.append((start, start + max_rows))
+            start, rows = start + max_rows, rows - max_rows
+    if rows:
+        parts.append((start, start + rows))
+    return [df.iloc[first:last].reset_index(drop=True) for first, last in parts]
+
+
+def select_pairs(tables, pairs):
+    """
+    Rows of the tracked keywords of a spreadsheet
+
+    Args:
+        tables (dict): TrendsDataStore.long_tables() result
+        pairs (dict): (stored country, keyword) -> country name shown in the spreadsheet
+
+    Returns:
+        dict: Data set -> rows of the pairs, Country renamed, sorted like the pairs
+    """
+    order = {pair: position for position, pair in enumerate(pairs)}
+    selected = {}
+    for name, df in tables.items():
+        if df.empty:
+            selected[name] = df
+            continue
+        keys = pd.Series(list(zip(df['Country'], df['Keyword'])), index=df.index)
+        df = df[keys.isin(order)].copy()
+        keys = keys[df.index]
+        df['Country'] = [pairs[key] for key in keys]
+        df['_order'] = [order[key] for key in keys]
+        selected[name] = (df.sort_values('_order', kind='stable')
+                          .drop(columns=['_order']).reset_index(drop=True))
+    return selected
+
+
+def long_layout(tables, max_rows):
+    """
+    Tabs of the consolidated layout
+
+    Args:
+        tables (dict): Data set -> long-format rows (Country, Keyword first)
+        max_rows (int): Data rows per tab
+
+    Returns:
+        dict: Tab name -> DataFrame, the index tab last
+    """
+    tabs = {}
+    index = []
+    for name, df in tables.items():
+        for number, part in enumerate(partition_rows(df, max_rows), start=1):
+            tab_name = LONG_TAB_NAMES[name] if number == 1 else f"{LONG_TAB_NAMES[name]}_{number}"
+            tabs[tab_name] = part
+            last_column = _column_letter(len(part.columns))
+            # Row 1 is the header, so data row i is sheet row i + 2
+            spans = part.groupby(['Country', 'Keyword'], sort=False).indices
+            for (country, keyword), rows in spans.items():
+                index.append({
+                    'Data': LONG_TAB_NAMES[name],
+                    'Country': country,
+                    'Keyword': keyword,
+                    'Tab': tab_name,
+                    'Rows': len(rows),
+                    'Range': f"{tab_name}!A{rows[0] + 2}:{last_column}{rows[-1] + 2}",
+                })
+    if index:
+        tabs[INDEX_TAB] = pd.DataFrame(index)
+    return tabs
+
+
+def layout_cells(tabs):
+    """Cells the tabs take up when each is sized to its data (header included)"""
+    return sum((len(df) + 1) * len(df.columns) for df in tabs.values())
+
+
+def _column_letter(number):
+    """A1 column name of a 1-based column number"""
+    letters = ''
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Batched Google Sheets Writer
+Collects tab writes during a run and sends them in a few batch requests
+"""
+
+import re
+from numbers import Real
+
+import pandas as pd
+
+from rate_limiter import RateLimiter
+from sheet_diff import plan_diff
+
+# Keep each values_batch_update request well below the 10 MB request size limit
+MAX_CELLS_PER_REQUEST = 50000
+
+
+def quote_tab(tab_name):
+    """A1 notation sheet name, quoted so spaces and symbols are allowed"""
+    return "'" + tab_name.replace("'", "''") + "'"
+
+
+def _cell(value):
+    """Convert a DataFrame value into a JSON-safe Sheets cell value (like gspread_dataframe)"""
+    if pd.isnull(value):
+        return ''
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, (Real, bool)):
+        return value
+    value = str(value)
+    return "'" + value if value.startswith('=') else value
+
+
+def dataframe_to_values(df, include_header=True):
+    """Turn a DataFrame into a list of rows for the Sheets values API"""
+    rows = [[_cell(value) for value in row] for row in df.itertuples(index=False)]
+    if include_header:
+        rows.insert(0, [str(column) for column in df.columns])
+    return rows
+
+
+def _resize_request(sheet_id, rows, cols):
+    """batch_update request setting a tab's grid size"""
+    return {'updateSheetProperties': {
+        'properties': {'sheetId': sheet_id, 'gridProperties': {'rowCount': rows, 'columnCount': cols}},
+        'fields': 'gridProperties(rowCount,columnCount)'
+    }}
+
+
+class SheetWriteBuffer:
+    """
+    Write buffer for one spreadsheet
+
+    write() and append() only queue data. flush() then:
+      1. resolves all worksheets with one spreadsheet.worksheets() call
+      2. reads the row count of appended tabs (and, in diff mode, the current
+         contents of replaced tabs) in one values_batch_get
+      3. creates missing tabs and grows small ones in one batch_update
+      4. clears replaced tabs in one values_batch_clear (not needed in diff mode)
+      5. writes all values in as few values_batch_update requests as possible
+      6. deletes rows that disappeared (diff mode), shrinks tabs written with
+         fit=True to their data and deletes stale tabs in one batch_update
+    Every API call goes through a rate limiter sized to the Sheets write quota.
+    """
+
+    def __init__(self, spreadsheet, flush_size=0, writes_per_minute=50, rate_limiter=None, diff=False,
+                 metrics=None):
+        """
+        Initialize the buffer
+
+        Args:
+            spreadsheet (gspread.Spreadsheet): Target spreadsheet
+            flush_size (int): Pending tabs that trigger an automatic flush (0 = manual only)
+            writes_per_minute (int): Sheets API calls allowed per minute
+            rate_limiter (RateLimiter): Limiter to use instead of a new one
+            diff (bool): Replace existing tabs by sending only changed, added and deleted rows
+            metrics (RunMetrics): Receives flush timings and the Sheets API call metrics
+        """
+        self.spreadsheet = spreadsheet
+        self.flush_size = flush_size
+        self.diff = diff
+        self.metrics = metrics
+        self.rate_limiter = rate_limiter or RateLimiter(
+            requests_per_minute=writes_per_minute,
+            min_per_minute=max(1, writes_per_minute // 4),
+            max_per_minute=writes_per_minute,
+            burst=5,
+            backoff_base=10,
+            max_backoff=120,
+            metrics=metrics,
+            api='sheets'
+        )
+        self.api_calls = 0
+        self.tabs_written = 0
+        self.tabs_failed = 0
+        self.cells_written = 0
+        self._pending = {}
+        self._stale_patterns = []
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _queue(self, tab_name, df, mode, on_written, key_columns=None, fit=False):
+        """Queue a write; a replace overrides anything queued for the tab, appends accumulate"""
+        entry = self._pending.get(tab_name)
+        if mode == 'append' and entry is not None:
+            entry['frames'].append(df)
+            if on_written:
+                entry['callbacks'].append(on_written)
+        else:
+            # The replacement also completes the writes it overrides
+            callbacks = entry['callbacks'] if entry is not None else []
+            self._pending[tab_name] = {
+                'mode': mode,
+                'frames': [df],
+                'callbacks': callbacks + ([on_written] if on_written else []),
+                'key_columns': key_columns,
+                'fit': fit
+            }
+        if self.flush_size and len(self._pending) >= self.flush_size:
+            self.flush()
+
+    def write(self, df, tab_name, on_written=None, key_columns=None, fit=False):
+        """
+        Queue a full replacement of a tab's contents
+
+        Args:
+            key_columns (list): Columns identifying a row for diff mode
+                (default: sheet_diff.DEFAULT_KEY_COLUMNS present in df)
+            fit (bool): Size the tab to exactly the data instead of leaving spare rows and
+                columns; the rows are written whole and in order, never diffed
+        """
+        self._queue(tab_name, df, 'replace', on_written, key_columns, fit)
+
+    def append(self, df, tab_name, on_written=None):
+        """Queue rows to append below a tab's existing data"""
+        self._queue(tab_name, df, 'append', on_written)
+
+    def remove_stale(self, pattern):
+        """Delete the tabs whose whole name matches a regex and that the next flush does not write"""
+        self._stale_patterns.append(re.compile(pattern))
+
+    def _call(self, func, *args, **kwargs):
+        """Run one Sheets API call under the quota limiter"""
+        self.api_calls += 1
+        return self.rate_limiter.call(func, *args, **kwargs)
+
+    def flush(self):
+        """
+        Send all pending writes
+
+        Returns:
+            int: Number of tabs written; callbacks of written tabs are called.
+                 When the write fails its tabs stay queued for the next flush.
+        """
+        if not self._pending:
+            return 0
+        if self.metrics is None:
+            return self._flush()
+        with self.metrics.timer('sheet_write', mode='batch'):
+            return self._flush()
+
+    def _flush(self):
+        """Send all pending writes (see flush)"""
+        pending, self._pending = self._pending, {}
+
+        # Combine queued frames
+        jobs = {}
+        for tab_name, entry in pending.items():
+            df = pd.concat(entry['frames'], ignore_index=True)
+            if df.empty:
+                continue
+            jobs[tab_name] = {
+                'mode': entry['mode'],
+                'df': df,
+                'cols': len(df.columns),
+                'callbacks': entry['callbacks'],
+                'key_columns': entry['key_columns'],
+                'fit': entry.get('fit', False),
+                'plan': None
+            }
+        if not jobs:
+            return 0
+
+        try:
+            worksheets = {ws.title: ws for ws in self._call(self.spreadsheet.worksheets)}
+
+            # Read what is needed from existing tabs in one request
+            reads = []
+            for tab_name, job in jobs.items():
+                if tab_name not in worksheets:
+                    continue
+                if job['mode'] == 'append':
+                    reads.append((tab_name, f"{quote_tab(tab_name)}!A:A"))
+                elif self.diff and not job['fit']:
+                    reads.append((tab_name, quote_tab(tab_name)))
+            current = {}
+            if reads:
+                response = self._call(
+                    self.spreadsheet.values_batch_get,
+                    [a1 for _, a1 in reads],
+                    params={'valueRenderOption': 'UNFORMATTED_VALUE',
+                            'dateTimeRenderOption': 'FORMATTED_STRING'}
+                )
+                for (tab_name, _), value_range in zip(reads, response.get('valueRanges', [])):
+                    current[tab_name] = value_range.get('values', [])
+
+            # Lay out every job as blocks of rows starting at a given row
+            for tab_name, job in jobs.items():
+                exists = tab_name in worksheets
+                if job['mode'] == 'append' and exists:
+                    start_row = len(current.get(tab_name, [])) + 1
+                    job['blocks'] = [(start_row, dataframe_to_values(job['df'], include_header=False))]
+                elif job['mode'] == 'replace' and exists and self.diff and not job['fit']:
+                    job['plan'] = plan_diff(current.get(tab_name, []), dataframe_to_values(job['df']),
+                                            key_columns=job['key_columns'])
+                    job['blocks'] = job['plan']['blocks']
+                else:
+                    job['blocks'] = [(1, dataframe_to_values(job['df']))]
+                job['last_row'] = max([first + len(rows) - 1 for first, rows in job['blocks']] + [0])
+
+            # Create missing tabs and grow tabs that are too small; fitted tabs get no spare cells
+            requests = []
+            for tab_name, job in jobs.items():
+                worksheet = worksheets.get(tab_name)
+                spare_rows = 0 if job['fit'] else 10
+                if worksheet is None:
+                    print(f"    📄 Creating new tab '{tab_name}'")
+                    job['grid'] = ((job['last_row'], job['cols']) if job['fit']
+                                   else (max(200, job['last_row'] + 10), max(20, job['cols'])))
+                    requests.append({'addSheet': {'properties': {
+                        'title': tab_name,
+                        'gridProperties': {'rowCount': job['grid'][0], 'columnCount': job['grid'][1]}
+                    }}})
+                    continue
+                job['grid'] = (worksheet.row_count, worksheet.col_count)
+                if worksheet.row_count < job['last_row'] or worksheet.col_count < job['cols']:
+                    job['grid'] = (max(worksheet.row_count, job['last_row'] + spare_rows),
+                                   max(worksheet.col_count, job['cols']))
+                    requests.append(_resize_request(worksheet.id, *job['grid']))
+            if requests:
+                self._call(self.spreadsheet.batch_update, {'requests': requests})
+
+            # Clear tabs whose contents are replaced wholesale
+            clear_ranges = [quote_tab(t) for t, job in jobs.items()
+                            if job['mode'] == 'replace' and job['plan'] is None and t in worksheets]
+            if clear_ranges:
+                self._call(self.spreadsheet.values_batch_clear, body={'ranges': clear_ranges})
+
+            # Write all values, split into requests of bounded size
+            data, cells = [], 0
+            for tab_name, job in jobs.items():
+                for first_row, rows in job['blocks']:
+                    data.append({'range': f"{quote_tab(tab_name)}!A{first_row}", 'values': rows})
+                    cells += len(rows) * job['cols']
+                    self.cells_written += len(rows) * job['cols']
+                    if cells >= MAX_CELLS_PER_REQUEST:
+                        self._send_values(data)
+                        data, cells = [], 0
+            if data:
+                self._send_values(data)
+
+            # Remove rows that no longer exist, bottom-up so row numbers stay valid
+            deletes = []
+            for tab_name, job in jobs.items():
+                if job['plan'] is None:
+                    continue
+                for first_row, last_row in reversed(job['plan']['deletes']):
+                    deletes.append({'deleteDimension': {'range': {
+                        'sheetId': worksheets[tab_name].id,
+                        'dimension': 'ROWS',
+                        'startIndex': first_row - 1,
+                        'endIndex': last_row
+                    }}})
+
+            # Shrink fitted tabs to their data, once the deleted rows are gone
+            for tab_name, job in jobs.items():
+                fitted = (len(job['df']) + 1, job['cols'])
+                if job['fit'] and job['mode'] == 'replace' and tab_name in worksheets and job['grid'] != fitted:
+                    deletes.append(_resize_request(worksheets[tab_name].id, *fitted))
+
+            # Drop tabs that an earlier layout wrote and this flush no longer does
+            stale = [ws for title, ws in worksheets.items() if title not in jobs
+                     and any(pattern.fullmatch(title) for pattern in self._stale_patterns)]
+            self._stale_patterns = []
+            for worksheet in stale:
+                print(f"    🗑️ Deleting stale tab '{worksheet.title}'")
+                deletes.append({'deleteSheet': {'sheetId': worksheet.id}})
+            if deletes:
+                self._call(self.spreadsheet.batch_update, {'requests': deletes})
+
+        except Exception as e:
+            print(f"    ❌ Batched Sheets write failed for {len(jobs)} tab(s): {e}")
+            self.tabs_failed += len(jobs)
+            self._requeue(pending)
+            return 0
+
+        for tab_name, job in jobs.items():
+            plan = job['plan']
+            if plan is not None:
+                print(f"    ✅ Synced '{tab_name}': {plan['changed']} changed, "
+                      f"{plan['added']} added, {plan['deleted']} deleted rows")
+            else:
+                print(f"    ✅ {'Appended' if job['mode'] == 'append' else 'Written'} "
+                      f"{len(job['df'])} rows to '{tab_name}'")
+            for callback in job['callbacks']:
+                callback()
+        if self.metrics is not None:
+            self.metrics.count('sheet_tabs_written', len(jobs))
+            self.metrics.count('sheet_rows_written', sum(len(job['df']) for job in jobs.values()))
+        self.tabs_written += len(jobs)
+        return len(jobs)
+
+    def _requeue(self, pending):
+        """Queue the writes of a failed flush again, ahead of anything queued for their tabs since"""
+        for tab_name, entry in pending.items():
+            newer = self._pending.get(tab_name)
+            if newer is not None and newer['mode'] != 'append':
+                # The newer contents replace the failed ones, and complete their write too
+                newer['callbacks'][:0] = entry['callbacks']
+                continue
+            if newer is not None:
+                entry['frames'].extend(newer['frames'])
+                entry['callbacks'].extend(newer['callbacks'])
+            self._pending[tab_name] = entry
+
+    def write_chunks(self, chunks, tab_name):
+        """
+        Replace a tab's contents with a stream of DataFrames, one values request per chunk
+
+        Unlike write(), nothing is queued and only the current chunk is held in
+        memory, so tabs of any size can be written. Diff mode does not apply.
+
+        Args:
+            chunks (iterable): DataFrames with the same columns, written in order
+
+        Returns:
+            int: Rows written (0 when the write failed)
+        """
+        rows = 0
+        try:
+            worksheets = {ws.title: ws for ws in self._call(self.spreadsheet.worksheets)}
+            worksheet = worksheets.get(tab_name)
+            if worksheet is None:
+                print(f"    📄 Creating new tab '{tab_name}'")
+                worksheet = self._call(self.spreadsheet.add_worksheet, title=tab_name, rows=200, cols=20)
+            else:
+                self._call(self.spreadsheet.values_batch_clear, body={'ranges': [quote_tab(tab_name)]})
+            row_count, col_count = worksheet.row_count, worksheet.col_count
+
+            next_row = 1
+            for chunk in chunks:
+                values = dataframe_to_values(chunk, include_header=next_row == 1)
+                last_row = next_row + len(values) - 1
+                cols = len(chunk.columns)
+                if row_count < last_row or col_count < cols:
+                    # Grow geometrically so a long stream needs few resizes
+                    row_count, col_count = max(last_row + 10, 2 * row_count), max(col_count, cols)
+                    self._call(self.spreadsheet.batch_update,
+                               {'requests': [_resize_request(worksheet.id, row_count, col_count)]})
+                self._send_values([{'range': f"{quote_tab(tab_name)}!A{next_row}", 'values': values}])
+                self.cells_written += len(values) * cols
+                rows += len(chunk)
+                next_row = last_row + 1
+        except Exception as e:
+            print(f"    ❌ Streamed Sheets write failed for '{tab_name}' after {rows} rows: {e}")
+            self.tabs_failed += 1
+            return 0
+
+        print(f"    ✅ Written {rows} rows to '{tab_name}' in chunks")
+        if self.metrics is not None:
+            self.metrics.count('sheet_tabs_written')
+            self.metrics.count('sheet_rows_written', rows)
+        self.tabs_written += 1
+        return rows
+
+    def _send_values(self, data):
+        """Write a group of ranges in one values_batch_update request"""
+        self._call(self.spreadsheet.values_batch_update, body={
+            'valueInputOption': 'USER_ENTERED',
+            'data': data
+        })
+
+    def summary(self):
+        """Short human readable statistics line"""
+        failed = f" ({self.tabs_failed} failed)" if self.tabs_failed else ''
+        return f"{self.tabs_written} tabs{failed}, {self.cells_written} cells in {self.api_calls} API calls"
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+On-Disk Spill Files
+Append-only CSV files that hold the rows of a run until they are uploaded, so
+memory does not grow with the number of keywords and countries
+"""
+
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+
+class SpillFile:
+    """
+    One CSV file per data set under a spill directory
+
+    The first frame appended to a data set fixes its columns; later frames are
+    aligned to them. Rows are read back as text, in chunks of bounded size,
+    exactly as they were written.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Initialize the spill files
+
+        Args:
+            directory (str): Directory for the files (default: a new temporary
+                directory, removed again by cleanup())
+        """
+        self._owns_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix='trends_spill_')
+        os.makedirs(self.directory, exist_ok=True)
+        self.columns = {}
+        self.rows = {}
+        self.frames = {}
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.csv")
+
+    def append(self, name, df):
+        """Append a frame's rows to a data set's file"""
+        if df is None or df.empty:
+            return
+        columns = self.columns.get(name)
+        if columns is None:
+            self.columns[name] = columns = list(df.columns)
+            df.to_csv(self.path(name), index=False, mode='w')
+        else:
+            extra = [column for column in df.columns if column not in columns]
+            if extra:
+                print(f"  ⚠️ Spill '{name}': dropped unexpected columns {', '.join(map(str, extra))}")
+            df.reindex(columns=columns).to_csv(self.path(name), index=False, header=False, mode='a')
+        self.rows[name] = self.rows.get(name, 0) + len(df)
+        self.frames[name] = self.frames.get(name, 0) + 1
+
+    def chunks(self, name, rows=5000):
+        """
+        Read a data set back
+
+        Args:
+            rows (int): Rows per chunk
+
+        Yields:
+            DataFrame: Chunks of text columns, empty cells as ''
+        """
+        if not self.rows.get(name):
+            return
+        yield from pd.read_csv(self.path(name), dtype=str, keep_default_na=False, chunksize=rows)
+
+    def summary(self):
+        """Short text summary of the spilled data"""
+        return ', '.join(f"{name}: {self.rows[name]} rows" for name in self.rows) or 'empty'
+
+    def cleanup(self):
+        """Remove the spill files (and the directory when it was created here)"""
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            return
+        for name in self.columns:
+            if os.path.exists(self.path(name)):
+                os.remove(self.path(name))
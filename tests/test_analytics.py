@@ -0,0 +1,79 @@
+"""Tests of the incremental trend statistics and alerts"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import ALERT_COLUMNS, find_breakouts, find_spikes, rebase_tail, update_series
+
+EMPTY_TAIL = pd.DataFrame(columns=['Country', 'Keyword', 'Date', 'Value', 'Ewma'])
+
+
+def points(values, start='2026-01-01', keyword='kw'):
+    return pd.DataFrame({'Country': 'Slovensko', 'Keyword': keyword,
+                         'Date': pd.date_range(start, periods=len(values)), 'Value': values})
+
+
+def test_spike_stands_out_from_its_baseline():
+    values = [10.0, 12, 11, 9, 10, 11, 12, 10, 11, 10, 60]
+    frame, _ = update_series(EMPTY_TAIL, points(values), window=28, alpha=0.3)
+    spikes = find_spikes(frame, spike_z=3.0, min_value=10, min_points=8)
+    assert list(spikes.columns) == ALERT_COLUMNS
+    assert spikes['Date'].tolist() == [pd.Timestamp('2026-01-11')]
+    # The spike is not part of its own baseline
+    assert spikes['Baseline'].iloc[0] == pytest.approx(np.mean(values[:-1]))
+
+
+def test_short_or_quiet_series_do_not_spike():
+    frame, _ = update_series(EMPTY_TAIL, points([10.0, 10, 60]), window=28, alpha=0.3)
+    assert find_spikes(frame, spike_z=3.0, min_value=10, min_points=8).empty
+    frame, _ = update_series(EMPTY_TAIL, points([1.0] * 10 + [8]), window=28, alpha=0.3)
+    assert find_spikes(frame, spike_z=3.0, min_value=10, min_points=8).empty
+
+
+def test_continuing_from_the_tail_matches_one_pass():
+    values = list(np.linspace(10, 40, 30))
+    whole, _ = update_series(EMPTY_TAIL, points(values), window=7, alpha=0.3)
+    _, tail = update_series(EMPTY_TAIL, points(values[:20]), window=7, alpha=0.3)
+    rest, _ = update_series(tail, points(values[20:], start='2026-01-21'), window=7, alpha=0.3)
+    rest = rest[rest['New']]
+    expected = whole.iloc[20:]
+    for column in ('Baseline', 'Baseline_Std', 'Ewma', 'WoW_Change'):
+        assert rest[column].to_numpy() == pytest.approx(expected[column].to_numpy())
+
+
+def test_week_over_week_change():
+    frame, _ = update_series(EMPTY_TAIL, points([10.0] * 7 + [15]), window=28, alpha=0.3)
+    assert frame['WoW_Change'].iloc[-1] == pytest.approx(50)
+
+
+def test_breakouts_are_reported_once():
+    related = {'related_queries': pd.DataFrame({
+        'Country': 'Slovensko', 'Keyword': 'kw', 'Type': ['Rising', 'Rising', 'Top'],
+        'query': ['new', 'slow', 'top'], 'value': [9000, 200, 100]})}
+    previous = pd.DataFrame(columns=['Country', 'Keyword', 'Alert', 'Item'])
+    date = pd.Timestamp('2026-01-10')
+    alerts, remembered = find_breakouts(related, previous, 5000, date)
+    assert alerts['Item'].tolist() == ['new']
+    alerts, _ = find_breakouts(related, remembered, 5000, date)
+    assert alerts.empty
+
+
+def test_tail_is_rebased_onto_a_renormalized_window():
+    values = [10.0, 12, 11, 9, 10, 11, 12, 10, 11, 10]
+    _, tail = update_series(EMPTY_TAIL, points(values), window=28, alpha=0.3)
+    # The next collection re-fetches the window on a scale twice as large
+    fresh = points([value * 2 for value in values])
+    rebased = rebase_tail(tail, fresh)
+    assert rebased['Value'].tolist() == pytest.approx(fresh['Value'].tolist())
+    assert rebased['Ewma'].tolist() == pytest.approx((tail['Ewma'] * 2).tolist())
+    # A new point at the old level is no spike on the new scale
+    frame, _ = update_series(rebased, points([20.0], start='2026-01-11'), window=28, alpha=0.3)
+    assert find_spikes(frame, spike_z=3.0, min_value=10, min_points=8).empty
+    assert frame['WoW_Change'].iloc[-1] == pytest.approx(100 * (20 - 18) / 18)
+
+
+def test_tail_without_shared_dates_is_unchanged():
+    _, tail = update_series(EMPTY_TAIL, points([10.0, 20]), window=28, alpha=0.3)
+    rebased = rebase_tail(tail, points([50.0], start='2026-02-01'))
+    assert rebased['Value'].tolist() == [10, 20]
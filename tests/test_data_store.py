@@ -0,0 +1,49 @@
+"""Tests of the local Parquet store"""
+
+import os
+
+import pandas as pd
+
+from data_store import TrendsDataStore
+
+
+def partition_files(root, table):
+    return [os.path.join(path, name) for path, _, names in os.walk(os.path.join(root, table))
+            for name in names if name.endswith('.parquet') and not name.startswith('.')]
+
+
+def collect(root, day, value, compact_files=4):
+    """One run storing a rolling interest window and a related list"""
+    store = TrendsDataStore(root, compact_files=compact_files)
+    store.collected_at = pd.Timestamp('2026-02-01') + pd.Timedelta(days=day)
+    dates = pd.date_range('2026-01-01', periods=20) + pd.Timedelta(days=day)
+    store.add_interest(pd.DataFrame({'Date': dates, 'kw': [value] * 20}), 'kw', 'Česko', 'CZ')
+    store.add_related('related_queries', pd.DataFrame({
+        'Type': ['Top', 'Top'], 'query': [f"first {day}", f"second {day}"], 'value': [100, 50],
+        'Keyword': 'kw'}), 'kw', 'Česko', 'CZ')
+    store.flush()
+    return store
+
+
+def test_partitions_are_compacted(tmp_path):
+    root = str(tmp_path)
+    for day in range(10):
+        store = collect(root, day, float(day))
+    months = {os.path.dirname(path) for path in partition_files(root, 'interest')}
+    assert len(partition_files(root, 'interest')) < 4 * len(months)
+    assert len(partition_files(root, 'related_queries')) < 4
+
+    interest = store.read('interest').sort_values('Date')
+    # Every date keeps its latest collection
+    assert interest['Value'].tolist()[-1] == 9
+    assert interest.groupby('Collected_At').size().to_dict() == {
+        pd.Timestamp('2026-02-01') + pd.Timedelta(days=day): 1 if day < 9 else 20 for day in range(10)}
+    assert len(store.read('interest', latest=False)) == 200
+    assert store.read('related_queries')['query'].tolist() == ['first 9', 'second 9']
+
+
+def test_compaction_can_be_switched_off(tmp_path):
+    root = str(tmp_path)
+    for day in range(5):
+        collect(root, day, float(day), compact_files=0)
+    assert len(partition_files(root, 'related_queries')) == 5
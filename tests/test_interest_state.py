@@ -0,0 +1,53 @@
+"""Tests of the incremental Interest Over Time state"""
+
+from datetime import date
+
+import pandas as pd
+
+from interest_state import InterestState
+
+
+def series(start, values, keyword='kw'):
+    return pd.DataFrame({'Date': pd.date_range(start, periods=len(values)), keyword: values})
+
+
+def make_state(tmp_path, overlap_days=3):
+    state = InterestState(str(tmp_path / 'state.json'), overlap_days=overlap_days)
+    state.record('kw', 'SK', series('2026-01-01', [10, 20, 30, 40, 50]))
+    return state
+
+
+def test_window_is_rescaled_onto_the_stored_overlap(tmp_path):
+    state = make_state(tmp_path)
+    # The fresh window sees the stored 30, 40, 50 as 60, 80, 100
+    window = series('2026-01-03', [60, 80, 100, 90, 70])
+    new = state.rescale_window('kw', 'SK', window)
+    assert pd.to_datetime(new['Date']).dt.day.tolist() == [6, 7]
+    assert new['kw'].tolist() == [45, 35]
+
+
+def test_window_without_overlap_is_appended_unscaled(tmp_path):
+    state = make_state(tmp_path)
+    window = series('2026-01-10', [60, 80])
+    assert state.rescale_window('kw', 'SK', window)['kw'].tolist() == [60, 80]
+
+
+def test_unknown_series_is_returned_whole(tmp_path):
+    state = make_state(tmp_path)
+    window = series('2026-01-03', [1, 2, 3], keyword='other')
+    assert state.rescale_window('other', 'SK', window).equals(window)
+
+
+def test_extend_advances_the_tail_and_survives_a_reload(tmp_path):
+    state = make_state(tmp_path)
+    state.extend('kw', 'SK', series('2026-01-06', [45.0, 35.0]))
+    state.save()
+    reloaded = InterestState(str(tmp_path / 'state.json'), overlap_days=3)
+    assert reloaded.last_date('kw', 'SK') == date(2026, 1, 7)
+    assert reloaded.tail('kw', 'SK').tolist() == [50, 45, 35]
+
+
+def test_window_reaches_back_over_the_overlap(tmp_path):
+    state = make_state(tmp_path)
+    assert state.window_timeframe(['kw'], 'SK', today=date(2026, 1, 20)) == '2026-01-02 2026-01-20'
+    assert state.window_timeframe(['kw', 'new'], 'SK', today=date(2026, 1, 20)) is None
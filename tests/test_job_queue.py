@@ -0,0 +1,55 @@
+"""Tests of resuming an interrupted run from the job queue"""
+
+import pandas as pd
+
+from job_queue import FAILED, FETCHED, PENDING, WRITTEN, JobQueue
+
+ITEMS = [('Slovensko', 'kw', 'interest'), ('Slovensko', 'kw', 'related_queries'), ('Česko', 'kw', 'interest')]
+
+
+def test_restart_resumes_the_unfinished_run(tmp_path):
+    path = str(tmp_path / 'queue.sqlite')
+    queue = JobQueue(path)
+    assert not queue.start(ITEMS)
+    data = pd.DataFrame({'Date': pd.date_range('2026-01-01', periods=2), 'kw': [1, 2]})
+    queue.mark_fetched([('Slovensko', 'kw', 'interest', data)])
+    queue.mark_written([('Slovensko', 'kw', 'related_queries')])
+    # The process dies here; a new one opens the same file
+
+    queue = JobQueue(path)
+    assert queue.start(ITEMS)
+    assert queue.status('Slovensko', 'kw', 'interest')[0] == FETCHED
+    assert not queue.needs_fetch('Slovensko', 'kw', 'interest')
+    assert queue.fetched_data('Slovensko', 'kw', 'interest').equals(data)
+    assert queue.status('Slovensko', 'kw', 'related_queries')[0] == WRITTEN
+    assert queue.needs_fetch('Česko', 'kw', 'interest')
+
+
+def test_failed_items_are_retried_until_out_of_attempts(tmp_path):
+    path = str(tmp_path / 'queue.sqlite')
+    queue = JobQueue(path, max_attempts=2)
+    queue.start(ITEMS[:1])
+    queue.mark_failed('Slovensko', 'kw', 'interest', '429')
+    assert JobQueue(path, max_attempts=2).start(ITEMS[:1])
+    assert queue.needs_fetch('Slovensko', 'kw', 'interest')
+    queue.mark_failed('Slovensko', 'kw', 'interest', '429')
+    assert queue.status('Slovensko', 'kw', 'interest') == (FAILED, 2)
+    assert not queue.needs_fetch('Slovensko', 'kw', 'interest')
+    # Nothing left to resume, the next run starts over
+    assert not JobQueue(path, max_attempts=2).start(ITEMS[:1])
+    assert queue.status('Slovensko', 'kw', 'interest') == (PENDING, 0)
+
+
+def test_finished_run_starts_over(tmp_path):
+    path = str(tmp_path / 'queue.sqlite')
+    queue = JobQueue(path)
+    queue.start(ITEMS)
+    queue.mark_written(ITEMS)
+    assert not JobQueue(path).start(ITEMS)
+    assert queue.counts() == {PENDING: len(ITEMS)}
+
+
+def test_stale_run_is_discarded(tmp_path):
+    path = str(tmp_path / 'queue.sqlite')
+    JobQueue(path).start(ITEMS)
+    assert not JobQueue(path, max_age=0).start(ITEMS)
@@ -0,0 +1,52 @@
+"""Tests of keyword batching and shard placement"""
+
+from collections import Counter
+
+import pytest
+
+from planning import assign_shards, make_keyword_batches, parse_shard
+
+
+def test_every_batch_starts_with_the_anchor():
+    keywords = [f"kw{index}" for index in range(10)]
+    batches = make_keyword_batches(keywords, 'kw0', batch_size=5)
+    assert all(batch[0] == 'kw0' and len(batch) <= 5 for batch in batches)
+    assert [kw for batch in batches for kw in batch[1:]] == keywords[1:]
+
+
+def test_anchor_outside_the_keywords_gets_its_own_slot():
+    assert make_keyword_batches(['a', 'b'], 'anchor', batch_size=2) == [['anchor', 'a'], ['anchor', 'b']]
+
+
+def test_only_the_anchor_makes_one_batch():
+    assert make_keyword_batches(['anchor'], 'anchor') == [['anchor']]
+
+
+def test_batch_size_must_fit_the_anchor():
+    with pytest.raises(ValueError):
+        make_keyword_batches(['a'], 'anchor', batch_size=1)
+
+
+def test_shard_loads_differ_by_at_most_one():
+    keys = [f"kw{index}" for index in range(23)]
+    owners = assign_shards(keys, 4)
+    assert set(owners) == set(keys)
+    loads = Counter(owners.values())
+    assert set(loads) == {1, 2, 3, 4}
+    assert max(loads.values()) - min(loads.values()) <= 1
+
+
+def test_shard_placement_is_stable():
+    keys = [f"kw{index}" for index in range(40)]
+    before = assign_shards(keys, 4)
+    assert assign_shards(list(reversed(keys)), 4) == before
+    # Adding a key moves few of the others
+    after = assign_shards(keys + ['kw40'], 4)
+    assert sum(before[key] != after[key] for key in keys) <= 4
+
+
+def test_parse_shard():
+    assert parse_shard('2/4') == (2, 4)
+    for text in ('0/4', '5/4', '2', 'a/b'):
+        with pytest.raises(ValueError):
+            parse_shard(text)
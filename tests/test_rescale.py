@@ -0,0 +1,53 @@
+"""Tests of merging keyword batches onto one scale"""
+
+import pandas as pd
+import pytest
+
+from main import rescale_to_anchor, rescale_to_reference
+
+DATES = pd.date_range('2026-01-01', periods=4)
+
+
+def test_batches_share_the_anchor_scale():
+    # The anchor is twice as strong relative to the others in the second payload
+    first = pd.DataFrame({'Date': DATES, 'anchor': [50, 50, 50, 50], 'a': [100, 80, 60, 40]})
+    second = pd.DataFrame({'Date': DATES, 'anchor': [100, 100, 100, 100], 'b': [40, 40, 40, 40]})
+    merged = rescale_to_anchor([first, second], 'anchor').set_index('Date')
+    assert list(merged.columns) == ['anchor', 'a', 'b']
+    assert merged['a'].tolist() == [100, 80, 60, 40]
+    assert merged['b'].tolist() == [20, 20, 20, 20]
+    assert merged.max().max() == 100
+
+
+def test_merged_frame_peaks_at_100():
+    first = pd.DataFrame({'Date': DATES, 'anchor': [10, 20, 30, 40], 'a': [5, 5, 5, 5]})
+    merged = rescale_to_anchor([first], 'anchor')
+    assert merged['anchor'].tolist() == [25, 50, 75, 100]
+
+
+def test_batch_without_anchor_data_is_left_unscaled():
+    first = pd.DataFrame({'Date': DATES, 'anchor': [100, 100, 100, 100], 'a': [50, 50, 50, 50]})
+    second = pd.DataFrame({'Date': DATES, 'anchor': [0, 0, 0, 0], 'b': [30, 30, 30, 30]})
+    merged = rescale_to_anchor([first, second], 'anchor')
+    assert merged['b'].tolist() == [30, 30, 30, 30]
+
+
+def test_region_batches_align_on_geo_code():
+    first = pd.DataFrame({'Geo_Code': ['SK-BA', 'SK-KI'], 'anchor': [100, 50], 'a': [40, 20]})
+    second = pd.DataFrame({'Geo_Code': ['SK-BA', 'SK-KI'], 'anchor': [50, 25], 'b': [50, 50]})
+    merged = rescale_to_anchor([first, second], 'anchor', index='Geo_Code').set_index('Geo_Code')
+    assert merged.loc['SK-KI', 'b'] == 100
+
+
+def test_reference_puts_a_frame_on_the_stored_scale():
+    reference = pd.Series([20.0, 20.0, 20.0], index=DATES[:3])
+    df = pd.DataFrame({'Date': DATES, 'anchor': [100, 100, 100, 50], 'a': [50, 60, 70, 80]})
+    scaled = rescale_to_reference(df, 'anchor', reference)
+    assert scaled['anchor'].tolist() == [20, 20, 20, 10]
+    assert scaled['a'].tolist() == pytest.approx([10, 12, 14, 16])
+
+
+def test_reference_without_overlap_leaves_the_frame():
+    reference = pd.Series([20.0], index=[pd.Timestamp('2025-01-01')])
+    df = pd.DataFrame({'Date': DATES, 'anchor': [100, 100, 100, 50], 'a': [50, 60, 70, 80]})
+    assert rescale_to_reference(df, 'anchor', reference).equals(df)
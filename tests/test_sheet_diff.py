@@ -0,0 +1,88 @@
+"""Tests of the row-level Sheets diff planner"""
+
+from sheet_diff import normalize_cell, plan_diff
+
+
+def apply_plan(current, plan):
+    """Tab contents after the flush: value blocks first, then row deletions bottom-up"""
+    rows = [list(row) for row in current]
+    for first_row, block in plan['blocks']:
+        for offset, values in enumerate(block):
+            index = first_row - 1 + offset
+            while len(rows) <= index:
+                rows.append([])
+            rows[index] = list(values)
+    for first_row, last_row in reversed(plan['deletes']):
+        del rows[first_row - 1:last_row]
+    return rows
+
+
+def normalized(rows):
+    return [[normalize_cell(cell) for cell in row] for row in rows]
+
+
+def interest_rows(days, offset=0):
+    return [['Date', 'kw']] + [[f"2026-01-{day:02d}", day + offset] for day in days]
+
+
+def test_unchanged_tab_needs_no_writes():
+    rows = interest_rows(range(1, 11))
+    plan = plan_diff(rows, rows)
+    assert plan['blocks'] == [] and plan['deletes'] == []
+    assert (plan['changed'], plan['added'], plan['deleted']) == (0, 0, 0)
+
+
+def test_shifted_window_keeps_date_order():
+    current = interest_rows(range(1, 11))
+    new = interest_rows(range(3, 13))
+    plan = plan_diff(current, new)
+    assert normalized(apply_plan(current, plan)) == normalized(new)
+    assert (plan['added'], plan['deleted'], plan['rewrite']) == (2, 2, False)
+    # Only the new dates are written, the dropped ones deleted
+    assert sum(len(block) for _, block in plan['blocks']) == 2
+
+
+def test_shifted_window_with_changed_values():
+    current = interest_rows(range(1, 11))
+    new = interest_rows(range(2, 12), offset=5)
+    plan = plan_diff(current, new)
+    assert normalized(apply_plan(current, plan)) == normalized(new)
+
+
+def test_reranked_list_keeps_new_order():
+    header = ['Type', 'query', 'value']
+    current = [header, ['Top', 'a', 100], ['Top', 'b', 80], ['Top', 'c', 60], ['Top', 'd', 40]]
+    new = [header, ['Top', 'a', 100], ['Top', 'c', 90], ['Top', 'b', 70], ['Top', 'e', 30]]
+    plan = plan_diff(current, new)
+    assert normalized(apply_plan(current, plan)) == normalized(new)
+    # The unchanged first row is not written again
+    assert plan['blocks'][0][0] == 3
+
+
+def test_new_row_before_kept_rows():
+    header = ['Type', 'query', 'value']
+    current = [header, ['Top', 'a', 100], ['Top', 'b', 80]]
+    new = [header, ['Top', 'z', 100], ['Top', 'a', 90], ['Top', 'b', 80]]
+    plan = plan_diff(current, new)
+    assert normalized(apply_plan(current, plan)) == normalized(new)
+
+
+def test_shorter_list_deletes_trailing_rows():
+    header = ['Type', 'query', 'value']
+    current = [header, ['Top', 'a', 100], ['Top', 'b', 80], ['Top', 'c', 60]]
+    new = [header, ['Top', 'b', 100], ['Top', 'a', 50]]
+    plan = plan_diff(current, new)
+    assert normalized(apply_plan(current, plan)) == normalized(new)
+
+
+def test_header_change_rewrites_everything():
+    current = [['Date', 'old'], ['2026-01-01', 1]]
+    new = [['Date', 'kw'], ['2026-01-01', 1], ['2026-01-02', 2]]
+    plan = plan_diff(current, new)
+    assert plan['rewrite'] and plan['blocks'] == [(1, new)]
+
+
+def test_ignored_columns_do_not_count_as_changes():
+    current = [['Date', 'kw', 'Extracted_Date'], ['2026-01-01', 1, '2026-01-05 10:00']]
+    new = [['Date', 'kw', 'Extracted_Date'], ['2026-01-01', 1.0, '2026-01-06 10:00']]
+    assert plan_diff(current, new)['blocks'] == []
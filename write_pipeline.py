@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Background Write Pipeline
+Runs sink writes (Google Sheets) on a writer thread fed through a bounded
+queue, so the collector can fetch the next payload while the last one is
+being written
+"""
+
+import queue
+import threading
+
+_STOP = object()
+
+
+class BackgroundWriter:
+    """
+    One writer thread draining a bounded queue of write tasks in order
+
+    submit() blocks while the queue is full, so fetching never runs more than
+    max_pending writes ahead of the sink. Tasks run on the writer thread; their
+    success callbacks are handed back and run by the submitting thread in
+    drain(), so state owned by the collector (job queue, incremental state) is
+    still only touched from one thread. Failures are collected and reported by
+    close() at the end of the run.
+    """
+
+    def __init__(self, max_pending=20, metrics=None, name='sheets-writer'):
+        """
+        Initialize the writer and start its thread
+
+        Args:
+            max_pending (int): Tasks queued before submit() blocks
+            metrics (RunMetrics): Receives the time submit() waited ('write_backpressure')
+        """
+        self.metrics = metrics
+        self.tasks_done = 0
+        self.errors = []
+        self._tasks = queue.Queue(maxsize=max(1, max_pending))
+        self._callbacks = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._work, name=name, daemon=True)
+        self._thread.start()
+
+    def in_writer_thread(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, task, label='write', on_success=None):
+        """
+        Queue a write, waiting while the queue is full
+
+        Args:
+            task (callable): task() runs on the writer thread; False or an exception is a failure
+            label (str): Name of the write in error messages
+            on_success (callable): Run by the submitting thread once the task succeeded
+        """
+        if self._closed:
+            raise RuntimeError('background writer is closed')
+        self.drain()
+        if self.metrics is None:
+            self._tasks.put((task, label, on_success))
+            return
+        with self.metrics.timer('write_backpressure'):
+            self._tasks.put((task, label, on_success))
+
+    def deferred(self, callback):
+        """Wrap a callback so that, called on the writer thread, it runs on the next drain() instead"""
+        if callback is None:
+            return None
+        return lambda: self._callbacks.put(callback)
+
+    def drain(self):
+        """Run the callbacks of finished writes on the calling thread"""
+        while True:
+            try:
+                callback = self._callbacks.get_nowait()
+            except queue.Empty:
+                return
+            callback()
+
+    def _work(self):
+        while True:
+            item = self._tasks.get()
+            if item is _STOP:
+                return
+            task, label, on_success = item
+            try:
+                ok = task() is not False
+            except Exception as e:
+                print(f"    ❌ Background write '{label}' failed: {e}")
+                ok = False
+            self.tasks_done += 1
+            if not ok:
+                self.errors.append(label)
+            elif on_success is not None:
+                self._callbacks.put(on_success)
+
+    def close(self):
+        """
+        Wait for every queued write, then run the remaining callbacks
+
+        Returns:
+            bool: True when no write failed
+        """
+        if not self._closed:
+            self._closed = True
+            self._tasks.put(_STOP)
+            self._thread.join()
+        self.drain()
+        return not self.errors
+
+    def summary(self):
+        """Short human readable statistics line"""
+        failed = f", {len(self.errors)} failed" if self.errors else ''
+        return f"{self.tasks_done} background writes{failed}"